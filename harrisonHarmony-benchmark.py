@@ -0,0 +1,425 @@
+#! /usr/bin/python
+# -*- coding: utf-8 -*-
+#-------------------------------------------------------------------------------
+# Name:         harrisonHarmony-benchmark.py
+# Purpose:      Speed benchmarks for harrisonHarmony.py
+#
+# Copyright (C) 2012 Christopher Antila
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#-------------------------------------------------------------------------------
+'''
+Benchmarks for harrisonHarmony.
+
+The micro-benchmarks time chromaticScaleDegree(),
+possibleFunctionsFromScaleDegree(), reconcilePossibleFunctions(),
+labelThisChord(), and labelChords() on a fixed set of chords, both with empty
+caches ("cold") and with full ones ("warm"). The macro-benchmarks time each
+stage of analyzing some scores from music21's corpus (parsing, chordifying,
+slicing, finding the key, and labelling), and the whole of analyzeScore(),
+which is analyzeThis() without displaying anything.
+
+Every benchmark is run several times, and the quickest is kept. The results
+can be written as JSON, and compared with the JSON from an earlier run:
+
+   python harrisonHarmony-benchmark.py --output baseline.json
+   ... change something ...
+   python harrisonHarmony-benchmark.py --output new.json --compare baseline.json
+
+With --compare, any benchmark that got slower by more than --threshold (default
+0.10, which is 10%) is flagged as a regression, and the exit status is 1.
+'''
+
+## Import required libraries
+import sys
+import io
+import json
+import time
+import timeit
+import argparse
+import platform
+from contextlib import contextmanager
+import harrisonHarmony
+from harrisonHarmony import *
+import music21
+from music21 import key
+from music21 import pitch
+from music21 import converter
+from music21 import corpus
+
+
+
+#-------------------------------------------------------------------------------
+## What the micro-benchmarks use.
+_KEYS = ['C', 'E-', 'F#', 'a']
+_PITCHES = ['C4', 'C#4', 'D-4', 'D4', 'E-4', 'E4', 'F4', 'F#4', 'G4', 'A-4', 'A4', 'B-4', 'B4', 'B#3', 'F-4']
+_DEGREES = ['1', '2', '3', '4', '5', '6', '7', '-2', '-3', '-6', '-7', '#1', '#4', '#5']
+_POSITIONS = [RelativeVoicePosition.Lowest, RelativeVoicePosition.Middle, RelativeVoicePosition.Highest]
+## Diatonic chords, seventh chords, and applied chords, from lowest to highest.
+_CHORDS = [['C3','E4','G4'], ['F3','C4','A4'], ['G3','D4','B4'], ['C3','E4','G4','C5'], \
+           ['D3','F4','A4','C5'], ['G3','B3','D4','F4'], ['E3','G4','C5'], ['A3','C4','E4'], \
+           ['F#3','A4','C4','D4'], ['C#4','E4','G4','B-4'], ['A-3','C4','E-4','F4'], ['D3','F#4','A4','C5'], \
+           ['B2','D4','F4','A-4'], ['E-3','G4','B-4'], ['C3','E4','G#4'], ['C4']]
+
+## The scores from music21's corpus that the macro-benchmarks analyze, as
+## ( name, movement number or None ). The Beethoven movement is much larger
+## than the chorales.
+_SCORES = [( 'bach/bwv66.6', None ), ( 'bach/bwv269', None ), ( 'bach/bwv347', None ), \
+           ( 'beethoven/opus18no1', 1 )]
+
+## The version of the format of the JSON we write.
+_FORMAT_VERSION = 1
+
+
+
+#-------------------------------------------------------------------------------
+def _clearCaches():
+   # Empties the caches harrisonHarmony keeps between calls, so the next call
+   # is "cold."
+   labelCache.clear()
+   possibleFunctionsCache.clear()
+
+@contextmanager
+def _quiet():
+   # Hides what analyzeScore() prints while it's being timed.
+   saved = sys.stdout
+   sys.stdout = io.StringIO() if sys.version_info[0] >= 3 else io.BytesIO()
+   try:
+      yield
+   finally:
+      sys.stdout = saved
+
+def _best( function, repeat, number = 1 ):
+   # Returns the fewest seconds that one call of function took, of "repeat"
+   # tries of "number" calls each.
+   return min( timeit.Timer( function ).repeat( repeat, number ) ) / number
+
+def _run( name, function, repeat, number = 1, warmUp = False ):
+   # Returns the result of one benchmark, for the dict that
+   # runMicroBenchmarks() returns, and prints it. If it raises an exception,
+   # the result has the 'error' instead of the 'seconds', so the rest can
+   # still run.
+   post = { 'repeat' : repeat, 'number' : number }
+   try:
+      if warmUp:
+         function() # once first, so imports and tables are ready
+      post['seconds'] = _best( function, repeat, number )
+   except Exception as e:
+      post['error'] = type(e).__name__ + ': ' + str(e)
+   _report( name, post )
+   return post
+
+
+
+#-------------------------------------------------------------------------------
+def microBenchmarks():
+   '''
+   Returns a list of ( name, function, number of calls to time at once ) for
+   the micro-benchmarks. Each function does a whole batch of calls, so the
+   result is the time for that batch.
+   '''
+   keys = [key.Key( name ) for name in _KEYS]
+   pitches = [pitch.Pitch( name ) for name in _PITCHES]
+   chords = [harrisonHarmony._sortedSpellings( pitches ) for pitches in _CHORDS]
+
+   # the scale degrees and candidate functions of every chord, in C, given to
+   # reconcilePossibleFunctions() just as _reconcileScaleDegrees() does
+   whatKey = key.Key( 'C' )
+   listOfScaleDegrees = harrisonHarmony._scaleDegreesOfChords( whatKey, chords )
+   candidates = []
+   for scaleDegrees in listOfScaleDegrees:
+      functions = [cachedPossibleFunctionsFromScaleDegree( whatKey, scaleDegrees[0], RelativeVoicePosition.Lowest )]
+      for degree in scaleDegrees[1:-1]:
+         functions.append( cachedPossibleFunctionsFromScaleDegree( whatKey, degree, RelativeVoicePosition.Middle ) )
+      functions.append( cachedPossibleFunctionsFromScaleDegree( whatKey, scaleDegrees[-1], RelativeVoicePosition.Highest ) )
+      candidates.append( functions )
+   manyChords = chords * 50
+
+   def scaleDegrees():
+      for theKey in keys:
+         for thePitch in pitches:
+            chromaticScaleDegree( theKey, thePitch )
+
+   def possibleFunctions():
+      for theKey in keys:
+         for degree in _DEGREES:
+            for position in _POSITIONS:
+               possibleFunctionsFromScaleDegree( theKey, degree, position )
+
+   def cachedPossibleFunctions():
+      for theKey in keys:
+         for degree in _DEGREES:
+            for position in _POSITIONS:
+               cachedPossibleFunctionsFromScaleDegree( theKey, degree, position )
+
+   def reconcile():
+      for functions in candidates:
+         reconcilePossibleFunctions( functions )
+
+   def labelCold():
+      _clearCaches()
+      for theChord in chords:
+         labelThisChord( whatKey, theChord )
+
+   def labelWarm():
+      for theChord in chords:
+         labelThisChord( whatKey, theChord )
+
+   def labelManyChords():
+      labelChords( whatKey, manyChords )
+
+   return [( 'micro.chromaticScaleDegree', scaleDegrees, 10 ), \
+           ( 'micro.possibleFunctionsFromScaleDegree', possibleFunctions, 10 ), \
+           ( 'micro.cachedPossibleFunctionsFromScaleDegree', cachedPossibleFunctions, 10 ), \
+           ( 'micro.reconcilePossibleFunctions', reconcile, 10 ), \
+           ( 'micro.labelThisChord.cold', labelCold, 1 ), \
+           ( 'micro.labelThisChord.warm', labelWarm, 10 ), \
+           ( 'micro.labelChords', labelManyChords, 1 )]
+# End function microBenchmarks() -----------------------------------------------
+
+def runMicroBenchmarks( repeat, nameFilter = None ):
+   '''
+   Runs the micro-benchmarks with names that contain nameFilter (or all of
+   them), and returns a dict from the name to a dict with the 'seconds',
+   'repeat', and 'number'. If a benchmark raises an exception, it has the
+   'error' message instead of the 'seconds'.
+   '''
+   post = {}
+   try:
+      benchmarks = microBenchmarks()
+   except Exception as e:
+      # the rest of the run, and its results, are still worth having
+      print( "Couldn't set up the micro-benchmarks. " + type(e).__name__ + ': ' + str(e) )
+      return post
+   for name, function, number in benchmarks:
+      if nameFilter is not None and nameFilter not in name:
+         continue
+      post[name] = _run( name, function, repeat, number, True )
+   _clearCaches()
+   return post
+# End function runMicroBenchmarks() --------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def _findCorpusScore( name, movement ):
+   # Returns the pathname of a score in music21's corpus, or None if it isn't
+   # there.
+   try:
+      if movement is None:
+         pathname = corpus.getWork( name )
+      else:
+         pathname = corpus.getWork( name, movement )
+   except Exception:
+      return None
+   if isinstance( pathname, list ):
+      pathname = pathname[0] if len(pathname) > 0 else None
+   if pathname is not None:
+      pathname = str(pathname)
+   return pathname
+
+def runMacroBenchmarks( repeat, nameFilter = None ):
+   '''
+   Runs the macro-benchmarks with names (like
+   "macro.bach/bwv66.6.parse") that contain nameFilter (or all of them), and
+   returns a dict like :func:`runMicroBenchmarks`. Scores that aren't in this
+   copy of music21's corpus are skipped. If preparing a score for its stages
+   fails, every stage of it has the 'error'.
+
+   For each score, these stages are timed on their own: 'parse' with
+   converter.parse(), 'chordify', 'chordifiedRecords' (finding the chords in
+   the chordified score), 'slice' (finding them without chordifying),
+   'findKey', and 'label' with empty and full caches. So is all of
+   'analyzeScore', with the default settings, with 'chordifyScore' False, and
+   with 'concurrentKeyFinding' True.
+   '''
+   stageNames = ['parse', 'chordify', 'chordifiedRecords', 'slice', 'findKey', 'label.cold', 'label.warm', \
+                 'analyzeScore.chordified', 'analyzeScore.sliced', 'analyzeScore.concurrentKey']
+   post = {}
+   for name, movement in _SCORES:
+      scoreName = name if movement is None else name + '/' + str(movement)
+      prefix = 'macro.' + scoreName + '.'
+      wanted = [stage for stage in stageNames if nameFilter is None or nameFilter in prefix + stage]
+      if 0 == len(wanted):
+         continue
+      pathname = _findCorpusScore( name, movement )
+      if pathname is None:
+         print( "Skipping " + scoreName + ", which isn't in music21's corpus." )
+         continue
+      
+      # things that later stages need
+      try:
+         theScore = converter.parse( pathname )
+         theChords = theScore.chordify()
+         records = harrisonHarmony._chordifiedRecords( theScore.chordify() )[0]
+         whatKey = harrisonHarmony._findKey( theChords )[0]
+      except Exception as e:
+         for stage in wanted:
+            post[prefix + stage] = { 'repeat' : repeat, 'number' : 1, 'error' : type(e).__name__ + ': ' + str(e) }
+            _report( prefix + stage, post[prefix + stage] )
+         continue
+      chordifiedSettings = HarrisonHarmonySettings()
+      slicedSettings = HarrisonHarmonySettings()
+      slicedSettings.parsePropertySet( 'chordifyScore False' )
+      concurrentSettings = HarrisonHarmonySettings()
+      concurrentSettings.parsePropertySet( 'concurrentKeyFinding True' )
+      
+      def labelCold():
+         _clearCaches()
+         harrisonHarmony._labelRecords( whatKey, records, 1 )
+      
+      def analyze( theSettings ):
+         _clearCaches()
+         with _quiet():
+            analyzeScore( pathname, theSettings )
+      
+      stages = { 'parse' : lambda: converter.parse( pathname, forceSource = True ), \
+                 'chordify' : lambda: theScore.chordify(), \
+                 'chordifiedRecords' : lambda: harrisonHarmony._chordifiedRecords( theChords ), \
+                 'slice' : lambda: harrisonHarmony._sliceScore( theScore ), \
+                 'findKey' : lambda: harrisonHarmony._findKey( theChords ), \
+                 'label.cold' : labelCold, \
+                 'label.warm' : lambda: harrisonHarmony._labelRecords( whatKey, records, 1 ), \
+                 'analyzeScore.chordified' : lambda: analyze( chordifiedSettings ), \
+                 'analyzeScore.sliced' : lambda: analyze( slicedSettings ), \
+                 'analyzeScore.concurrentKey' : lambda: analyze( concurrentSettings )}
+      for stage in wanted:
+         post[prefix + stage] = _run( prefix + stage, stages[stage], repeat )
+   _clearCaches()
+   return post
+# End function runMacroBenchmarks() --------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def _report( name, result ):
+   if 'error' in result:
+      print( "%-60s ERROR %s" % ( name, result['error'] ) )
+   else:
+      print( "%-60s %12.6f s" % ( name, result['seconds'] ) )
+
+def writeResults( benchmarks, pathname ):
+   '''
+   Writes the results of the benchmarks to a JSON file, with what they were
+   run on.
+   '''
+   results = { 'format' : _FORMAT_VERSION, 'created' : time.strftime( '%Y-%m-%d %H:%M:%S' ), \
+               'python' : platform.python_version(), 'platform' : platform.platform(), \
+               'music21' : getattr( music21, 'VERSION_STR', 'unknown' ), 'benchmarks' : benchmarks }
+   with open( pathname, 'w' ) as theFile:
+      json.dump( results, theFile, indent = 1, sort_keys = True )
+
+def readResults( pathname ):
+   '''
+   Returns the benchmarks in a JSON file from :func:`writeResults`. Raises
+   :exc:`NonsensicalInputError` if it isn't one.
+   '''
+   try:
+      with open( pathname ) as theFile:
+         results = json.load( theFile )
+      if _FORMAT_VERSION != results['format']:
+         raise ValueError( "it's version " + str(results['format']) + " of the format" )
+      return results['benchmarks']
+   except ( IOError, OSError, KeyError, TypeError, ValueError ) as e:
+      raise NonsensicalInputError( "readResults(): couldn't read '" + pathname + "': " + str(e) )
+
+def _seconds( result ):
+   # The seconds in a result, for compareResults() to show, or what went wrong.
+   if result is None:
+      return '-'
+   if 'error' in result:
+      return 'error'
+   return '%.6f' % result['seconds']
+
+def compareResults( benchmarks, baseline, threshold ):
+   '''
+   Compares benchmarks with a baseline (both dicts like
+   :func:`runMicroBenchmarks` returns), printing the ratio of the new time to
+   the old for every benchmark in both. Returns a list of the names of the
+   ones where that's more than 1 + threshold, and the ones that raised an
+   exception now but didn't in the baseline.
+   '''
+   regressions = []
+   print( "" )
+   print( "%-60s %12s %12s %8s" % ( 'benchmark', 'baseline', 'now', 'ratio' ) )
+   for name in sorted( set( benchmarks ) | set( baseline ) ):
+      before = baseline.get( name )
+      after = benchmarks.get( name )
+      flag = ''
+      if after is None:
+         ratio = 'missing'
+      elif before is None:
+         ratio = 'new'
+      elif 'error' in after:
+         ratio = '-'
+         if 'error' not in before:
+            flag = '  <-- REGRESSION (' + after['error'] + ')'
+            regressions.append( name )
+      elif 'error' in before:
+         ratio = 'fixed'
+      else:
+         ratio = after['seconds'] / before['seconds'] if before['seconds'] > 0 else float('inf')
+         if ratio > 1.0 + threshold:
+            flag = '  <-- REGRESSION'
+            regressions.append( name )
+         ratio = '%.3f' % ratio
+      print( "%-60s %12s %12s %8s%s" % ( name, _seconds( before ), _seconds( after ), ratio, flag ) )
+   return regressions
+# End function compareResults() ------------------------------------------------
+
+
+
+# "main" function --------------------------------------------------------------
+if __name__ == '__main__':
+   parser = argparse.ArgumentParser( description = 'Speed benchmarks for harrisonHarmony.' )
+   parser.add_argument( '--suite', choices = ['micro', 'macro', 'all'], default = 'all', \
+                        help = 'which benchmarks to run (default: all)' )
+   parser.add_argument( '--filter', default = None, help = 'only run benchmarks with names containing this' )
+   parser.add_argument( '--repeat', type = int, default = 5, help = 'tries of each micro-benchmark (default: 5)' )
+   parser.add_argument( '--macro-repeat', type = int, default = 3, help = 'tries of each macro-benchmark (default: 3)' )
+   parser.add_argument( '--output', default = None, help = 'write the results to this JSON file' )
+   parser.add_argument( '--results', default = None, \
+                        help = "don't run anything, but use the results in this JSON file" )
+   parser.add_argument( '--compare', default = None, help = 'compare the results with this JSON file' )
+   parser.add_argument( '--threshold', type = float, default = 0.10, \
+                        help = 'how much slower is a regression, as a fraction (default: 0.10)' )
+   arguments = parser.parse_args()
+   if arguments.repeat < 1 or arguments.macro_repeat < 1:
+      parser.error( 'need at least 1 try of each benchmark' )
+
+   if arguments.results is not None:
+      benchmarks = readResults( arguments.results )
+   else:
+      benchmarks = {}
+      if arguments.suite in ( 'micro', 'all' ):
+         print( "Micro-benchmarks" )
+         print( "================" )
+         benchmarks.update( runMicroBenchmarks( arguments.repeat, arguments.filter ) )
+      if arguments.suite in ( 'macro', 'all' ):
+         print( "Macro-benchmarks" )
+         print( "================" )
+         benchmarks.update( runMacroBenchmarks( arguments.macro_repeat, arguments.filter ) )
+
+   if arguments.output is not None:
+      writeResults( benchmarks, arguments.output )
+      print( "Wrote the results to " + arguments.output )
+
+   if arguments.compare is not None:
+      regressions = compareResults( benchmarks, readResults( arguments.compare ), arguments.threshold )
+      if len(regressions) > 0:
+         print( "" )
+         print( str(len(regressions)) + " benchmark(s) got more than " + str(int(arguments.threshold * 100)) + \
+                "% slower, or started failing." )
+         sys.exit( 1 )
+# End "main" function ----------------------------------------------------------
@@ -21,6 +21,8 @@
 #-------------------------------------------------------------------------------
 
 import unittest
+import os
+import tempfile
 from harrisonHarmony import *
 
 ## Import required libraries (this list is from the module)
@@ -33,6 +35,7 @@ from music21 import converter
 from music21 import analysis
 from music21 import stream
 from music21 import note # confirmed requirement
+from music21 import tie
 # TODO: Quadruple-fun check that these are all that's required.
 
 #-------------------------------------------------------------------------------
@@ -306,7 +309,66 @@ class TestChromaticScaleDegree( unittest.TestCase ):
       self.assertEqual( chromaticScaleDegree( key.Key( theKey ), note.Note( 'C20' ) ), theDegree )
       # Note and second much self.lower
       self.assertEqual( chromaticScaleDegree( key.Key( theKey ), note.Note( 'C0' ) ), theDegree )
-      
+
+#-------------------------------------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+class TestChromaticScaleDegreeTable( unittest.TestCase ):
+   # Checks the lookup table in chromaticScaleDegree() against the way it used
+   # to be calculated, with a music21 Interval, for every pair of spellings
+   # from double-flat to double-sharp.
+   spellings = [step + accidental for step in 'CDEFGAB' for accidental in ['--', '-', '', '#', '##']]
+
+   def intervalScaleDegree( self, theKey, theNote ):
+      # put the unknown pitch in the octave above the tonic, so we always get
+      # an ascending simple interval
+      tonicPitch = pitch.Pitch( theKey )
+      tonicPitch.octave = 4
+      unknownPitch = pitch.Pitch( theNote )
+      if 'CDEFGAB'.index( unknownPitch.step ) >= 'CDEFGAB'.index( tonicPitch.step ):
+         unknownPitch.octave = 4
+      else:
+         unknownPitch.octave = 5
+      try:
+         mInt = interval.notesToInterval( tonicPitch, unknownPitch ).name
+      except interval.IntervalException:
+         return ""
+      # same as the old chromaticScaleDegree()
+      if ( 2 == len( mInt ) ):
+         if ( 'M' == mInt[0] or 'P' == mInt[0] ):
+            return mInt[1]
+         elif ( 'm' == mInt[0] ):
+            return '-' + mInt[1]
+         elif ( 'A' == mInt[0] ):
+            return '#' + mInt[1]
+         elif ( 'd' == mInt[0] ):
+            if ( mInt[1] in '145' ):
+               return '-' + mInt[1]
+            else:
+               return '--' + mInt[1]
+      elif ( 3 == len( mInt ) ):
+         if ( 'AA' == mInt[0:2] ):
+            return '##' + mInt[2]
+         elif ( 'dd' == mInt[0:2] ):
+            return '--' + mInt[2]
+      return ""
+
+   def test_all_spellings( self ):
+      for theKey in self.spellings:
+         tonicKey = key.Key( theKey )
+         for theNote in self.spellings:
+            self.assertEqual( chromaticScaleDegree( tonicKey, pitch.Pitch( theNote ) ), \
+                              self.intervalScaleDegree( theKey, theNote ), \
+                              theNote + " in " + theKey )
+
+   def test_outside_table( self ):
+      # triple-sharps are calculated rather than looked up
+      self.assertEqual( chromaticScaleDegree( key.Key( 'D' ), pitch.Pitch( 'C###' ) ), '##7' )
+      self.assertEqual( chromaticScaleDegree( key.Key( 'D' ), pitch.Pitch( 'F###' ) ), '##3' )
+      # microtones can't be labelled
+      self.assertEqual( chromaticScaleDegree( key.Key( 'C' ), pitch.Pitch( 'E~' ) ), '' )
 #-------------------------------------------------------------------------------
 
 
@@ -325,6 +387,17 @@ class TestHarmonicFunction( unittest.TestCase ):
       self.assertEqual( str(HarmonicFunction.Tonic()), 'Tonic' )
       self.assertEqual( str(HarmonicFunction.Dominant()), 'Dominant' )
       self.assertEqual( str(HarmonicFunction.Unknown()), 'Unknown function' )
+   
+   def test_codes( self ):
+      for function in [HarmonicFunction.Subdominant, HarmonicFunction.Tonic, HarmonicFunction.Dominant, HarmonicFunction.Unknown]:
+         self.assertEqual( HarmonicFunction.fromCode( HarmonicFunction.toCode( function ) ), function )
+         self.assertEqual( HarmonicFunction.toName( function ), str(function()) )
+      self.assertEqual( HarmonicFunction.toCode( HarmonicFunction.Unknown ), 0 )
+      self.assertEqual( HarmonicFunction.toCode( HarmonicFunction.Subdominant ) | HarmonicFunction.toCode( HarmonicFunction.Tonic ) | \
+                        HarmonicFunction.toCode( HarmonicFunction.Dominant ), 7 )
+      self.assertRaises( NonsensicalInputError, HarmonicFunction.toCode, 'argh' )
+      self.assertRaises( NonsensicalInputError, HarmonicFunction.toName, FunctionalRole.Base )
+      self.assertRaises( NonsensicalInputError, HarmonicFunction.fromCode, 3 )
 #-------------------------------------------------------------------------------
 
 
@@ -343,6 +416,15 @@ class TestFunctionalRole( unittest.TestCase ):
       self.assertEqual( str(FunctionalRole.Agent()), 'agent' )
       self.assertEqual( str(FunctionalRole.Associate()), 'associate' )
       self.assertEqual( str(FunctionalRole.Unknown()), 'unknown role' )
+   
+   def test_codes( self ):
+      for role in [FunctionalRole.Base, FunctionalRole.Agent, FunctionalRole.Associate, FunctionalRole.Unknown]:
+         self.assertEqual( FunctionalRole.fromCode( FunctionalRole.toCode( role ) ), role )
+         self.assertEqual( FunctionalRole.toName( role ), str(role()) )
+      self.assertEqual( len(set( [FunctionalRole.toCode( role ) for role in FunctionalRole._BY_CODE] )), 4 )
+      self.assertRaises( NonsensicalInputError, FunctionalRole.toCode, HarmonicFunction.Tonic )
+      self.assertRaises( NonsensicalInputError, FunctionalRole.fromCode, 4 )
+      self.assertRaises( NonsensicalInputError, FunctionalRole.fromCode, 'ba' )
 #-------------------------------------------------------------------------------
 
 
@@ -361,6 +443,12 @@ class TestRelativeVoicePosition( unittest.TestCase ):
       self.assertEqual( str(RelativeVoicePosition.Middle()), 'middle' )
       self.assertEqual( str(RelativeVoicePosition.Lowest()), 'lowest' )
       self.assertEqual( str(RelativeVoicePosition.Solo()), 'solo' )
+   
+   def test_codes( self ):
+      for position in [RelativeVoicePosition.Lowest, RelativeVoicePosition.Middle, RelativeVoicePosition.Highest, RelativeVoicePosition.Solo]:
+         self.assertEqual( RelativeVoicePosition.fromCode( RelativeVoicePosition.toCode( position ) ), position )
+      self.assertRaises( NonsensicalInputError, RelativeVoicePosition.toCode, 42 )
+      self.assertRaises( NonsensicalInputError, RelativeVoicePosition.fromCode, -1 )
 #-------------------------------------------------------------------------------
 
 
@@ -461,6 +549,46 @@ class TestHarmonicFunctionalNote( unittest.TestCase ):
       b = HarmonicFunctionalNote( key.Key( 'f#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
       self.assertTrue( a.equal( b ) )
       self.assertTrue( b.equal( a ) )
+   
+   def test_eq_and_hash( self ):
+      a = HarmonicFunctionalNote( key.Key( 'F#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      b = HarmonicFunctionalNote( key.Key( 'f#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      c = HarmonicFunctionalNote( key.Key( 'F#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '-7' )
+      self.assertTrue( a == b )
+      self.assertFalse( a != b )
+      self.assertEqual( hash(a), hash(b) )
+      self.assertTrue( a != c )
+      self.assertFalse( a == c )
+      self.assertFalse( a == '^7 as Dominant agent in F#' )
+      self.assertEqual( len( set( [a, b, c] ) ), 2 )
+      self.assertEqual( { a : 'yes' }[b], 'yes' )
+   
+   def test_intern( self ):
+      a = HarmonicFunctionalNote.intern( key.Key( 'F#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      b = HarmonicFunctionalNote.intern( key.Key( 'f#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      c = HarmonicFunctionalNote.intern( key.Key( 'F#' ), HarmonicFunction.Dominant, FunctionalRole.Base, '7' )
+      self.assertTrue( a is b )
+      self.assertFalse( a is c )
+      self.assertTrue( a == HarmonicFunctionalNote( key.Key( 'F#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' ) )
+   
+   def test_slots( self ):
+      a = HarmonicFunctionalNote( key.Key( 'C' ), HarmonicFunction.Tonic, FunctionalRole.Base, '1' )
+      self.assertRaises( AttributeError, setattr, a, 'somethingElse', 5 )
+   
+   def test_getTonicName( self ):
+      a = HarmonicFunctionalNote( key.Key( 'e-' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      self.assertEqual( a.getTonicName(), 'E-' )
+      self.assertEqual( a.getLabel(), 'E-:Dag' )
+      self.assertEqual( HarmonicFunctionalNote( internKey( 'B' ), HarmonicFunction.Tonic, FunctionalRole.Base, '1' ).getTonicName(), 'B' )
+   
+   def test_lazy_strings( self ):
+      a = HarmonicFunctionalNote( key.Key( 'E-' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      self.assertEqual( a._stringRep, None )
+      self.assertEqual( a._label, None )
+      self.assertEqual( str(a), '^7 as Dominant agent in E-' )
+      self.assertTrue( str(a) is str(a) )
+      self.assertEqual( a.getLabel(), 'E-:Dag' )
+      self.assertTrue( a.getLabel() is a.getLabel() )
 #-------------------------------------------------------------------------------   
 
 
@@ -672,6 +800,41 @@ class TestHarmonicFunctionalChord( unittest.TestCase ):
       tester2 = HarmonicFunctionalChord( a, [d,b,a,c] ) # d is added
       self.assertEqual( tester1.equal( tester2 ), False )
       self.assertEqual( tester2.equal( tester1 ), False )
+   
+   def test_equal_duplicates( self ):
+      Tba = HarmonicFunctionalNote( key.Key('C'), self.T, self.bas, '1' )
+      Tag = HarmonicFunctionalNote( key.Key('C'), self.T, self.age, '3' )
+      Tas = HarmonicFunctionalNote( key.Key('C'), self.T, self.ass, '5' )
+      # the same notes, but not the same number of times
+      tester1 = HarmonicFunctionalChord( Tba, [Tag] )
+      tester2 = HarmonicFunctionalChord( Tba, [Tag,Tag] )
+      self.assertEqual( tester1.equal( tester2 ), False )
+      self.assertEqual( tester2.equal( tester1 ), False )
+      tester1 = HarmonicFunctionalChord( Tba, [Tag,Tas,Tas] )
+      tester2 = HarmonicFunctionalChord( Tba, [Tag,Tag,Tas] )
+      self.assertEqual( tester1.equal( tester2 ), False )
+      self.assertEqual( tester2.equal( tester1 ), False )
+      self.assertEqual( tester1.equal( 'T(1)' ), False )
+   
+   def test_eq_and_hash( self ):
+      Tba = HarmonicFunctionalNote( key.Key('C'), self.T, self.bas, '1' )
+      Tag = HarmonicFunctionalNote( key.Key('C'), self.T, self.age, '3' )
+      Tas = HarmonicFunctionalNote( key.Key('c'), self.T, self.ass, '5' )
+      Dba = HarmonicFunctionalNote( key.Key('C'), self.D, self.bas, '5' )
+      tester1 = HarmonicFunctionalChord( Tba, [Tag,Tas,Tba] )
+      tester2 = HarmonicFunctionalChord( Tba, [Tba,Tas,Tag] )
+      tester3 = HarmonicFunctionalChord( Dba, [Tag,Tas,Tba] )
+      self.assertTrue( tester1 == tester2 )
+      self.assertFalse( tester1 != tester2 )
+      self.assertEqual( hash(tester1), hash(tester2) )
+      self.assertTrue( tester1 != tester3 )
+      # count identical chords with a dict
+      counts = {}
+      for theChord in [tester1, tester2, tester3, tester1]:
+         counts[theChord] = counts.get( theChord, 0 ) + 1
+      self.assertEqual( len(counts), 2 )
+      self.assertEqual( counts[tester2], 3 )
+      self.assertEqual( counts[tester3], 1 )
 
    def test_getVerboseLabel( self ):
       Tag = HarmonicFunctionalNote( key.Key( 'C' ), self.T, self.age, '3' )
@@ -716,6 +879,42 @@ class TestHarmonicFunctionalChord( unittest.TestCase ):
       self.assertEqual( a.getOtherFunctionalNotes(), [] )
       a = HarmonicFunctionalChord( Tba )
       self.assertEqual( a.getOtherFunctionalNotes(), [] )
+   
+   def test_getFunctionMask( self ):
+      Tba = HarmonicFunctionalNote( key.Key( 'C' ), self.T, self.bas, '1' )
+      Sag = HarmonicFunctionalNote( key.Key( 'C' ), self.S, self.age, '6' )
+      Dag = HarmonicFunctionalNote( key.Key( 'C' ), self.D, self.age, '7' )
+      Uun = HarmonicFunctionalNote( key.Key( 'C' ), self.U, self.unk, '#4' )
+      self.assertEqual( HarmonicFunctionalChord( Tba ).getFunctionMask(), 2 )
+      self.assertEqual( HarmonicFunctionalChord( Tba, [Sag, Tba] ).getFunctionMask(), 3 )
+      self.assertEqual( HarmonicFunctionalChord( Uun, [Dag, Uun] ).getFunctionMask(), 4 )
+      a = HarmonicFunctionalChord( Dag, [Sag, Tba, Uun] )
+      self.assertEqual( a.getFunctionMask(), 7 )
+      self.assertEqual( a.getLabel(), 'D^ST(7)' )
+   
+   def test_lazy_labels( self ):
+      Sba = HarmonicFunctionalNote( key.Key( 'C' ), self.S, self.bas, '4' )
+      Tag = HarmonicFunctionalNote( key.Key( 'C' ), self.T, self.age, '3' )
+      a = HarmonicFunctionalChord( Sba, [Tag] )
+      self.assertEqual( a._label, None )
+      self.assertEqual( a._verboseLabel, None )
+      self.assertEqual( a._functionMask, None )
+      self.assertEqual( str(a), 'S^T(4)' )
+      self.assertTrue( a.getLabel() is a.getLabel() )
+      self.assertEqual( a.getVerboseLabel(), 'C:Sba,C:Tag' )
+      self.assertTrue( a.getVerboseLabel() is a.getVerboseLabel() )
+      # every combination of functions
+      import harrisonHarmony
+      functions = [self.U, self.S, self.T, self.D]
+      for bass in functions:
+         for others in [[], [self.S], [self.T, self.D], [self.U, self.D, self.S, self.T]]:
+            chord = HarmonicFunctionalChord( HarmonicFunctionalNote( key.Key( 'C' ), bass, self.bas, '1' ), \
+                                             [HarmonicFunctionalNote( key.Key( 'C' ), other, self.age, '3' ) for other in others] )
+            expected = HarmonicFunction.toLetter( bass )
+            extra = [HarmonicFunction.toLetter( f ) for f in [self.S, self.T, self.D] if f in others and f != bass]
+            if len(extra) > 0:
+               expected += '^' + ''.join( extra )
+            self.assertEqual( chord.getLabel(), expected + '(1)' )
 #-------------------------------------------------------------------------------
 
 #-------------------------------------------------------------------------------
@@ -973,6 +1172,170 @@ class TestPossibleFunctionsFromScaleDegree( unittest.TestCase ):
 
 
 
+#-------------------------------------------------------------------------------
+class TestInternKey( unittest.TestCase ):
+   def test_shared( self ):
+      a = internKey( 'F#' )
+      self.assertTrue( a is internKey( 'F#' ) )
+      self.assertEqual( a.tonic.name, 'F#' )
+      self.assertEqual( a.mode, 'major' )
+      b = internKey( 'F#', 'minor' )
+      self.assertFalse( a is b )
+      self.assertEqual( b.tonic.name, 'F#' )
+      self.assertEqual( b.mode, 'minor' )
+      self.assertTrue( b is internKey( 'F#', 'minor' ) )
+   
+   def test_used_for_applied_keys( self ):
+      import harrisonHarmony
+      self.assertTrue( harrisonHarmony._appliedKey( key.Key( 'C' ), '#4' ) is internKey( 'G' ) )
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+class TestAppliedKey( unittest.TestCase ):
+   def test_same_as_transposing( self ):
+      import harrisonHarmony
+      for theKey in [key.Key( 'C' ), key.Key( 'E-' ), key.Key( 'F#' ), key.Key( 'a' ), key.Key( 'b-' )]:
+         for number in range( 1, 8 ):
+            for accidental, appliedInterval in [( '-', 'M-6' ), ( '#', 'M2' )]:
+               expected = pitch.Pitch( theKey.getPitches()[number-1].name ).transpose( appliedInterval ).name
+               appliedKey = harrisonHarmony._appliedKey( theKey, accidental + str(number) )
+               self.assertEqual( appliedKey.tonic.name, expected )
+               self.assertEqual( appliedKey.mode, 'major' )
+   
+   def test_shared( self ):
+      import harrisonHarmony
+      # both are G
+      self.assertTrue( harrisonHarmony._appliedKey( key.Key( 'C' ), '#4' ) is harrisonHarmony._appliedKey( key.Key( 'F' ), '#1' ) )
+      self.assertTrue( harrisonHarmony._appliedKey( key.Key( 'C' ), '-3' ) is harrisonHarmony._appliedKey( key.Key( 'C' ), '-3' ) )
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+class TestCachedPossibleFunctionsFromScaleDegree( unittest.TestCase ):
+   def setUp( self ):
+      possibleFunctionsCache.clear()
+      self.positions = [RelativeVoicePosition.Lowest, RelativeVoicePosition.Middle, RelativeVoicePosition.Highest]
+      self.degrees = ['1', '2', '3', '4', '5', '6', '7', '-2', '-3', '-6', '-7', '#1', '#4', '#5']
+   
+   def test_same_as_uncached( self ):
+      for theKey in ['C', 'E-', 'F#', 'a']:
+         for degree in self.degrees:
+            for position in self.positions:
+               uncached = possibleFunctionsFromScaleDegree( key.Key( theKey ), degree, position )
+               cached = cachedPossibleFunctionsFromScaleDegree( key.Key( theKey ), degree, position )
+               self.assertTrue( isinstance( cached, tuple ) )
+               self.assertEqual( len(cached), len(uncached) )
+               for i in range(len(cached)):
+                  self.assertTrue( isinstance( cached[i], tuple ) )
+                  self.assertEqual( str(list(cached[i])), str(uncached[i]) )
+   
+   def test_shared_result( self ):
+      a = cachedPossibleFunctionsFromScaleDegree( key.Key( 'G' ), '5', RelativeVoicePosition.Middle )
+      b = cachedPossibleFunctionsFromScaleDegree( key.Key( 'G' ), '5', RelativeVoicePosition.Middle )
+      c = cachedPossibleFunctionsFromScaleDegree( key.Key( 'g' ), '5', RelativeVoicePosition.Middle )
+      self.assertTrue( a is b )
+      # the mode is part of the key
+      self.assertFalse( a is c )
+      d = cachedPossibleFunctionsFromScaleDegree( key.Key( 'G' ), '5', RelativeVoicePosition.Lowest )
+      self.assertFalse( a is d )
+      self.assertEqual( possibleFunctionsCache.getHits(), 1 )
+      self.assertEqual( possibleFunctionsCache.getMisses(), 3 )
+   
+   def test_mode( self ):
+      # the applied key of #6 is a major second above ^6 of the scale
+      major = cachedPossibleFunctionsFromScaleDegree( key.Key( 'A' ), '#6', RelativeVoicePosition.Middle )
+      minor = cachedPossibleFunctionsFromScaleDegree( key.Key( 'a' ), '#6', RelativeVoicePosition.Middle )
+      self.assertEqual( str(list(minor[0])), str(possibleFunctionsFromScaleDegree( key.Key( 'a' ), '#6', RelativeVoicePosition.Middle )[0]) )
+      majorNames = [possibility[0].getTonicName() for possibility in major]
+      minorNames = [possibility[0].getTonicName() for possibility in minor]
+      self.assertTrue( 'G#' in majorNames )
+      self.assertFalse( 'G' in majorNames )
+      self.assertTrue( 'G' in minorNames )
+      self.assertFalse( 'G#' in minorNames )
+   
+   def test_bounded( self ):
+      possibleFunctionsCache.setCapacity( 3 )
+      try:
+         for degree in self.degrees:
+            cachedPossibleFunctionsFromScaleDegree( key.Key( 'C' ), degree, RelativeVoicePosition.Middle )
+         self.assertEqual( len(possibleFunctionsCache), 3 )
+         self.assertEqual( possibleFunctionsCache.getMisses(), len(self.degrees) )
+      finally:
+         possibleFunctionsCache.setCapacity( 256 )
+#-------------------------------------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+class TestLeastRecentlyUsedCache( unittest.TestCase ):
+   def test_get_put( self ):
+      a = LeastRecentlyUsedCache( 4 )
+      self.assertEqual( a.get( 'x' ), None )
+      self.assertEqual( a.get( 'x', 'default' ), 'default' )
+      a.put( 'x', 1 )
+      self.assertEqual( a.get( 'x' ), 1 )
+      a.put( 'x', 2 )
+      self.assertEqual( a.get( 'x' ), 2 )
+      self.assertEqual( len(a), 1 )
+      self.assertTrue( 'x' in a )
+      self.assertEqual( a.getHits(), 2 )
+      self.assertEqual( a.getMisses(), 2 )
+      self.assertEqual( a.getHitRate(), 0.5 )
+   
+   def test_eviction( self ):
+      a = LeastRecentlyUsedCache( 2 )
+      a.put( 'x', 1 )
+      a.put( 'y', 2 )
+      a.get( 'x' ) # now 'y' is the least recently used
+      a.put( 'z', 3 )
+      self.assertTrue( 'x' in a )
+      self.assertFalse( 'y' in a )
+      self.assertTrue( 'z' in a )
+      a.setCapacity( 1 )
+      self.assertEqual( len(a), 1 )
+      self.assertTrue( 'z' in a )
+   
+   def test_clear( self ):
+      a = LeastRecentlyUsedCache( 2 )
+      a.put( 'x', 1 )
+      a.get( 'x' )
+      a.clear()
+      self.assertEqual( len(a), 0 )
+      self.assertEqual( a.getHits(), 0 )
+      self.assertEqual( a.getHitRate(), 0.0 )
+   
+   def test_bad_capacity( self ):
+      self.assertRaises( NonsensicalInputError, LeastRecentlyUsedCache, 0 )
+      self.assertRaises( NonsensicalInputError, LeastRecentlyUsedCache( 1 ).setCapacity, -3 )
+   
+   def test_save_and_load( self ):
+      directory = tempfile.mkdtemp()
+      pathname = os.path.join( directory, 'cache.pickle' )
+      try:
+         a = LeastRecentlyUsedCache( 3 )
+         self.assertEqual( a.load( pathname ), 0 ) # doesn't exist yet
+         a.put( ( 'C', ('1','3','5'), 'concise' ), 'T(1)' )
+         a.put( 'x', 1 )
+         a.put( 'y', 2 )
+         a.save( pathname )
+         b = LeastRecentlyUsedCache( 2 )
+         self.assertEqual( b.load( pathname ), 3 )
+         # the least recently used one didn't fit
+         self.assertEqual( len(b), 2 )
+         self.assertEqual( b.get( 'x' ), 1 )
+         self.assertEqual( b.get( 'y' ), 2 )
+         self.assertEqual( os.listdir( directory ), ['cache.pickle'] )
+         # not a cache file
+         with open( pathname, 'wb' ) as theFile:
+            theFile.write( b'not a pickle' )
+         self.assertRaises( NonsensicalInputError, b.load, pathname )
+      finally:
+         for name in os.listdir( directory ):
+            os.remove( os.path.join( directory, name ) )
+         os.rmdir( directory )
+#-------------------------------------------------------------------------------
+
+
+
 #-------------------------------------------------------------------------------
 class TestReconcilePossibleFunctions( unittest.TestCase ):
    @staticmethod
@@ -1057,6 +1420,24 @@ class TestReconcilePossibleFunctions( unittest.TestCase ):
       self.hf7 = possibleFunctionsFromScaleDegree(self.CM,'-7',self.hig)
    # End setUp()
    
+   def test_many_voices( self ):
+      # the lowest voice depends on a higher voice, and the middle ^5 depends
+      # on a ^7 above it
+      degrees = ['2','7','4','5','2','7','4','5','2','7','4','5']
+      functions = [possibleFunctionsFromScaleDegree(self.CM,degrees[0],self.low)]
+      for degree in degrees[1:-1]:
+         functions.append( possibleFunctionsFromScaleDegree(self.CM,degree,self.mid) )
+      functions.append( possibleFunctionsFromScaleDegree(self.CM,degrees[-1],self.hig) )
+      result = reconcilePossibleFunctions( functions )
+      self.assertEqual( result.getLabel(), 'D(2)' )
+      self.assertEqual( result.getVerboseLabel(), ','.join( ['C:Das,C:Dag,C:Uun,C:Dba'] * 3 ) )
+      # the cached, frozen possibilities give the same answer
+      functions = [cachedPossibleFunctionsFromScaleDegree(self.CM,degrees[0],self.low)]
+      for degree in degrees[1:-1]:
+         functions.append( cachedPossibleFunctionsFromScaleDegree(self.CM,degree,self.mid) )
+      functions.append( cachedPossibleFunctionsFromScaleDegree(self.CM,degrees[-1],self.hig) )
+      self.assertEqual( reconcilePossibleFunctions( functions ).getVerboseLabel(), result.getVerboseLabel() )
+
    def test_primary_root_and_first_inversion( self ):
       # Tonic
       self.assertTrue( self.equalsMaker( reconcilePossibleFunctions( [self.l1,self.m3,self.h5] ), \
@@ -1410,6 +1791,717 @@ class TestLabelThisChord( unittest.TestCase ):
       self.assertEqual( labelThisChord( self.FM, [self.pF,self.pB,self.pG,self.pbD] ), "S(6)" )
 #-------------------------------------------------------------------------------
 
+#-------------------------------------------------------------------------------
+class TestLabelChords( unittest.TestCase ):
+   def setUp( self ):
+      self.CM = key.Key( "C" )
+      self.chords = [['G4','E4','C3'], ['C4','A4','F3'], ['D4','B4','G3'], ['G4','E4','C4','G3'], \
+                     ['A4','B4','C3'], ['A4','D4','C3'], ['E4','C4','D3'], ['G4','E4','C3'], \
+                     ['E-4','A-4','C4','F3'], ['F#4','A4','C4','D3'], ['C4','C5','C3']]
+   
+   def test_same_as_labelThisChord( self ):
+      for verbosity in ['concise', 'verbose']:
+         expected = [labelThisChord( self.CM, [pitch.Pitch( name ) for name in theChord], verbosity ) for theChord in self.chords]
+         self.assertEqual( labelChords( self.CM, self.chords, verbosity ), expected )
+   
+   def test_kinds_of_chord( self ):
+      expected = ['T(1)', 'D(5)', 'D(5)', 'D(5)', 'D(5)']
+      chords = [chord.Chord( ['C3','E4','G4'] ), \
+                [note.Note( 'G3' ), note.Note( 'B3' ), note.Note( 'D4' )], \
+                [pitch.Pitch( 'G3' ), pitch.Pitch( 'B3' ), pitch.Pitch( 'D4' )], \
+                ['D4','B3','G3'], \
+                [(62, 'D'), (59, 'B'), (55, 'G')]]
+      self.assertEqual( labelChords( self.CM, chords ), expected )
+      # it can be any iterable
+      self.assertEqual( labelChords( self.CM, iter( chords ) ), expected )
+      self.assertEqual( labelChords( self.CM, [] ), [] )
+   
+   def test_without_numpy( self ):
+      import harrisonHarmony
+      expected = labelChords( self.CM, self.chords, 'verbose' )
+      savedNumpy = harrisonHarmony.numpy
+      harrisonHarmony.numpy = None
+      try:
+         self.assertEqual( labelChords( self.CM, self.chords, 'verbose' ), expected )
+      finally:
+         harrisonHarmony.numpy = savedNumpy
+   
+   def test_incorrect_verbosity_argument( self ):
+      self.assertRaises( NonsensicalInputError, labelChords, self.CM, self.chords, 'asdf' )
+   
+   def test_label_cache( self ):
+      labelCache.clear()
+      labelChords( self.CM, self.chords )
+      # two chords are the same
+      self.assertEqual( labelCache.getMisses(), len(self.chords) - 1 )
+      self.assertEqual( labelCache.getHits(), 0 )
+      self.assertEqual( labelThisChord( self.CM, [pitch.Pitch( 'C3' ), pitch.Pitch( 'E4' ), pitch.Pitch( 'G4' )] ), 'T(1)' )
+      self.assertEqual( labelCache.getHits(), 1 )
+      self.assertEqual( cachedLabelScaleDegrees( self.CM, ['1','3','5'] ), 'T(1)' )
+      self.assertEqual( labelCache.getHits(), 2 )
+      # the verbosity is part of the key
+      self.assertEqual( cachedLabelScaleDegrees( self.CM, ['1','3','5'], 'verbose' ), 'C:Tba,C:Tag,C:Tas' )
+      self.assertEqual( labelCache.getHits(), 2 )
+   
+   def test_label_cache_mode( self ):
+      # so is the mode, since the applied keys depend on it
+      theChord = ['E3','C4','E4','D5','F##5','B-5']
+      labelCache.clear()
+      possibleFunctionsCache.clear()
+      expected = labelThisChord( key.Key( 'a' ), theChord, 'verbose' )
+      labelCache.clear()
+      possibleFunctionsCache.clear()
+      inMajor = labelThisChord( key.Key( 'A' ), theChord, 'verbose' )
+      self.assertEqual( labelThisChord( key.Key( 'a' ), theChord, 'verbose' ), expected )
+      self.assertNotEqual( inMajor, expected )
+   
+   def test_parallel( self ):
+      for verbosity in ['concise', 'verbose']:
+         labelCache.clear()
+         expected = labelChords( self.CM, self.chords, verbosity )
+         labelCache.clear()
+         self.assertEqual( labelChords( self.CM, self.chords, verbosity, 3 ), expected )
+         # the labels from the workers go in the cache
+         self.assertEqual( len(labelCache), len(self.chords) - 1 )
+         self.assertEqual( labelChords( self.CM, self.chords, verbosity, 3 ), expected )
+         self.assertEqual( labelCache.getHits(), len(self.chords) - 1 )
+      # in a minor key, the workers use the minor scale for applied keys too
+      am = key.Key( 'a' )
+      chords = self.chords + [['E3','C4','E4','D5','F##5','B-5']]
+      for verbosity in ['concise', 'verbose']:
+         labelCache.clear()
+         possibleFunctionsCache.clear()
+         expected = labelChords( am, chords, verbosity )
+         labelCache.clear()
+         self.assertEqual( labelChords( am, chords, verbosity, 2 ), expected )
+   
+   def test_labelScaleDegrees( self ):
+      self.assertEqual( labelScaleDegrees( self.CM, ['1','3','5'] ), 'T(1)' )
+      self.assertEqual( labelScaleDegrees( self.CM, ('1','3','5'), 'verbose' ), 'C:Tba,C:Tag,C:Tas' )
+      self.assertEqual( labelScaleDegrees( self.CM, ['1'], 'verbose' ), 'C:Tba,C:Uun' )
+      self.assertRaises( NonsensicalInputError, labelScaleDegrees, self.CM, ['1','3','5'], 'asdf' )
+#-------------------------------------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+class TestAnalyzeScore( unittest.TestCase ):
+   def setUp( self ):
+      self.chords = [['C3','E4','G4'], ['F3','C4','A4'], ['G3','D4','B4'], ['C3','E4','G4']]
+      self.part = stream.Part()
+      for number in range( 2 ):
+         measure = stream.Measure( number = number + 1 )
+         for pitches in self.chords[2*number:2*number+2]:
+            measure.append( chord.Chord( pitches, quarterLength = 2.0 ) )
+         self.part.append( measure )
+   
+   def test_results( self ):
+      results = analyzeScore( self.part )
+      self.assertEqual( results.getScore(), None )
+      self.assertTrue( results.getChordifiedScore() is self.part )
+      whatKey = results.getKey()
+      self.assertEqual( results.getLabels(), labelChords( whatKey, self.chords ) )
+      self.assertEqual( results.getLabels( 'verbose' ), labelChords( whatKey, self.chords, 'verbose' ) )
+      self.assertRaises( NonsensicalInputError, results.getLabels, 'asdf' )
+      chords = results.getChords()
+      self.assertEqual( [theChord.measureNumber for theChord in chords], [1, 1, 2, 2] )
+      self.assertEqual( [theChord.offset for theChord in chords], [0.0, 2.0, 0.0, 2.0] )
+      self.assertEqual( [theChord.measureOffset for theChord in chords], [0.0, 0.0, 4.0, 4.0] )
+      self.assertEqual( chords[0].scaleDegrees, tuple( [chromaticScaleDegree( whatKey, pitch.Pitch( name ) ) for name in self.chords[0]] ) )
+      # nothing is annotated until we ask
+      self.assertEqual( self.part[0][0].lyric, None )
+      results.annotate()
+      self.assertEqual( self.part[0][0].lyric, chords[0].conciseLabel )
+   
+   def makeScore( self ):
+      # Returns a Score with the chords in the upper part, and a bass part
+      # whose second measure is a single note.
+      upper = stream.Part()
+      bass = stream.Part()
+      for number, bassNotes in [( 1, ['C3', 'F3'] ), ( 2, ['G3'] )]:
+         upperMeasure = stream.Measure( number = number )
+         for pitches in self.chords[2*number-2:2*number]:
+            upperMeasure.append( chord.Chord( pitches[1:], quarterLength = 2.0 ) )
+         upper.append( upperMeasure )
+         bassMeasure = stream.Measure( number = number )
+         for name in bassNotes:
+            bassMeasure.append( note.Note( name, quarterLength = 4.0 / len(bassNotes) ) )
+         bass.append( bassMeasure )
+      score = stream.Score()
+      score.insert( 0, upper )
+      score.insert( 0, bass )
+      return score
+   
+   def test_annotate_score( self ):
+      score = self.makeScore()
+      bass = score.parts[1]
+      results = analyzeScore( score )
+      self.assertEqual( len(results.getChords()), 4 )
+      # the last chord doesn't start with a bass note
+      self.assertEqual( results.annotate(), 1 )
+      self.assertEqual( [element.lyric for element in bass.flatten().notes], results.getLabels()[:3] )
+      # doing it again doesn't do anything more
+      self.assertEqual( results.annotate(), 1 )
+   
+   def test_analysis_cache( self ):
+      directory = tempfile.mkdtemp()
+      cacheDirectory = os.path.join( directory, 'cache' )
+      pathname = os.path.join( directory, 'score.xml' )
+      try:
+         self.makeScore().write( 'musicxml', fp = pathname )
+         settings = HarrisonHarmonySettings()
+         expected = analyzeScore( pathname, settings )
+         self.assertFalse( os.path.exists( cacheDirectory ) )
+         settings.parsePropertySet( 'analysisCacheDirectory ' + cacheDirectory )
+         first = analyzeScore( pathname, settings )
+         self.assertEqual( len(os.listdir( cacheDirectory )), 1 )
+         second = analyzeScore( pathname, settings )
+         self.assertEqual( second.getChords(), expected.getChords() )
+         self.assertEqual( second.getKey(), expected.getKey() )
+         self.assertEqual( second.getChordifiedScore(), None )
+         # the score is only parsed when it's needed
+         self.assertEqual( second._score, None )
+         self.assertEqual( second.annotate(), expected.annotate() )
+         self.assertTrue( isinstance( second.getScore(), stream.Score ) )
+         # different settings are cached separately
+         settings.parsePropertySet( 'mergeTiedChords True' )
+         self.assertEqual( analyzeScore( pathname, settings ).getChords(), expected.getChords() )
+         self.assertEqual( len(os.listdir( cacheDirectory )), 2 )
+         # so is a changed file
+         score = self.makeScore()
+         score.parts[1].measure( 2 ).notes[0].pitch = pitch.Pitch( 'G2' )
+         score.write( 'musicxml', fp = pathname )
+         settings.parsePropertySet( 'analysisCacheSize 2' )
+         analyzeScore( pathname, settings )
+         # but the least recently used was thrown away
+         self.assertEqual( len(os.listdir( cacheDirectory )), 2 )
+      finally:
+         for subdirectory, subdirectories, filenames in os.walk( directory, topdown = False ):
+            for name in filenames:
+               os.remove( os.path.join( subdirectory, name ) )
+            for name in subdirectories:
+               os.rmdir( os.path.join( subdirectory, name ) )
+         os.rmdir( directory )
+   
+   def test_analysis_cache_key( self ):
+      import harrisonHarmony
+      directory = tempfile.mkdtemp()
+      pathname = os.path.join( directory, 'score.xml' )
+      try:
+         self.makeScore().write( 'musicxml', fp = pathname )
+         settings = HarrisonHarmonySettings()
+         first = harrisonHarmony._analysisCacheKey( pathname, settings )
+         # both labels are kept, so these don't matter
+         settings.parsePropertySet( 'chordLabelVerbosity verbose' )
+         settings.parsePropertySet( 'annotateChordifiedScore True' )
+         self.assertEqual( harrisonHarmony._analysisCacheKey( pathname, settings ), first )
+         # but these change the chords or key
+         settings.parsePropertySet( 'chordifyScore False' )
+         self.assertNotEqual( harrisonHarmony._analysisCacheKey( pathname, settings ), first )
+         settings.parsePropertySet( 'chordifyScore True' )
+         settings.parsePropertySet( 'concurrentKeyFinding True' )
+         self.assertNotEqual( harrisonHarmony._analysisCacheKey( pathname, settings ), first )
+         settings.parsePropertySet( 'concurrentKeyFinding False' )
+         # and so does the version of music21
+         savedVersion = harrisonHarmony._MUSIC21_VERSION
+         harrisonHarmony._MUSIC21_VERSION = savedVersion + '-other'
+         try:
+            self.assertNotEqual( harrisonHarmony._analysisCacheKey( pathname, settings ), first )
+         finally:
+            harrisonHarmony._MUSIC21_VERSION = savedVersion
+         self.assertEqual( harrisonHarmony._analysisCacheKey( os.path.join( directory, 'nothing.xml' ), settings ), None )
+      finally:
+         os.remove( pathname )
+         os.rmdir( directory )
+   
+   def test_score_cache( self ):
+      import harrisonHarmony
+      directory = tempfile.mkdtemp()
+      cacheDirectory = os.path.join( directory, 'cache' )
+      pathname = os.path.join( directory, 'score.xml' )
+      try:
+         self.makeScore().write( 'musicxml', fp = pathname )
+         settings = HarrisonHarmonySettings()
+         settings.parsePropertySet( 'scoreCacheDirectory ' + cacheDirectory )
+         self.assertEqual( harrisonHarmony._readCachedRecords( cacheDirectory, pathname, settings ), None )
+         expected = analyzeScore( pathname, settings )
+         self.assertEqual( len(os.listdir( cacheDirectory )), 1 )
+         cached = harrisonHarmony._readCachedRecords( cacheDirectory, pathname, settings )
+         self.assertEqual( cached[0], expected.getKey() )
+         self.assertEqual( len(cached[1]), len(expected.getChords()) )
+         # now it isn't parsed, but it's labelled again
+         second = analyzeScore( pathname, settings )
+         self.assertEqual( second._score, None )
+         self.assertEqual( second.getChords(), expected.getChords() )
+         self.assertEqual( second.annotate(), expected.annotate() )
+         # with different settings, it's cached separately
+         settings.parsePropertySet( 'chordifyScore False' )
+         self.assertEqual( harrisonHarmony._readCachedRecords( cacheDirectory, pathname, settings ), None )
+         analyzeScore( pathname, settings )
+         self.assertEqual( len(os.listdir( cacheDirectory )), 2 )
+         # when the file changes, it's parsed again
+         score = self.makeScore()
+         score.parts[1].measure( 2 ).notes[0].pitch = pitch.Pitch( 'G2' )
+         score.write( 'musicxml', fp = pathname )
+         # make sure it looks changed, even if it was written in the same instant
+         fileStatus = os.stat( pathname )
+         os.utime( pathname, ( fileStatus.st_atime, fileStatus.st_mtime + 10 ) )
+         self.assertEqual( harrisonHarmony._readCachedRecords( cacheDirectory, pathname, settings ), None )
+         self.assertTrue( harrisonHarmony._hasCachedRecords( cacheDirectory, pathname, settings ) )
+         analyzeScore( pathname, settings )
+         cached = harrisonHarmony._readCachedRecords( cacheDirectory, pathname, settings )
+         self.assertEqual( cached[1][2][3][0], ( 43, 'G' ) )
+      finally:
+         for subdirectory, subdirectories, filenames in os.walk( directory, topdown = False ):
+            for name in filenames:
+               os.remove( os.path.join( subdirectory, name ) )
+            for name in subdirectories:
+               os.rmdir( os.path.join( subdirectory, name ) )
+         os.rmdir( directory )
+   
+   def test_concurrent_key_finding( self ):
+      import harrisonHarmony
+      directory = tempfile.mkdtemp()
+      pathname = os.path.join( directory, 'score.xml' )
+      try:
+         self.makeScore().write( 'musicxml', fp = pathname )
+         expected = harrisonHarmony._findKey( converter.parse( pathname ) )[0]
+         self.assertEqual( harrisonHarmony._findKeyInFile( pathname )[:2], ( expected.tonic.name, expected.mode ) )
+         settings = HarrisonHarmonySettings()
+         settings.parsePropertySet( 'concurrentKeyFinding True' )
+         # the key of the original score, found in another process
+         results = analyzeScore( pathname, settings )
+         self.assertEqual( results.getKey().tonic.name, expected.tonic.name )
+         self.assertEqual( results.getLabels(), analyzeScore( pathname ).getLabels() )
+         # or in this one, if there's no file
+         results = analyzeScore( self.makeScore(), settings )
+         self.assertEqual( results.getKey().tonic.name, expected.tonic.name )
+      finally:
+         os.remove( pathname )
+         os.rmdir( directory )
+   
+   def test_analyze_measures( self ):
+      expected = analyzeScore( self.makeScore() )
+      for windowSize in [1, 2, 5]:
+         post = analyzeMeasures( self.makeScore(), windowSize = windowSize, whatKey = expected.getKey() )
+         self.assertEqual( list( post ), expected.getChords() )
+      self.assertRaises( NonsensicalInputError, list, analyzeMeasures( self.makeScore(), windowSize = 0 ) )
+      self.assertRaises( NonsensicalInputError, list, analyzeMeasures( self.part ) )
+   
+   def test_slice_score( self ):
+      import harrisonHarmony
+      score = self.makeScore()
+      expected = [( 0.0, 0.0, 1, [(48, 'C'), (64, 'E'), (67, 'G')] ), \
+                  ( 2.0, 0.0, 1, [(53, 'F'), (60, 'C'), (69, 'A')] ), \
+                  ( 0.0, 4.0, 2, [(55, 'G'), (62, 'D'), (71, 'B')] ), \
+                  ( 2.0, 4.0, 2, [(55, 'G'), (64, 'E'), (67, 'G')] )]
+      self.assertEqual( harrisonHarmony._sliceScore( score ), expected )
+      # the same as chordifying
+      self.assertEqual( harrisonHarmony._chordifiedRecords( score.chordify() )[0], expected )
+      # a chord that carries over a barline is sliced there, and rests aren't slices
+      first = stream.Measure( number = 1 )
+      first.insert( 0.0, note.Rest( quarterLength = 2.0 ) )
+      first.insert( 2.0, chord.Chord( ['C4','E4'], quarterLength = 4.0 ) )
+      part = stream.Part()
+      part.insert( 0.0, first )
+      part.insert( 4.0, stream.Measure( number = 2 ) )
+      score = stream.Score()
+      score.insert( 0, part )
+      self.assertEqual( harrisonHarmony._sliceScore( score ), \
+                        [( 2.0, 0.0, 1, [(60, 'C'), (64, 'E')] ), ( 0.0, 4.0, 2, [(60, 'C'), (64, 'E')] )] )
+   
+   def test_slice_like_chordify( self ):
+      import harrisonHarmony
+      from music21 import corpus
+      # a chorale, with voices in unison and rests
+      score = corpus.parse( 'bach/bwv66.6' )
+      self.assertEqual( harrisonHarmony._sliceScore( score ), harrisonHarmony._chordifiedRecords( score.chordify() )[0] )
+      # a grace note, triplets, and a rest in one part while the other holds
+      upper = stream.Measure( number = 1 )
+      grace = note.Note( 'D5' ).getGrace()
+      upper.append( [grace, note.Note( 'C5' )] )
+      for name in ['E4', 'G4', 'C5']:
+         upper.append( note.Note( name, quarterLength = 1.0 / 3 ) )
+      upper.append( note.Rest( quarterLength = 1.0 ) )
+      upper.append( note.Note( 'C4' ) )
+      lower = stream.Measure( number = 1 )
+      lower.append( [note.Note( 'C4', quarterLength = 3.0 ), note.Note( 'G3' )] )
+      score = stream.Score()
+      for measure in [upper, lower]:
+         part = stream.Part()
+         part.insert( 0.0, measure )
+         score.insert( 0, part )
+      expected = harrisonHarmony._chordifiedRecords( score.chordify() )[0]
+      self.assertEqual( harrisonHarmony._sliceScore( score ), expected )
+      self.assertEqual( expected[0][3], [(60, 'C'), (72, 'C'), (74, 'D')] )
+      self.assertEqual( expected[-1][3], [(55, 'G'), (60, 'C')] )
+   
+   def test_merge_ties( self ):
+      import harrisonHarmony
+      # a chord tied over the barline, then a different one
+      first = chord.Chord( ['C4','E4'], quarterLength = 4.0 )
+      first.tie = tie.Tie( 'start' )
+      second = chord.Chord( ['C4','E4'], quarterLength = 2.0 )
+      second.tie = tie.Tie( 'stop' )
+      measures = [stream.Measure( number = 1 ), stream.Measure( number = 2 )]
+      measures[0].append( first )
+      measures[1].append( second )
+      measures[1].append( chord.Chord( ['D4','F4'], quarterLength = 2.0 ) )
+      part = stream.Part()
+      part.insert( 0.0, measures[0] )
+      part.insert( 4.0, measures[1] )
+      score = stream.Score()
+      score.insert( 0, part )
+      held = [( 0.0, 0.0, 1, [(60, 'C'), (64, 'E')] ), ( 0.0, 4.0, 2, [(60, 'C'), (64, 'E')] ), \
+              ( 2.0, 4.0, 2, [(62, 'D'), (65, 'F')] )]
+      merged = [held[0], held[2]]
+      self.assertEqual( harrisonHarmony._sliceScore( score ), held )
+      self.assertEqual( harrisonHarmony._sliceScore( score, None, True ), merged )
+      records, harmonies = harrisonHarmony._chordifiedRecords( score.chordify(), None, True )
+      self.assertEqual( records, merged )
+      self.assertEqual( len(harmonies), 2 )
+      # without merging, the ties are removed
+      records, harmonies = harrisonHarmony._chordifiedRecords( score.chordify() )
+      self.assertEqual( records, held )
+      for harmony in harmonies:
+         for chordMember in harmony:
+            self.assertEqual( chordMember.tie, None )
+   
+   def test_without_chordify( self ):
+      settings = HarrisonHarmonySettings()
+      settings.parsePropertySet( 'chordifyScore False' )
+      score = self.makeScore()
+      results = analyzeScore( score, settings )
+      self.assertEqual( results.getChordifiedScore(), None )
+      self.assertEqual( results.getLabels(), labelChords( results.getKey(), [[pitches[0]] + pitches[1:] for pitches in self.chords[:3]] + [['G3','E4','G4']] ) )
+      # the labels go on the score
+      self.assertEqual( results.annotate(), 1 )
+      self.assertEqual( [element.lyric for element in score.parts[1].flatten().notes], results.getLabels()[:3] )
+      # streaming gives the same thing
+      self.assertEqual( list( analyzeMeasures( self.makeScore(), settings, 1, results.getKey() ) ), results.getChords() )
+   
+   def test_to_dict( self ):
+      import json
+      results = analyzeScore( self.part )
+      post = results.toDict()
+      self.assertEqual( post['key'], results.getKey().tonic.name )
+      self.assertEqual( len(post['chords']), 4 )
+      self.assertEqual( post['chords'][2]['measureNumber'], 2 )
+      self.assertEqual( post['chords'][2]['verboseLabel'], results.getChords()[2].verboseLabel )
+      self.assertEqual( post['chords'][2]['mode'], results.getKey().mode )
+      self.assertEqual( json.loads( json.dumps( post ) ), post )
+   
+   def test_bad_input( self ):
+      self.assertRaises( NonsensicalInputError, analyzeScore, 5 )
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+class TestLocalKeys( unittest.TestCase ):
+   def setUp( self ):
+      # a bar of C major, then G major, one chord per beat
+      chords = [[(60,'C'),(64,'E'),(67,'G')], [(65,'F'),(69,'A'),(72,'C')], [(67,'G'),(71,'B'),(74,'D')], \
+                [(60,'C'),(64,'E'),(67,'G')], [(67,'G'),(71,'B'),(74,'D')], [(62,'D'),(66,'F#'),(69,'A')], \
+                [(67,'G'),(71,'B'),(74,'D')], [(62,'D'),(66,'F#'),(69,'A')], [(67,'G'),(71,'B'),(74,'D')]]
+      self.records = [( float(beat % 4), float(beat - beat % 4), beat // 4 + 1, spellings ) \
+                      for beat, spellings in enumerate( chords )]
+   
+   def test_local_keys( self ):
+      import harrisonHarmony
+      self.assertEqual( harrisonHarmony._localKeys( self.records, 3 ), \
+                        [( name, 'major' ) for name in ['C', 'C', 'C', 'G', 'G', 'G', 'D', 'G', 'D']] )
+      # just the chord itself
+      self.assertEqual( harrisonHarmony._localKeys( self.records, 1 ), \
+                        [( name, 'major' ) for name in ['C', 'F', 'G', 'C', 'G', 'D', 'G', 'D', 'G']] )
+      # the whole thing
+      self.assertEqual( harrisonHarmony._localKeys( self.records, 100 ), [( 'G', 'major' )] * 9 )
+      self.assertEqual( harrisonHarmony._localKeys( [], 3 ), [] )
+   
+   def test_correlation( self ):
+      import harrisonHarmony
+      # the profiles are centred and scaled, so the dot product is a correlation
+      for profile in harrisonHarmony._KEY_PROFILES:
+         self.assertAlmostEqual( sum( profile ), 0.0 )
+         self.assertAlmostEqual( sum( [weight * weight for weight in profile] ), 1.0 )
+      # without the scaling, this was F (major), though it correlates best with A (minor)
+      records = [( 0.0, 0.0, 1, [(60,'C'),(64,'E'),(65,'F'),(69,'A')] )]
+      self.assertEqual( harrisonHarmony._localKeys( records, 1 ), [( 'A', 'minor' )] )
+   
+   def test_without_numpy( self ):
+      import harrisonHarmony
+      expected = [harrisonHarmony._localKeys( self.records, size ) for size in range( 1, 12 )]
+      savedNumpy = harrisonHarmony.numpy
+      harrisonHarmony.numpy = None
+      try:
+         self.assertEqual( [harrisonHarmony._localKeys( self.records, size ) for size in range( 1, 12 )], expected )
+      finally:
+         harrisonHarmony.numpy = savedNumpy
+   
+   def test_label_in_local_keys( self ):
+      import harrisonHarmony
+      localKeys = harrisonHarmony._localKeys( self.records, 3 )
+      chords = harrisonHarmony._labelRecords( key.Key( 'C' ), self.records, 1, localKeys )
+      self.assertEqual( [( theChord.tonic, theChord.mode ) for theChord in chords], localKeys )
+      for record, theChord in zip( self.records, chords ):
+         self.assertEqual( theChord.measureNumber, record[2] )
+         self.assertEqual( theChord.conciseLabel, labelThisChord( key.Key( theChord.tonic ), record[3] ) )
+   
+   def test_label_in_minor( self ):
+      import harrisonHarmony
+      # a bar of A minor, where the last chord's applied key depends on the mode
+      chords = [['A3','C4','E4'], ['D3','F4','A4'], ['E3','G#4','B4'], ['A3','C4','E4'], \
+                ['E3','C4','E4','D5','F##5','B-5']]
+      records = [( float(beat), 0.0, 1, harrisonHarmony._sortedSpellings( pitches ) ) for beat, pitches in enumerate( chords )]
+      localKeys = harrisonHarmony._localKeys( records[:4], 100 ) + [( 'A', 'minor' )]
+      self.assertEqual( localKeys, [( 'A', 'minor' )] * 5 )
+      labelCache.clear()
+      possibleFunctionsCache.clear()
+      inMajor = labelThisChord( key.Key( 'A' ), chords[-1], 'verbose' )
+      chords = harrisonHarmony._labelRecords( key.Key( 'C' ), records, 1, localKeys )
+      self.assertEqual( [theChord.mode for theChord in chords], ['minor'] * 5 )
+      self.assertEqual( chords[-1].verboseLabel, labelThisChord( key.Key( 'a' ), records[-1][3], 'verbose' ) )
+      self.assertNotEqual( chords[-1].verboseLabel, inMajor )
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+class TestCompactAnalysis( unittest.TestCase ):
+   def setUp( self ):
+      import harrisonHarmony
+      # the same chords as TestLabelChords, plus some applied chords, in a few keys
+      chords = [['G4','E4','C3'], ['C4','A4','F3'], ['D4','B4','G3'], ['G4','E4','C4','G3'], \
+                ['A4','B4','C3'], ['A4','D4','C3'], ['E4','C4','D3'], ['G4','E4','C3'], \
+                ['E-4','A-4','C4','F3'], ['F#4','A4','C4','D3'], ['C4','C5','C3'], ['C4'], \
+                ['D-4','F4','B-3'], ['F#4','A4','D4']]
+      self.records = [( float(i), 4.0 * i, i + 1, harrisonHarmony._sortedSpellings( pitches ) ) for i, pitches in enumerate( chords )]
+      localKeys = [( name, 'major' ) for name in ['C', 'G', 'E-', 'F#'] * 3 + ['C', 'C']]
+      self.chords = harrisonHarmony._labelRecords( key.Key( 'C' ), self.records, 1, localKeys )
+   
+   def test_labels( self ):
+      a = CompactAnalysis( self.chords )
+      self.assertEqual( len(a), len(self.chords) )
+      self.assertEqual( a.getLabels(), [theChord.conciseLabel for theChord in self.chords] )
+      self.assertEqual( a.getLabels( 'verbose' ), [theChord.verboseLabel for theChord in self.chords] )
+      self.assertRaises( NonsensicalInputError, a.getLabel, 0, 'asdf' )
+   
+   def test_labels_in_minor( self ):
+      import harrisonHarmony
+      # the same chords in minor keys, and one whose applied key depends on the mode
+      records = self.records + [( 0.0, 60.0, 16, harrisonHarmony._sortedSpellings( ['E3','C4','E4','D5','F##5','B-5'] ) )]
+      localKeys = [( name, 'minor' ) for name in ['A', 'E', 'C', 'F#'] * 3 + ['A', 'A', 'A']]
+      chords = harrisonHarmony._labelRecords( key.Key( 'C' ), records, 1, localKeys )
+      a = CompactAnalysis( self.chords + chords )
+      self.assertEqual( a.getLabels(), [theChord.conciseLabel for theChord in self.chords + chords] )
+      self.assertEqual( a.getLabels( 'verbose' ), [theChord.verboseLabel for theChord in self.chords + chords] )
+      self.assertEqual( [a.getMode( code ) for code in a.getColumn( 'mode' )], \
+                        [theChord.mode for theChord in self.chords + chords] )
+      self.assertEqual( a.getLabel( len(a) - 1, 'verbose' ), labelThisChord( key.Key( 'a' ), records[-1][3], 'verbose' ) )
+   
+   def test_columns( self ):
+      a = CompactAnalysis( self.chords[:2] )
+      a.extend( self.chords[2:] )
+      self.assertEqual( list( a.getColumn( 'measureNumber' ) ), list( range( 1, len(self.chords) + 1 ) ) )
+      self.assertEqual( list( a.getColumn( 'measureOffset' ) ), [4.0 * i for i in range( len(self.chords) )] )
+      self.assertEqual( [a.getTonicName( code ) for code in a.getColumn( 'tonic' )], \
+                        [theChord.tonic for theChord in self.chords] )
+      # 'T(1)' in C
+      self.assertEqual( a.getColumn( 'functions' )[0], 2 )
+      self.assertEqual( a.getDegree( a.getColumn( 'bassDegree' )[0] ), '1' )
+      starts = a.getColumn( 'voiceStart' )
+      self.assertEqual( len(starts), len(self.chords) + 1 )
+      self.assertEqual( starts[-1], len(a.getColumn( 'voiceRole' )) )
+      self.assertEqual( list( a.getColumn( 'voiceRole' )[starts[0]:starts[1]] ), [0, 1, 2] )
+      self.assertRaises( NonsensicalInputError, a.getColumn, 'asdf' )
+   
+   def test_numpy( self ):
+      import harrisonHarmony
+      a = CompactAnalysis( self.chords )
+      if harrisonHarmony.numpy is None:
+         self.assertRaises( NonsensicalInputError, a.toNumpy )
+      else:
+         post = a.toNumpy()
+         self.assertEqual( len(post), len(self.chords) )
+         self.assertEqual( post['measureNumber'].tolist(), list( a.getColumn( 'measureNumber' ) ) )
+   
+   def test_find_label( self ):
+      a = CompactAnalysis( self.chords )
+      labels = a.getLabels()
+      for label in set( labels ):
+         self.assertEqual( a.findLabel( label ), [i for i in range( len(labels) ) if label == labels[i]] )
+      self.assertEqual( a.findLabel( labels[0], 'verbose' ), [] )
+      self.assertEqual( a.findLabel( self.chords[0].verboseLabel, 'verbose' ), [0] )
+      self.assertRaises( NonsensicalInputError, a.findLabel, labels[0], 'asdf' )
+   
+   def test_save_and_load( self ):
+      directory = tempfile.mkdtemp()
+      pathnames = [os.path.join( directory, name ) for name in ['a.hha', 'b.hha', 'c.hha', 'd.hha']]
+      try:
+         a = CompactAnalysis( self.chords )
+         a.save( pathnames[0] )
+         CompactAnalysis( self.chords[:3] ).save( pathnames[1] )
+         CompactAnalysis().save( pathnames[2] )
+         b = loadCompactAnalysis( pathnames[0] )
+         self.assertEqual( len(b), len(a) )
+         for name in CompactAnalysis._COLUMN_TYPES:
+            self.assertEqual( list( b.getColumn( name ) ), list( a.getColumn( name ) ) )
+         self.assertEqual( b.getLabels(), a.getLabels() )
+         self.assertEqual( b.getLabels( 'verbose' ), a.getLabels( 'verbose' ) )
+         with loadCompactAnalysis( pathnames[2] ) as c:
+            self.assertEqual( len(c), 0 )
+         # can't add to one that's in a file
+         self.assertRaises( NonsensicalInputError, b.extend, self.chords )
+         # saving a loaded one writes the same file
+         b.save( pathnames[3] )
+         with open( pathnames[0], 'rb' ) as first:
+            with open( pathnames[3], 'rb' ) as second:
+               self.assertEqual( first.read(), second.read() )
+         # closing lets go of the file, and leaves it empty
+         b.close()
+         self.assertEqual( b._mapped, None )
+         self.assertEqual( len(b), 0 )
+         b.close()
+         # search all of them
+         label = self.chords[0].conciseLabel
+         found = [( pathname, indices ) for pathname, analysis, indices in findInCompactAnalyses( pathnames[:3], label )]
+         self.assertEqual( found, [( pathnames[0], a.findLabel( label ) ), ( pathnames[1], CompactAnalysis( self.chords[:3] ).findLabel( label ) )] )
+         # not an analysis file, and no file at all
+         with open( pathnames[3], 'w' ) as theFile:
+            theFile.write( 'not an analysis\n' )
+         self.assertRaises( NonsensicalInputError, loadCompactAnalysis, pathnames[3] )
+         self.assertRaises( NonsensicalInputError, loadCompactAnalysis, os.path.join( directory, 'e.hha' ) )
+      finally:
+         for pathname in pathnames:
+            if os.path.exists( pathname ):
+               os.remove( pathname )
+         os.rmdir( directory )
+#-------------------------------------------------------------------------------
+
+#-------------------------------------------------------------------------------
+class TestAnalyzeCorpus( unittest.TestCase ):
+   def setUp( self ):
+      self.directory = tempfile.mkdtemp()
+      self.scores = os.path.join( self.directory, 'scores' )
+      self.output = os.path.join( self.directory, 'output' )
+      os.makedirs( os.path.join( self.scores, 'more' ) )
+      # music21 doesn't know how to import any of these
+      for name in ['a.nonsense', 'b.nonsense', os.path.join( 'more', 'a.nonsense' ), '.hidden']:
+         with open( os.path.join( self.scores, name ), 'w' ) as theFile:
+            theFile.write( 'not a score\n' )
+   
+   def tearDown( self ):
+      for directory, subdirectories, filenames in os.walk( self.directory, topdown = False ):
+         for name in filenames:
+            os.remove( os.path.join( directory, name ) )
+         for name in subdirectories:
+            os.rmdir( os.path.join( directory, name ) )
+      os.rmdir( self.directory )
+   
+   def test_find_scores( self ):
+      import harrisonHarmony
+      expected = [os.path.join( self.scores, 'a.nonsense' ), os.path.join( self.scores, 'b.nonsense' ), \
+                  os.path.join( self.scores, 'more', 'a.nonsense' )]
+      self.assertEqual( harrisonHarmony._findScores( self.scores ), expected )
+      self.assertEqual( harrisonHarmony._findScores( os.path.join( self.scores, '*' ) ), expected[:2] )
+      manifest = os.path.join( self.scores, 'list.txt' )
+      with open( manifest, 'w' ) as theFile:
+         theFile.write( '# some scores\nb.nonsense\n\nmore/a.nonsense\n' )
+      self.assertEqual( harrisonHarmony._findScores( manifest ), expected[1:] )
+   
+   def test_result_filenames( self ):
+      import harrisonHarmony
+      a = harrisonHarmony._resultFilename( os.path.join( self.scores, 'a.nonsense' ) )
+      b = harrisonHarmony._resultFilename( os.path.join( self.scores, 'more', 'a.nonsense' ) )
+      self.assertTrue( a.startswith( 'a.nonsense-' ) )
+      self.assertTrue( a.endswith( '.json' ) )
+      self.assertNotEqual( a, b )
+   
+   def test_keep_going_and_resume( self ):
+      import json
+      post = analyzeCorpus( os.path.join( self.scores, '*.nonsense' ), self.output, processes = 1 )
+      self.assertEqual( post['analyzed'], 2 )
+      self.assertEqual( post['skipped'], 0 )
+      self.assertEqual( len(post['failed']), 2 )
+      self.assertEqual( len(os.listdir( self.output )), 3 ) # two results and the checkpoint
+      for name in os.listdir( self.output ):
+         if name.endswith( '.json' ):
+            with open( os.path.join( self.output, name ) ) as theFile:
+               self.assertTrue( 'error' in json.load( theFile ) )
+      # the ones that are done aren't analyzed again
+      post = analyzeCorpus( self.scores, self.output, processes = 2 )
+      self.assertEqual( post['analyzed'], 1 )
+      self.assertEqual( post['skipped'], 2 )
+      self.assertEqual( len(os.listdir( self.output )), 4 )
+   
+   def test_unexpected_errors( self ):
+      import json
+      import harrisonHarmony
+      # any error is recorded, and the score is checkpointed like the rest
+      def brokenAnalyzeScore( pathname, theSettings = None ):
+         return [][0]
+      savedAnalyzeScore = harrisonHarmony.analyzeScore
+      harrisonHarmony.analyzeScore = brokenAnalyzeScore
+      try:
+         post = analyzeCorpus( os.path.join( self.scores, '*.nonsense' ), self.output, processes = 1 )
+      finally:
+         harrisonHarmony.analyzeScore = savedAnalyzeScore
+      self.assertEqual( post['analyzed'], 2 )
+      self.assertTrue( post['failed'][0][1].startswith( 'IndexError: ' ) )
+      with open( os.path.join( self.output, harrisonHarmony._resultFilename( post['failed'][0][0] ) ) ) as theFile:
+         self.assertEqual( json.load( theFile )['errorType'], 'IndexError' )
+      post = analyzeCorpus( os.path.join( self.scores, '*.nonsense' ), self.output, processes = 1 )
+      self.assertEqual( post['skipped'], 2 )
+   
+   def test_output_inside_source( self ):
+      import harrisonHarmony
+      # the results and checkpoint aren't scores
+      inside = os.path.join( self.scores, 'output' )
+      post = analyzeCorpus( self.scores, inside, processes = 1 )
+      self.assertEqual( post['analyzed'], 3 )
+      post = analyzeCorpus( self.scores, inside, processes = 1 )
+      self.assertEqual( post['analyzed'], 0 )
+      self.assertEqual( post['skipped'], 3 )
+      self.assertEqual( harrisonHarmony._findScores( os.path.join( self.scores, '*' ), self.scores ), [] )
+   
+   def test_broken_pool( self ):
+      from concurrent.futures import Future
+      from concurrent.futures.process import BrokenProcessPool
+      import harrisonHarmony
+      # the first score finishes, then a worker dies
+      class BreakingExecutor( object ):
+         def __init__( self, processes ):
+            self.submitted = 0
+         def __enter__( self ):
+            return self
+         def __exit__( self, *args ):
+            return False
+         def submit( self, function, *args ):
+            self.submitted += 1
+            future = Future()
+            if 1 == self.submitted:
+               future.set_result( function( *args ) )
+            elif 2 == self.submitted:
+               future.set_exception( BrokenProcessPool( 'a worker died' ) )
+            else:
+               raise BrokenProcessPool( 'a worker died' )
+            return future
+      savedExecutor = harrisonHarmony.ProcessPoolExecutor
+      harrisonHarmony.ProcessPoolExecutor = BreakingExecutor
+      try:
+         post = analyzeCorpus( self.scores, self.output, processes = 2, maxInFlight = 2 )
+      finally:
+         harrisonHarmony.ProcessPoolExecutor = savedExecutor
+      self.assertEqual( post['analyzed'], 1 )
+      self.assertEqual( len(post['failed']), 1 )
+      self.assertEqual( len(post['unfinished']), 2 )
+      # the unfinished ones weren't checkpointed, so they're analyzed next time
+      post = analyzeCorpus( self.scores, self.output, processes = 1 )
+      self.assertEqual( post['analyzed'], 2 )
+      self.assertEqual( post['skipped'], 1 )
+      self.assertEqual( post['unfinished'], [] )
+   
+   def test_bad_arguments( self ):
+      self.assertRaises( NonsensicalInputError, analyzeCorpus, self.scores, self.output, None, 0 )
+      self.assertRaises( NonsensicalInputError, analyzeCorpus, self.scores, self.output, None, 2, 0 )
+#-------------------------------------------------------------------------------
+
 #-------------------------------------------------------------------------------
 class TestSettings( unittest.TestCase ):
    def setUp( self ):
@@ -1419,6 +2511,16 @@ class TestSettings( unittest.TestCase ):
       # Ensure all the settings are initialized to the proper default value.
       self.assertEqual( self.s._chordLabelVerbosity, 'concise' )
       self.assertEqual( self.s._annotateChordifiedScore, False )
+      self.assertEqual( self.s._labelCacheSize, 4096 )
+      self.assertEqual( self.s._labelCacheFile, None )
+      self.assertEqual( self.s._labellingProcesses, 1 )
+      self.assertEqual( self.s._concurrentKeyFinding, False )
+      self.assertEqual( self.s._chordifyScore, True )
+      self.assertEqual( self.s._mergeTiedChords, False )
+      self.assertEqual( self.s._localKeyWindow, 0 )
+      self.assertEqual( self.s._analysisCacheDirectory, None )
+      self.assertEqual( self.s._analysisCacheSize, 1024 )
+      self.assertEqual( self.s._scoreCacheDirectory, None )
    
    def test_set_some_things( self ):
       # Setting something to a new, valid value is done properly.
@@ -1435,12 +2537,50 @@ class TestSettings( unittest.TestCase ):
       self.assertEqual( self.s._annotateChordifiedScore, True )
       self.s.parsePropertySet( 'annotateChordifiedScore false' )
       self.assertEqual( self.s._annotateChordifiedScore, False )
+      #
+      self.s.parsePropertySet( 'labelCacheSize 20' )
+      self.assertEqual( self.s._labelCacheSize, 20 )
+      self.s.parsePropertySet( 'labelCacheFile /tmp/some labels.pickle' )
+      self.assertEqual( self.s._labelCacheFile, '/tmp/some labels.pickle' )
+      self.s.parsePropertySet( 'labelCacheFile None' )
+      self.assertEqual( self.s._labelCacheFile, None )
+      #
+      self.s.parsePropertySet( 'set labellingProcesses 8' )
+      self.assertEqual( self.s._labellingProcesses, 8 )
+      #
+      self.s.parsePropertySet( 'concurrentKeyFinding true' )
+      self.assertEqual( self.s._concurrentKeyFinding, True )
+      self.s.parsePropertySet( 'concurrentKeyFinding False' )
+      self.assertEqual( self.s._concurrentKeyFinding, False )
+      #
+      self.s.parsePropertySet( 'chordifyScore false' )
+      self.assertEqual( self.s._chordifyScore, False )
+      #
+      self.s.parsePropertySet( 'set mergeTiedChords True' )
+      self.assertEqual( self.s._mergeTiedChords, True )
+      #
+      self.s.parsePropertySet( 'localKeyWindow 16' )
+      self.assertEqual( self.s._localKeyWindow, 16 )
+      #
+      self.s.parsePropertySet( 'analysisCacheDirectory /tmp/analyses' )
+      self.assertEqual( self.s._analysisCacheDirectory, '/tmp/analyses' )
+      self.s.parsePropertySet( 'analysisCacheDirectory none' )
+      self.assertEqual( self.s._analysisCacheDirectory, None )
+      self.s.parsePropertySet( 'analysisCacheSize 10' )
+      self.assertEqual( self.s._analysisCacheSize, 10 )
+      self.s.parsePropertySet( 'scoreCacheDirectory /tmp/scores' )
+      self.assertEqual( self.s._scoreCacheDirectory, '/tmp/scores' )
+      self.s.parsePropertySet( 'scoreCacheDirectory None' )
+      self.assertEqual( self.s._scoreCacheDirectory, None )
    
    def test_get_some_things( self ):
       # Setting something to a new, valid value is done properly.
       self.assertEqual( self.s.parsePropertyGet( 'chordLabelVerbosity' ), 'concise' )
       self.s._chordLabelVerbosity = 'verbose'
       self.assertEqual( self.s.parsePropertyGet( 'chordLabelVerbosity' ), 'verbose' )
+      self.assertEqual( self.s.parsePropertyGet( 'labelCacheSize' ), 4096 )
+      self.assertEqual( self.s.parsePropertyGet( 'get labelCacheFile' ), None )
+      self.assertEqual( self.s.parsePropertyGet( 'labellingProcesses' ), 1 )
    
    def test_get_invalid_setting( self ):
       self.assertRaises( NonsensicalInputError, self.s.parsePropertyGet, 'four score and five score' )
@@ -1455,6 +2595,12 @@ class TestSettings( unittest.TestCase ):
    def test_set_to_invalid_value( self ):
       self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'set chordLabelVerbosity five score' )
       self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'chordLabelVerbosity five score' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'labelCacheSize five' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'labelCacheSize 0' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'labellingProcesses 0' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'concurrentKeyFinding maybe' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'localKeyWindow -1' )
+      self.assertRaises( NonsensicalInputError, self.s.parsePropertySet, 'analysisCacheSize 0' )
 
 #-------------------------------------------------------------------------------
 
@@ -1468,6 +2614,7 @@ if __name__ == '__main__':
    print( "" )
    # define test suites
    chromaticScaleDegreeSuite = unittest.TestLoader().loadTestsFromTestCase( TestChromaticScaleDegree )
+   chromaticScaleDegreeTableSuite = unittest.TestLoader().loadTestsFromTestCase( TestChromaticScaleDegreeTable )
    harmonicFunctionSuite = unittest.TestLoader().loadTestsFromTestCase( TestHarmonicFunction )
    functionalRoleSuite = unittest.TestLoader().loadTestsFromTestCase( TestFunctionalRole )
    relativeVoicePositionSuite = unittest.TestLoader().loadTestsFromTestCase( TestRelativeVoicePosition )
@@ -1475,12 +2622,22 @@ if __name__ == '__main__':
    harmonicFunctionalNoteSuite = unittest.TestLoader().loadTestsFromTestCase( TestHarmonicFunctionalNote )
    harmonicFunctionalChordSuite = unittest.TestLoader().loadTestsFromTestCase( TestHarmonicFunctionalChord )
    possibleFunctionsFromScaleDegreeSuite = unittest.TestLoader().loadTestsFromTestCase( TestPossibleFunctionsFromScaleDegree )
+   internKeySuite = unittest.TestLoader().loadTestsFromTestCase( TestInternKey )
+   appliedKeySuite = unittest.TestLoader().loadTestsFromTestCase( TestAppliedKey )
+   cachedPossibleFunctionsFromScaleDegreeSuite = unittest.TestLoader().loadTestsFromTestCase( TestCachedPossibleFunctionsFromScaleDegree )
+   leastRecentlyUsedCacheSuite = unittest.TestLoader().loadTestsFromTestCase( TestLeastRecentlyUsedCache )
    reconcilePossibleFunctionsSuite = unittest.TestLoader().loadTestsFromTestCase( TestReconcilePossibleFunctions )
    labelThisChordSuite = unittest.TestLoader().loadTestsFromTestCase( TestLabelThisChord )
+   labelChordsSuite = unittest.TestLoader().loadTestsFromTestCase( TestLabelChords )
+   analyzeScoreSuite = unittest.TestLoader().loadTestsFromTestCase( TestAnalyzeScore )
+   localKeysSuite = unittest.TestLoader().loadTestsFromTestCase( TestLocalKeys )
+   compactAnalysisSuite = unittest.TestLoader().loadTestsFromTestCase( TestCompactAnalysis )
+   analyzeCorpusSuite = unittest.TestLoader().loadTestsFromTestCase( TestAnalyzeCorpus )
    settingsSuite = unittest.TestLoader().loadTestsFromTestCase( TestSettings )
    
    # run test suites
    #unittest.TextTestRunner( verbosity = 2 ).run( chromaticScaleDegreeSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( chromaticScaleDegreeTableSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( harmonicFunctionSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( functionalRoleSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( relativeVoicePositionSuite )
@@ -1488,8 +2645,17 @@ if __name__ == '__main__':
    #unittest.TextTestRunner( verbosity = 2 ).run( harmonicFunctionalNoteSuite )
    unittest.TextTestRunner( verbosity = 2 ).run( harmonicFunctionalChordSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( possibleFunctionsFromScaleDegreeSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( internKeySuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( appliedKeySuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( cachedPossibleFunctionsFromScaleDegreeSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( leastRecentlyUsedCacheSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( reconcilePossibleFunctionsSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( labelThisChordSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( labelChordsSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( analyzeScoreSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( localKeysSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( compactAnalysisSuite )
+   #unittest.TextTestRunner( verbosity = 2 ).run( analyzeCorpusSuite )
    #unittest.TextTestRunner( verbosity = 2 ).run( settingsSuite )
    
    #unittest.main()
@@ -44,9 +44,40 @@ from music21 import converter
 from music21 import analysis
 from music21 import stream
 from music21 import note # confirmed requirement
+from music21.common import opFrac
 from os.path import exists as pathExists # confirmed requirement
+from collections import OrderedDict, namedtuple, deque
+import heapq
+import array
+import bisect
+import weakref
+import pickle
+import os
+import tempfile
+import time
+import glob
+import json
+import hashlib
+import mmap
+import struct
+import sys
+try:
+   import numpy
+except ImportError:
+   numpy = None # labelChords() will still work, just not as quickly
+try:
+   from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+   # labelChords() and analyzeThis() will only use one process
+   ProcessPoolExecutor = None
+else:
+   from concurrent.futures import wait as waitForFutures, FIRST_COMPLETED
+   from concurrent.futures.process import BrokenProcessPool
 from music21.converter import ConverterException # confirmed requirement
 from music21.converter import ConverterFileException # confirmed requirement
+import music21
+## The version of music21, which is part of the key of the analysis cache.
+_MUSIC21_VERSION = getattr( music21, 'VERSION_STR', 'unknown' )
 # TODO: Quadruple-fun check that these are all that's required.
 
 ## TODO: Change all the classes to "new-type" (by making them inherit from object)
@@ -82,6 +113,296 @@ class NonsensicalInputError( Exception ):
 
 
 #-------------------------------------------------------------------------------
+def _writeAtomically( pathname, write, mode = 'wb' ):
+   # Calls write() with a file open in mode, then puts what it wrote at
+   # pathname all at once, so the file there is never half-written. If
+   # anything goes wrong (even KeyboardInterrupt), the temporary file is
+   # removed and the error is raised again.
+   directory = os.path.dirname( os.path.abspath( pathname ) )
+   handle, temporaryPath = tempfile.mkstemp( dir = directory )
+   succeeded = False
+   try:
+      with os.fdopen( handle, mode ) as theFile:
+         write( theFile )
+      os.rename( temporaryPath, pathname )
+      succeeded = True
+   finally:
+      if not succeeded:
+         os.remove( temporaryPath )
+# End function _writeAtomically() ----------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+class LeastRecentlyUsedCache( object ):
+   '''
+   A dictionary-like cache that holds at most a certain number of items. When
+   it's full, the item that was used least recently is thrown away to make
+   room for the new one. It also counts how many lookups found something
+   (hits) and how many didn't (misses).
+
+   >>> from harrisonHarmony import *
+   >>> a = LeastRecentlyUsedCache( 2 )
+   >>> a.put( 'x', 1 )
+   >>> a.put( 'y', 2 )
+   >>> a.get( 'x' )
+   1
+   >>> a.put( 'z', 3 )
+   >>> a.get( 'y' ) is None
+   True
+   >>> a.getHits(), a.getMisses()
+   (1, 1)
+   '''
+
+   ## Instance Variables
+   # _capacity ---- int, the most items we'll hold
+   # _items ---- OrderedDict, from least to most recently used
+   # _hits ---- int, number of successful get() calls
+   # _misses ---- int, number of unsuccessful get() calls
+
+   #----------------------------------------------------------------------------
+   def __init__( self, capacity ):
+      if capacity < 1:
+         raise NonsensicalInputError( "LeastRecentlyUsedCache: capacity must be at least 1, but I got " + str(capacity) )
+      self._capacity = capacity
+      self._items = OrderedDict()
+      self._hits = 0
+      self._misses = 0
+
+   #----------------------------------------------------------------------------
+   def __repr__( self ):
+      return "<LeastRecentlyUsedCache %d of %d items, %d hits, %d misses>" % \
+             ( len(self._items), self._capacity, self._hits, self._misses )
+
+   #----------------------------------------------------------------------------
+   def __len__( self ):
+      return len(self._items)
+
+   #----------------------------------------------------------------------------
+   def __contains__( self, theKey ):
+      # doesn't count as a hit or a miss, and doesn't change the order
+      return theKey in self._items
+
+   #----------------------------------------------------------------------------
+   def get( self, theKey, default = None ):
+      '''
+      Returns the item stored for theKey, or the default if there isn't one.
+      '''
+      try:
+         # take it out and put it back, so it's the most recently used
+         value = self._items.pop( theKey )
+      except KeyError:
+         self._misses += 1
+         return default
+      self._items[theKey] = value
+      self._hits += 1
+      return value
+
+   #----------------------------------------------------------------------------
+   def put( self, theKey, value ):
+      '''
+      Stores value for theKey, throwing away the least recently used item if
+      the cache is full.
+      '''
+      if theKey in self._items:
+         del self._items[theKey]
+      elif len(self._items) >= self._capacity:
+         self._items.popitem( last = False )
+      self._items[theKey] = value
+
+   #----------------------------------------------------------------------------
+   def clear( self ):
+      '''
+      Removes all the items, and resets the hit and miss counters.
+      '''
+      self._items.clear()
+      self._hits = 0
+      self._misses = 0
+
+   #----------------------------------------------------------------------------
+   def getCapacity( self ):
+      return self._capacity
+
+   #----------------------------------------------------------------------------
+   def setCapacity( self, capacity ):
+      '''
+      Changes the capacity, throwing away the least recently used items if
+      there are now too many.
+      '''
+      if capacity < 1:
+         raise NonsensicalInputError( "LeastRecentlyUsedCache: capacity must be at least 1, but I got " + str(capacity) )
+      self._capacity = capacity
+      while len(self._items) > self._capacity:
+         self._items.popitem( last = False )
+
+   #----------------------------------------------------------------------------
+   def getHits( self ):
+      return self._hits
+
+   #----------------------------------------------------------------------------
+   def getMisses( self ):
+      return self._misses
+
+   #----------------------------------------------------------------------------
+   def getHitRate( self ):
+      '''
+      Returns the proportion of get() calls that found something, as a float
+      between 0.0 and 1.0. If there haven't been any, returns 0.0.
+      '''
+      if 0 == self._hits + self._misses:
+         return 0.0
+      return float(self._hits) / ( self._hits + self._misses )
+
+   #----------------------------------------------------------------------------
+   def save( self, pathname ):
+      '''
+      Writes all the items to a file, which can be read later with load(). The
+      keys and values must be picklable. The file is replaced all at once, so
+      it's never left half-written.
+      '''
+      items = list( self._items.items() )
+      _writeAtomically( pathname, lambda theFile: pickle.dump( items, theFile, pickle.HIGHEST_PROTOCOL ) )
+
+   #----------------------------------------------------------------------------
+   def load( self, pathname ):
+      '''
+      Adds the items in a file written by save(). If there are more than the
+      capacity, the ones that were most recently used when they were saved
+      are kept. Items already in the cache are replaced. Returns the number of
+      items read from the file, which is 0 if the file doesn't exist.
+      
+      Raises :exc:`NonsensicalInputError` if the file can't be read.
+      '''
+      if not pathExists( pathname ):
+         return 0
+      try:
+         with open( pathname, 'rb' ) as theFile:
+            items = pickle.load( theFile )
+      except ( IOError, EOFError, pickle.UnpicklingError ) as e:
+         raise NonsensicalInputError( "LeastRecentlyUsedCache: couldn't load '" + pathname + "': " + str(e) )
+      for theKey, value in items:
+         self.put( theKey, value )
+      return len(items)
+# End: class LeastRecentlyUsedCache --------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+## The Key objects shared by internKey(), from ( tonic name, mode ).
+_INTERNED_KEYS = {}
+
+def internKey( tonicName, mode = 'major' ):
+   '''
+   Returns the one :class:`music21.key.Key` with that tonic and mode that is
+   shared by everything in harrisonHarmony, making it the first time. Since
+   it's shared, it must not be modified.
+   
+   >>> from harrisonHarmony import *
+   >>> internKey( 'E-' ) is internKey( 'E-' )
+   True
+   >>> internKey( 'E-', 'minor' )
+   <music21.key.Key of e- minor>
+   '''
+   theKey = _INTERNED_KEYS.get( ( tonicName, mode ) )
+   if theKey is None:
+      theKey = key.Key( tonicName, mode )
+      _INTERNED_KEYS[( tonicName, mode )] = theKey
+   return theKey
+# End function internKey() -----------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+## Tables for chromaticScaleDegree()
+## The seven letter names, in ascending order from C.
+_DIATONIC_STEPS = 'CDEFGAB'
+## Semitones above C of each natural letter name. This is also the number of
+## semitones in the major or perfect interval of each generic size, from the
+## unison to the seventh, which is what we compare against.
+_NATURAL_SEMITONES = ( 0, 2, 4, 5, 7, 9, 11 )
+## The accidentals we build the lookup table for, from double-flat to double-sharp.
+_TABLE_ACCIDENTALS = ( '--', '-', '', '#', '##' )
+## Prefix for the scale degree, given the chromatic alteration of the interval
+## above the tonic. Unison, fourth, and fifth are "perfect" intervals; the rest
+## are major or minor. Doubly-diminished major/minor intervals are labelled
+## the same as diminished ones.
+_PERFECT_PREFIXES = { -2 : '--', -1 : '-', 0 : '', 1 : '#', 2 : '##' }
+_IMPERFECT_PREFIXES = { -3 : '--', -2 : '--', -1 : '-', 0 : '', 1 : '#', 2 : '##' }
+
+def _parseSpelling( pitchName ):
+   # Given a pitch name like 'B-' or 'F##' (no octave), returns a 2-tuple with
+   # the index of its letter name in _DIATONIC_STEPS and the number of
+   # semitones it is altered by. Returns None for anything else (like
+   # microtones), which we don't know how to label.
+   if 0 == len(pitchName) or pitchName[0] not in _DIATONIC_STEPS:
+      return None
+   accidental = pitchName[1:]
+   if accidental == len(accidental) * '#':
+      return ( _DIATONIC_STEPS.index( pitchName[0] ), len(accidental) )
+   elif accidental == len(accidental) * '-':
+      return ( _DIATONIC_STEPS.index( pitchName[0] ), -len(accidental) )
+   else:
+      return None
+
+def _computeScaleDegree( tonicName, pitchName ):
+   # Does the work for chromaticScaleDegree(), given the name of the tonic
+   # pitch and the name of the pitch we want to know about. This is used to
+   # build _SCALE_DEGREE_TABLE, and for spellings that aren't in the table.
+   tonic = _parseSpelling( tonicName )
+   unknown = _parseSpelling( pitchName )
+   if tonic is None or unknown is None:
+      return ""
+   
+   # the generic interval (0 is a unison, 6 is a seventh), always ascending
+   generic = ( unknown[0] - tonic[0] ) % 7
+   
+   # the number of semitones in the ascending interval
+   semitones = _NATURAL_SEMITONES[unknown[0]] - _NATURAL_SEMITONES[tonic[0]]
+   if unknown[0] < tonic[0]:
+      semitones += 12
+   semitones += unknown[1] - tonic[1]
+   
+   # how far the interval is from major or perfect
+   alteration = semitones - _NATURAL_SEMITONES[generic]
+   if generic in ( 0, 3, 4 ):
+      prefixes = _PERFECT_PREFIXES
+   else:
+      prefixes = _IMPERFECT_PREFIXES
+   
+   if alteration in prefixes:
+      return prefixes[alteration] + str(generic + 1)
+   else:
+      return ""
+
+## Maps ( tonic pitch name, pitch name ) to the str returned by
+## chromaticScaleDegree(), for every spelling from double-flat to double-sharp.
+_SCALE_DEGREE_TABLE = {}
+for _tonicStep in _DIATONIC_STEPS:
+   for _tonicAccidental in _TABLE_ACCIDENTALS:
+      for _pitchStep in _DIATONIC_STEPS:
+         for _pitchAccidental in _TABLE_ACCIDENTALS:
+            _SCALE_DEGREE_TABLE[( _tonicStep + _tonicAccidental, _pitchStep + _pitchAccidental )] = \
+               _computeScaleDegree( _tonicStep + _tonicAccidental, _pitchStep + _pitchAccidental )
+del _tonicStep, _tonicAccidental, _pitchStep, _pitchAccidental
+
+## The same table, with small ints instead of str, for labelChords().
+## Every spelling in the table has a code in _SPELLING_CODES, every result has
+## a code in _DEGREE_CODES, and _DEGREE_CODE_TABLE[tonic code][pitch code]
+## holds the code of the result. It's a numpy array if we have numpy.
+_SPELLING_CODES = {}
+for _step in _DIATONIC_STEPS:
+   for _accidental in _TABLE_ACCIDENTALS:
+      _SPELLING_CODES[_step + _accidental] = len(_SPELLING_CODES)
+del _step, _accidental
+_DEGREE_STRINGS = sorted( set( _SCALE_DEGREE_TABLE.values() ) )
+_DEGREE_CODES = dict( [( degree, code ) for code, degree in enumerate( _DEGREE_STRINGS )] )
+_DEGREE_CODE_TABLE = [[None] * len(_SPELLING_CODES) for _ in range(len(_SPELLING_CODES))]
+for ( _tonicName, _pitchName ), _degree in _SCALE_DEGREE_TABLE.items():
+   _DEGREE_CODE_TABLE[_SPELLING_CODES[_tonicName]][_SPELLING_CODES[_pitchName]] = _DEGREE_CODES[_degree]
+del _tonicName, _pitchName, _degree
+if numpy is not None:
+   _DEGREE_CODE_TABLE = numpy.array( _DEGREE_CODE_TABLE, dtype = numpy.int8 )
+
 def chromaticScaleDegree( tonicKey, unknownPitch ):
    '''
    Given a :class:`~music21.key.Key` and :class:`~music21.pitch.Pitch` or
@@ -92,6 +413,10 @@ def chromaticScaleDegree( tonicKey, unknownPitch ):
    double-sharp, and double-flat scale degrees, and will return an empty str
    for all others.
    
+   The result is looked up in a table of all the spellings from double-flat
+   to double-sharp, which is built when the module is imported. Other
+   spellings are calculated the same way, just not ahead of time.
+   
    >>> from harrisonHarmony import *
    >>> from music21 import key, note, pitch
    >>> chromaticScaleDegree(key.Key('C'),note.Note('C'))
@@ -102,59 +427,14 @@ def chromaticScaleDegree( tonicKey, unknownPitch ):
    '##4'
    '''
    
-   # If there's an octave specified in unknownPitch, it causes problems, but
-   # I'm not sure why. Even so, this will get rid of the octave number.
-   unknownPitch = pitch.Pitch( unknownPitch.name )
-   
-   # get a Pitch from the tonic Key
-   tonicPitch = tonicKey.pitchFromDegree( 1 )
-   
-   # first try to get interval between first two pitches
-   medialInt = interval.notesToInterval( tonicPitch, unknownPitch )
-   
-   # would-be problems:
-   #    dd-2 and ascending direction
-   #    descending direction
-   #    d-2 and 0 direction
-   if ( ( 'dd-2' == medialInt.directedName ) and ( 1 == medialInt.direction ) \
-      or ( -1 == medialInt.direction ) or ( ( 0 == medialInt.direction ) and \
-      ( 'd-2' == medialInt.directedName ) ) ):
-      medialInt = interval.notesToInterval( tonicPitch, \
-         interval.transposePitch( unknownPitch, interval.Interval( 'P8' ) ) )
-   
-   # now figure out the degree!
-   mInt = medialInt.name # this is the name of the interval
-   if ( 2 == len( mInt ) ):
-      if ( 'M' == mInt[0] ):
-         post = mInt[1]
-      elif ( 'P' == mInt[0] ):
-         post = mInt[1]
-      elif ( 'm' == mInt[0] ):
-         post = '-' + mInt[1]
-      elif ( 'A' == mInt[0] ):
-         post = '#' + mInt[1] ## only one possibility, whether P4/P5/P8 or other
-      elif ( 'd' == mInt[0] ):
-         if ( ( '4' == mInt[1] ) or ( '5' == mInt[1] ) ):
-            post = '-' + mInt[1]
-         elif ( '8' == mInt[1] ): # to avoid "-8"
-            post = '-1'
-         else:
-            post = '--' + mInt[1]
-      else:
-         post = ""
-   elif ( 3 == len( mInt ) ):
-      if ( 'AA' == mInt[0:2] ):
-         post = '##' + mInt[2]
-      elif ( 'dd' == mInt[0:2] ):
-         post = '--' + mInt[2]
-      else:
-         post = ""
-      if ( '8' == post[2] ): # to avoid "--8"
-         post = post[0:2] + '1'
-   else:
-      post = ""
+   # The octave of unknownPitch doesn't matter, so we only use its name.
+   tonicName = tonicKey.tonic.name
+   pitchName = unknownPitch.name
    
-   return post
+   try:
+      return _SCALE_DEGREE_TABLE[( tonicName, pitchName )]
+   except KeyError:
+      return _computeScaleDegree( tonicName, pitchName )
 # End function chromaticScaleDegree() ------------------------------------------
 
 
@@ -173,6 +453,10 @@ class HarmonicFunction( object ):
    - HarmonicFunction.Dominant
    
    - HarmonicFunction.Unknown
+   
+   Each also has an integer code, from :meth:`toCode`. The codes of the three
+   functions are bits (Subdominant is 1, Tonic is 2, and Dominant is 4; Unknown
+   is 0), so the functions in a chord can be combined into one int with "|".
    '''
    class Subdominant( object ):
       def __str__( self ):
@@ -187,6 +471,61 @@ class HarmonicFunction( object ):
       def __str__( self ):
          return 'Unknown function'
    
+   ## Tables for the static methods
+   _CODES = { Unknown : 0, Subdominant : 1, Tonic : 2, Dominant : 4 }
+   _LETTERS = { Unknown : 'U', Subdominant : 'S', Tonic : 'T', Dominant : 'D' }
+   _NAMES = { Unknown : 'Unknown function', Subdominant : 'Subdominant', Tonic : 'Tonic', Dominant : 'Dominant' }
+   _BY_CODE = { 0 : Unknown, 1 : Subdominant, 2 : Tonic, 4 : Dominant }
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def toCode( function ):
+      '''
+      Outputs the int code of a :class:`HarmonicFunction` object.
+      
+      >>> from harrisonHarmony import *
+      >>> HarmonicFunction.toCode( HarmonicFunction.Tonic )
+      2
+      >>> HarmonicFunction.toCode( HarmonicFunction.Subdominant ) | HarmonicFunction.toCode( HarmonicFunction.Dominant )
+      5
+      '''
+      try:
+         return HarmonicFunction._CODES[function]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected HarmonicFunction static member, but got " + str(function) + " instead." )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def fromCode( code ):
+      '''
+      Outputs the :class:`HarmonicFunction` object with an int code from
+      :meth:`toCode`.
+      
+      >>> from harrisonHarmony import *
+      >>> HarmonicFunction.fromCode( 4 ) == HarmonicFunction.Dominant
+      True
+      '''
+      try:
+         return HarmonicFunction._BY_CODE[code]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected a HarmonicFunction code, but got " + str(code) + " instead." )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def toName( function ):
+      '''
+      Outputs the same string as str() of an instance of a
+      :class:`HarmonicFunction` object, without making one.
+      
+      >>> from harrisonHarmony import *
+      >>> HarmonicFunction.toName( HarmonicFunction.Subdominant )
+      'Subdominant'
+      '''
+      try:
+         return HarmonicFunction._NAMES[function]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected HarmonicFunction static member, but got " + str(function) + " instead." )
+   
    #----------------------------------------------------------------------------
    @staticmethod
    def toLetter( function ):
@@ -200,15 +539,9 @@ class HarmonicFunction( object ):
       >>> HarmonicFunction.toLetter( HarmonicFunction.Unknown )
       'U'
       '''
-      if HarmonicFunction.Subdominant == function:
-         return 'S'
-      elif HarmonicFunction.Dominant == function:
-         return 'D'
-      elif HarmonicFunction.Tonic == function:
-         return 'T'
-      elif HarmonicFunction.Unknown == function:
-         return 'U'
-      else:
+      try:
+         return HarmonicFunction._LETTERS[function]
+      except ( KeyError, TypeError ):
          raise NonsensicalInputError( "Expected HarmonicFunction static member, but got " + str(function) + " instead." )
 # Ends class: HarmonicFunction -------------------------------------------------
 
@@ -228,6 +561,9 @@ class FunctionalRole( object ):
    - FunctionalRole.Associate
    
    - FunctionalRole.Unknown
+   
+   Each also has an integer code, from :meth:`toCode`: Base is 0, Agent is 1,
+   Associate is 2, and Unknown is 3.
    '''
    class Base( object ):
       def __str__( self ):
@@ -242,6 +578,58 @@ class FunctionalRole( object ):
       def __str__( self ):
          return 'unknown role'
    
+   ## Tables for the static methods
+   _CODES = { Base : 0, Agent : 1, Associate : 2, Unknown : 3 }
+   _LETTERS = { Base : 'ba', Agent : 'ag', Associate : 'as', Unknown : 'un' }
+   _NAMES = { Base : 'base', Agent : 'agent', Associate : 'associate', Unknown : 'unknown role' }
+   _BY_CODE = ( Base, Agent, Associate, Unknown )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def toCode( role ):
+      '''
+      Outputs the int code of a :class:`FunctionalRole` object.
+      
+      >>> from harrisonHarmony import *
+      >>> FunctionalRole.toCode( FunctionalRole.Associate )
+      2
+      '''
+      try:
+         return FunctionalRole._CODES[role]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected FunctionalRole static member, but got " + str(role) + " instead." )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def fromCode( code ):
+      '''
+      Outputs the :class:`FunctionalRole` object with an int code from
+      :meth:`toCode`.
+      
+      >>> from harrisonHarmony import *
+      >>> FunctionalRole.fromCode( 1 ) == FunctionalRole.Agent
+      True
+      '''
+      if isinstance( code, int ) and 0 <= code < len(FunctionalRole._BY_CODE):
+         return FunctionalRole._BY_CODE[code]
+      raise NonsensicalInputError( "Expected a FunctionalRole code, but got " + str(code) + " instead." )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def toName( role ):
+      '''
+      Outputs the same string as str() of an instance of a
+      :class:`FunctionalRole` object, without making one.
+      
+      >>> from harrisonHarmony import *
+      >>> FunctionalRole.toName( FunctionalRole.Agent )
+      'agent'
+      '''
+      try:
+         return FunctionalRole._NAMES[role]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected FunctionalRole static member, but got " + str(role) + " instead." )
+   
    #----------------------------------------------------------------------------
    @staticmethod
    def toLetter( role ):
@@ -259,15 +647,9 @@ class FunctionalRole( object ):
       >>> FunctionalRole.toLetter( FunctionalRole.Unknown )
       'un'
       '''
-      if FunctionalRole.Base == role:
-         return "ba"
-      elif FunctionalRole.Agent == role:
-         return "ag"
-      elif FunctionalRole.Associate == role:
-         return "as"
-      elif FunctionalRole.Unknown == role:
-         return "un"
-      else:
+      try:
+         return FunctionalRole._LETTERS[role]
+      except ( KeyError, TypeError ):
          raise NonsensicalInputError( "Expected FunctionalRole static member, but got " + str(role) + " instead." )
 # End: class FunctionalRole ---------------------------------------------------
 
@@ -285,6 +667,9 @@ class RelativeVoicePosition( object ):
    - RelativeVoicePosition.Middle
    - RelativeVoicePosition.Highest
    - RelativeVoicePosition.Solo
+   
+   Each also has an integer code, from :meth:`toCode`: Lowest is 0, Middle is
+   1, Highest is 2, and Solo is 3.
    '''
    class Lowest( object ):
       def __str__( self ):
@@ -299,6 +684,41 @@ class RelativeVoicePosition( object ):
       def __str__( self ):
          return 'solo'
    
+   ## Tables for the static methods
+   _CODES = { Lowest : 0, Middle : 1, Highest : 2, Solo : 3 }
+   _LETTERS = { Lowest : 'lowest', Middle : 'middle', Highest : 'highest', Solo : 'solo' }
+   _BY_CODE = ( Lowest, Middle, Highest, Solo )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def toCode( position ):
+      '''
+      Outputs the int code of a :class:`RelativeVoicePosition` object.
+      
+      >>> from harrisonHarmony import *
+      >>> RelativeVoicePosition.toCode( RelativeVoicePosition.Highest )
+      2
+      '''
+      try:
+         return RelativeVoicePosition._CODES[position]
+      except ( KeyError, TypeError ):
+         raise NonsensicalInputError( "Expected RelativeVoicePosition static member, but got " + str(position) + " instead." )
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def fromCode( code ):
+      '''
+      Outputs the :class:`RelativeVoicePosition` object with an int code from
+      :meth:`toCode`.
+      
+      >>> from harrisonHarmony import *
+      >>> RelativeVoicePosition.fromCode( 0 ) == RelativeVoicePosition.Lowest
+      True
+      '''
+      if isinstance( code, int ) and 0 <= code < len(RelativeVoicePosition._BY_CODE):
+         return RelativeVoicePosition._BY_CODE[code]
+      raise NonsensicalInputError( "Expected a RelativeVoicePosition code, but got " + str(code) + " instead." )
+   
    #----------------------------------------------------------------------------
    @staticmethod
    def toLetter( position ):
@@ -315,15 +735,9 @@ class RelativeVoicePosition( object ):
       >>> RelativeVoicePosition.toLetter( RelativeVoicePosition.Solo )
       'solo'
       '''
-      if position == RelativeVoicePosition.Lowest:
-         return 'lowest'
-      elif position == RelativeVoicePosition.Middle:
-         return 'middle'
-      elif position == RelativeVoicePosition.Highest:
-         return 'highest'
-      elif position == RelativeVoicePosition.Solo:
-         return 'solo'
-      else:
+      try:
+         return RelativeVoicePosition._LETTERS[position]
+      except ( KeyError, TypeError ):
          raise NonsensicalInputError( "Expected RelativeVoicePosition static member, but got " + str(position) + " instead." )
 # End: class RelativeVoicePosition ---------------------------------------------
 
@@ -449,6 +863,11 @@ class HarmonicFunctionalNote( object ):
    Instantiable class that describes a note with harmonic function.
    
    As in all classes and methods of harrisonHarmony, the key's mode is ignored.
+   
+   Instances are values: two instances that are equal() also compare equal
+   with == and have the same hash, so they can be put in a set or used as
+   the key of a dict. Use :meth:`HarmonicFunctionalNote.intern` instead of
+   the constructor to get one shared instance for each value.
    '''
    
    ## Instance Variables
@@ -456,7 +875,15 @@ class HarmonicFunctionalNote( object ):
    # _function ---- it's a HarmonicFunction Symbol
    # _role ---- it's a FunctionalRole Symbol
    # _degree ---- it's a str, saying which scale degree
-   # _stringRep ---- it's a str that is the string-format representation
+   # _stringRep ---- it's a str that is the string-format representation, or
+   #        None until __str__() is first called
+   # _label ---- it's the str from getLabel(), or None until it's first called
+   # _identity ---- it's a tuple with the tonic name, function, role, and degree
+   __slots__ = ( '_key', '_function', '_role', '_degree', '_stringRep', '_label', '_identity', '__weakref__' )
+   
+   ## Instances made by intern(), by their _identity. They are thrown away once
+   ## nothing else refers to them.
+   _interned = weakref.WeakValueDictionary()
    
    #----------------------------------------------------------------------------
    def __init__( self, theKey, theFunction, theRole, theDegree ):
@@ -472,23 +899,64 @@ class HarmonicFunctionalNote( object ):
       >>> HarmonicFunctionalNote( key.Key( 'f#' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '-7' )
       <HarmonicFunctionalNote ^-7 as Dominant agent in F#>
       '''
+      # NOTE: Only the tonic name in _identity is used for comparing, hashing,
+      # and labelling, so theKey isn't looked at again here.
       self._key = theKey
       self._function = theFunction
       self._role = theRole
       self._degree = theDegree
+      self._identity = ( theKey.tonic.name.upper(), theFunction, theRole, theDegree )
+      # most candidates are never printed, so the strs are made when needed
+      self._stringRep = None
+      self._label = None
+   
+   #----------------------------------------------------------------------------
+   @staticmethod
+   def intern( theKey, theFunction, theRole, theDegree ):
+      '''
+      Takes the same arguments as the constructor, but if there is already an
+      equal :class:`HarmonicFunctionalNote` in use, returns that instance
+      instead of making a new one.
       
-      # set string-format representation
-      keyRep = self._key.tonic.name
-      self._stringRep = '^' + self._degree + ' as ' + str(self._function()) \
-                        + ' ' + str(self._role()) + ' in ' + keyRep
+      >>> from music21 import key
+      >>> from harrisonHarmony import *
+      >>> a = HarmonicFunctionalNote.intern( key.Key( 'E-' ), HarmonicFunction.Tonic, FunctionalRole.Base, '1' )
+      >>> b = HarmonicFunctionalNote.intern( key.Key( 'e-' ), HarmonicFunction.Tonic, FunctionalRole.Base, '1' )
+      >>> a is b
+      True
+      '''
+      identity = ( theKey.tonic.name.upper(), theFunction, theRole, theDegree )
+      post = HarmonicFunctionalNote._interned.get( identity )
+      if post is None:
+         post = HarmonicFunctionalNote( theKey, theFunction, theRole, theDegree )
+         HarmonicFunctionalNote._interned[identity] = post
+      return post
    
    #----------------------------------------------------------------------------
    def __repr__( self ):
         return "<HarmonicFunctionalNote %s>" % self.__str__()
    
+   #----------------------------------------------------------------------------
+   def __eq__( self, other ):
+      if not isinstance( other, HarmonicFunctionalNote ):
+         return NotImplemented
+      return self is other or self._identity == other._identity
+   
+   #----------------------------------------------------------------------------
+   def __ne__( self, other ):
+      if not isinstance( other, HarmonicFunctionalNote ):
+         return NotImplemented
+      return not ( self is other or self._identity == other._identity )
+   
+   #----------------------------------------------------------------------------
+   def __hash__( self ):
+      return hash( self._identity )
+   
    #----------------------------------------------------------------------------
    def __str__( self ):
-      # str was created in the __init__() function
+      if self._stringRep is None:
+         self._stringRep = '^%s as %s %s in %s' % ( self._degree, HarmonicFunction.toName( self._function ), \
+                                                   FunctionalRole.toName( self._role ), self._identity[0] )
       return self._stringRep
    
    #----------------------------------------------------------------------------
@@ -544,6 +1012,20 @@ class HarmonicFunctionalNote( object ):
       '''
       return self._degree
    
+   #----------------------------------------------------------------------------
+   def getTonicName( self ):
+      '''
+      Returns the name of the tonic of the key of this
+      :class:`this HarmonicFunctionalNote`, without asking music21.
+      
+      >>> from music21 import key
+      >>> from harrisonHarmony import *
+      >>> a = HarmonicFunctionalNote( key.Key( 'd-' ), HarmonicFunction.Subdominant, FunctionalRole.Associate, '1' )
+      >>> a.getTonicName()
+      'D-'
+      '''
+      return self._identity[0]
+   
    #----------------------------------------------------------------------------
    def getLabel( self ):
       '''
@@ -565,8 +1047,10 @@ class HarmonicFunctionalNote( object ):
       >>> a.getLabel()
       'E:Dba'
       '''
-      return self._key.tonic.name + ":" + HarmonicFunction.toLetter( self._function ) \
-            + FunctionalRole.toLetter( self._role )
+      if self._label is None:
+         self._label = self._identity[0] + ":" + HarmonicFunction.toLetter( self._function ) \
+                       + FunctionalRole.toLetter( self._role )
+      return self._label
    # End: HarmonicFunctionalNote.getLabel() ------------------------------------
       
    #----------------------------------------------------------------------------
@@ -588,17 +1072,30 @@ class HarmonicFunctionalNote( object ):
       >>> a.equal( b )
       True
       '''
-      if self._key.tonic.name.upper() == other._key.tonic.name.upper() \
-      and self._function == other._function \
-      and self._role == other._role \
-      and self._degree == other._degree:
-         return True
-      else:
-         return False
+      return self is other or self._identity == other._identity
 # End: class HarmonicFunctionalNote
 
 
 
+#-------------------------------------------------------------------------------
+def _makeLabelPrefixes():
+   # Returns the table for HarmonicFunctionalChord.getLabel(): from the code
+   # of the lowest voice's function and the bitmask of all the functions, to
+   # the part of the label before the scale degree, like 'D^S'. The other
+   # functions go after a '^', in the order S, T, D.
+   post = {}
+   for bassCode in HarmonicFunction._BY_CODE:
+      for mask in range( 8 ):
+         prefix = HarmonicFunction.toLetter( HarmonicFunction.fromCode( bassCode ) )
+         others = ''.join( [HarmonicFunction.toLetter( HarmonicFunction.fromCode( code ) ) \
+                            for code in ( 1, 2, 4 ) if mask & ~bassCode & code] )
+         if len(others) > 0:
+            prefix += '^' + others
+         post[( bassCode, mask | bassCode )] = prefix
+   return post
+
+_LABEL_PREFIXES = _makeLabelPrefixes()
+
 #-------------------------------------------------------------------------------
 class HarmonicFunctionalChord:
    '''
@@ -608,9 +1105,14 @@ class HarmonicFunctionalChord:
    
    ## Instance Variables
    # self._key ---- music21.key.Key; represents the key of the harmony
+   # self._tonic ---- str, the name of the tonic of _key, for getSignature()
    # self._bFn ---- it's a HarmonicFunctionalNote
    # self._oFns ---- it's a List of HarmonicFunctionNote s
-   # self._label ---- it's a str
+   # self._label ---- it's a str, or None until getLabel() is first called
+   # self._verboseLabel ---- it's a str, or None until getVerboseLabel() is first called
+   # self._functionMask ---- int, the HarmonicFunction codes of all the voices, or'd
+   #        together, or None until getFunctionMask() is first called
+   # self._signature ---- it's a tuple, made by getSignature() when it's first needed
    
    #----------------------------------------------------------------------------
    def __init__( self, bassFunction, otherFunctions = [], theKey = None ):
@@ -648,20 +1150,42 @@ class HarmonicFunctionalChord:
       if None == theKey:
          # take the bass note's key
          self._key = bassFunction.getKey()
+         self._tonic = bassFunction.getTonicName()
       else:
          self._key = theKey
+         self._tonic = theKey.tonic.name.upper()
       
       self._bFn = bassFunction
       self._oFns = otherFunctions
-      self._label = self.__makeMyLabel()
+      # the labels are made when they're needed, since most chords that are
+      # made while reconciling functions are never labelled
+      self._label = None
+      self._verboseLabel = None
+      self._functionMask = None
+      self._signature = None
    #----------------------------------------------------------------------------
    def __repr__( self ):
         return "<HarmonicFunctionalChord %s>" % self.__str__()
    
+   #----------------------------------------------------------------------------
+   def __eq__( self, other ):
+      if not isinstance( other, HarmonicFunctionalChord ):
+         return NotImplemented
+      return self.getSignature() == other.getSignature()
+   
+   #----------------------------------------------------------------------------
+   def __ne__( self, other ):
+      if not isinstance( other, HarmonicFunctionalChord ):
+         return NotImplemented
+      return self.getSignature() != other.getSignature()
+   
+   #----------------------------------------------------------------------------
+   def __hash__( self ):
+      return hash( self.getSignature() )
+   
    #----------------------------------------------------------------------------
    def __str__( self ):
-      # str created in the __makeMyLabel() function
-      return self._label
+      return self.getLabel()
    
    ############################################################
    ## PRIVATE FUNCTION                                       ##
@@ -670,35 +1194,11 @@ class HarmonicFunctionalChord:
    ## Figures out the label for this HarmonicFunctionalChord ##
    ############################################################
    def __makeMyLabel( self ):
-      # just put in the function of the bass note, if it's good
-      post = HarmonicFunction.toLetter( self._bFn.getFunction() )
-      if "U" == post:
-         pass # maybe later, we'll erase it and do something...
-      # see what the other functions are
-      additionals = []
-      for additionalFunction in self._oFns:
-         potentialNewFunction = HarmonicFunction.toLetter( additionalFunction.getFunction() )
-         if potentialNewFunction != post and potentialNewFunction not in additionals:
-            additionals.append( potentialNewFunction )
-      additionals = set(additionals) # to get rid of duplicates
-      # add the other functions on 
-      if len(additionals) > 0:
-         if "S" in additionals:
-            post += "^S"
-         if "T" in additionals:
-            if len(post) > 1:
-               post += "T"
-            else:
-               post += "^T"
-         if "D" in additionals:
-            if len(post) > 1:
-               post += "D"
-            else:
-               post += "^D"
+      # the function of the bass note, then the others, from the bitmask of
+      # all of them
+      prefix = _LABEL_PREFIXES[( HarmonicFunction.toCode( self._bFn.getFunction() ), self.getFunctionMask() )]
       # append the scale degree of the lowest voice
-      post += "(" + self._bFn.getDegree() + ")"
-      # assign the label to this object
-      return post
+      return prefix + "(" + self._bFn.getDegree() + ")"
    
    #----------------------------------------------------------------------------
    def getKey( self ):
@@ -761,6 +1261,25 @@ class HarmonicFunctionalChord:
       '''
       return self._bFn
    
+   #----------------------------------------------------------------------------
+   def getFunctionMask( self ):
+      '''
+      Returns an int with the :meth:`HarmonicFunction.toCode` of the function
+      of every voice or'd together, so it says which functions are in the chord.
+      
+      >>> from harrisonHarmony import *
+      >>> Sba = HarmonicFunctionalNote( key.Key( 'C' ), HarmonicFunction.Subdominant, FunctionalRole.Base, '4' )
+      >>> Dag = HarmonicFunctionalNote( key.Key( 'C' ), HarmonicFunction.Dominant, FunctionalRole.Agent, '7' )
+      >>> HarmonicFunctionalChord( Sba, [Dag] ).getFunctionMask()
+      5
+      '''
+      if self._functionMask is None:
+         mask = HarmonicFunction.toCode( self._bFn.getFunction() )
+         for additionalFunction in self._oFns:
+            mask |= HarmonicFunction.toCode( additionalFunction.getFunction() )
+         self._functionMask = mask
+      return self._functionMask
+   
    #----------------------------------------------------------------------------
    def getOtherFunctionalNotes( self ):
       '''
@@ -803,6 +1322,8 @@ class HarmonicFunctionalChord:
       >>> a.getLabel()
       'S^T(-6)'
       '''
+      if self._label is None:
+         self._label = self.__makeMyLabel()
       return self._label
    
    #----------------------------------------------------------------------------
@@ -821,16 +1342,44 @@ class HarmonicFunctionalChord:
       >>> a.getVerboseLabel()
       'C:Tba,C:Tag,C:Tas,C:Tba'
       '''
-      post = self._bFn.getLabel()
-      for member in self._oFns:
-         post += "," + member.getLabel()
-      return post
+      if self._verboseLabel is None:
+         self._verboseLabel = ','.join( [member.getLabel() for member in self.getFunctionalNotes()] )
+      return self._verboseLabel
+   
+   #----------------------------------------------------------------------------
+   def getSignature( self ):
+      '''
+      Returns a hashable value that is the same for two
+      :class:`HarmonicFunctionalChord` objects exactly when they are equal().
+      It holds the key's tonic, the lowest voice, and how many times each
+      :class:`HarmonicFunctionalNote` appears in the upper voices, in any order.
+      
+      >>> from harrisonHarmony import *
+      >>> T = HarmonicFunction.Tonic
+      >>> ba = FunctionalRole.Base
+      >>> ag = FunctionalRole.Agent
+      >>> Tag = HarmonicFunctionalNote( key.Key( 'C' ), T, ag, '3' )
+      >>> Tba = HarmonicFunctionalNote( key.Key( 'C' ), T, ba, '1' )
+      >>> a = HarmonicFunctionalChord( Tba, [Tag,Tba] )
+      >>> a.getSignature() == HarmonicFunctionalChord( Tba, [Tba,Tag] ).getSignature()
+      True
+      >>> a.getSignature() == HarmonicFunctionalChord( Tba, [Tba,Tag,Tag] ).getSignature()
+      False
+      '''
+      if self._signature is None:
+         counts = {}
+         for function in self._oFns:
+            counts[function] = counts.get( function, 0 ) + 1
+         self._signature = ( self._tonic, self._bFn, \
+                             frozenset( counts.items() ) )
+      return self._signature
    
    #----------------------------------------------------------------------------
    def equal( self, other ):
       '''
       Returns True if the two HarmonicFunctionalChord objects are
-      semantically equivalent, or False if they are not.
+      semantically equivalent, or False if they are not. The upper voices may
+      be in any order, but each must appear the same number of times.
       
       >>> from harrisonHarmony import *
       >>> T = HarmonicFunction.Tonic
@@ -850,33 +1399,34 @@ class HarmonicFunctionalChord:
       '''
       if not isinstance( other, HarmonicFunctionalChord ):
          return False
-      if ( self._key.tonic.name.upper() == other._key.tonic.name.upper() and self._bFn.equal( other._bFn ) ):
-         if len(self._oFns) != len(other._oFns):
-            return False
-         #
-         for function in self._oFns:
-            foundMatch = False
-            for possibleEquivalent in other._oFns:
-               if function.equal( possibleEquivalent ):
-                  foundMatch = True
-            if foundMatch is False:
-               return False
-         #
-         for function in other._oFns:
-            foundMatch = False
-            for possibleEquivalent in self._oFns:
-               if function.equal( possibleEquivalent ):
-                  foundMatch = True
-            if foundMatch is False:
-               return False
-         #
-         return True
-      else:
-         return False
+      return self.getSignature() == other.getSignature()
 # end Class HarmonicFunctionalChord -------------------------------------------
 
 
 
+#-------------------------------------------------------------------------------
+## The table for _appliedKey(), from ( tonic name, mode ) to a dict from each
+## flattened and sharpened scale degree to its applied key.
+_APPLIED_KEYS = {}
+
+def _appliedKey( theKey, scaleDegree ):
+   # Returns the key that a flattened scale degree is a Subdominant agent in
+   # (a major sixth below that degree of theKey's scale, so it resolves down by
+   # step to the applied ^5), or that a sharpened scale degree is a Dominant
+   # agent in (a major second above it). The table for each key is made the
+   # first time it's needed, and the Key objects are from internKey().
+   tableKey = ( theKey.tonic.name, theKey.mode )
+   table = _APPLIED_KEYS.get( tableKey )
+   if table is None:
+      table = {}
+      scalePitches = theKey.getPitches()
+      for number in range( 1, 8 ):
+         for accidental, appliedInterval in ( ( '-', 'M-6' ), ( '#', 'M2' ) ):
+            name = pitch.Pitch( scalePitches[number-1].name ).transpose( appliedInterval ).name
+            table[accidental + str(number)] = internKey( name )
+      _APPLIED_KEYS[tableKey] = table
+   return table[scaleDegree]
+
 #-------------------------------------------------------------------------------
 def possibleFunctionsFromScaleDegree( theKey, scaleDegree, position ):
    '''
@@ -909,62 +1459,62 @@ def possibleFunctionsFromScaleDegree( theKey, scaleDegree, position ):
    ## appear as a possibility *after* the ConditionForFunction.IsGuaranteed for Agent, so it won't
    ## be considered.
    if ( 2 == len(scaleDegree) and '-' == scaleDegree[0] ):
-      ## finds the applied key--probably a more efficient way to do this one!
+      ## finds the applied key
       ## note that a Subdominant leading tone resolves by step downward to applied ^5
-      appliedKey = key.Key( pitch.Pitch( theKey.getPitches()[int(scaleDegree[1])-1].name ).transpose( 'M-6' ).name )
+      appliedKey = _appliedKey( theKey, scaleDegree )
       ## adds the relevant stuff
-      post.append( [HarmonicFunctionalNote( appliedKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, scaleDegree ), \
-            ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote( appliedKey, HarmonicFunction.Subdominant, FunctionalRole.Base, '4' ) )] )
+      post.append( [HarmonicFunctionalNote.intern( appliedKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, scaleDegree ), \
+            ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern( appliedKey, HarmonicFunction.Subdominant, FunctionalRole.Base, '4' ) )] )
       ## not sure, but I don't think there's a Subdominant-equivalent for the traditional applied vii
-      # post.append( [HarmonicFunctionalNote( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent ), ConditionForFunction( ConditionForFunction.IsPresent, '2' ), ConditionForFunction( ConditionForFunction.IsPresent, '4' )] )
+      # post.append( [HarmonicFunctionalNote.intern( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent ), ConditionForFunction( ConditionForFunction.IsPresent, '2' ), ConditionForFunction( ConditionForFunction.IsPresent, '4' )] )
    
    ## agent is always (and only ever) agent
    if ( '-3' == scaleDegree or '3' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
    elif ( '-6' == scaleDegree or '6' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey,HarmonicFunction.Subdominant,FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
+      post.append( [HarmonicFunctionalNote.intern( theKey,HarmonicFunction.Subdominant,FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
    elif ( '-7' == scaleDegree or '7' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey,HarmonicFunction.Dominant,FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
+      post.append( [HarmonicFunctionalNote.intern( theKey,HarmonicFunction.Dominant,FunctionalRole.Agent, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" ) ] )
    
    ## base is base if in lowest voice
    if ( RelativeVoicePosition.Lowest == position and '1' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
    elif ( RelativeVoicePosition.Lowest == position and '4' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
    elif ( RelativeVoicePosition.Lowest == position and '5' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsGuaranteed, "" )] )
    
    ## here we get things that accumulate multiple functions
    if ( RelativeVoicePosition.Lowest != position ):
       if ( '1' == scaleDegree ):
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "3" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "-3" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "6" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "-6" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote(theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, '4' ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "3" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "-3" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "6" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "-6" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, '4' ) )] )
       elif ( '4' == scaleDegree ):
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "6" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "-6" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "6" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Subdominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Subdominant, FunctionalRole.Agent, "-6" ) )] )
       elif ( '5' == scaleDegree ):
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "7" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "-7" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "3" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "-3" ) )] )
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote(theKey, HarmonicFunction.Tonic, FunctionalRole.Base, '1' ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "7" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Base, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "-7" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "3" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Tonic, FunctionalRole.Agent, "-3" ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Tonic, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Tonic, FunctionalRole.Base, '1' ) )] )
    
    if ( '2' == scaleDegree ):
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "7" ) )] )
-      post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "-7" ) )] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "7" ) )] )
+      post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Dominant, FunctionalRole.Agent, "-7" ) )] )
       if ( RelativeVoicePosition.Lowest != position ):
-         post.append( [HarmonicFunctionalNote( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote(theKey, HarmonicFunction.Dominant, FunctionalRole.Base, '5' ) )] )
+         post.append( [HarmonicFunctionalNote.intern( theKey, HarmonicFunction.Dominant, FunctionalRole.Associate, scaleDegree ), ConditionForFunction( ConditionForFunction.IsLowestVoice, HarmonicFunctionalNote.intern(theKey, HarmonicFunction.Dominant, FunctionalRole.Base, '5' ) )] )
    ## here are probable applied Dominant leading tones
    elif ( 2 == len(scaleDegree) and '#' == scaleDegree[0] ):
-      ## finds the applied key--probably a more efficient way to do this one!
-      appliedKey = key.Key( pitch.Pitch( theKey.getPitches()[int(scaleDegree[1])-1].name ).transpose( 'M2' ).name )
+      ## finds the applied key
+      appliedKey = _appliedKey( theKey, scaleDegree )
       ## adds the relevant stuff
-      post.append( [HarmonicFunctionalNote( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent, '7' ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(appliedKey, HarmonicFunction.Dominant, FunctionalRole.Base, '5' ) )] )
-      post.append( [HarmonicFunctionalNote( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent, '7' ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(appliedKey, HarmonicFunction.Dominant, FunctionalRole.Associate, '2' ) ), \
-                     ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote(appliedKey, HarmonicFunction.Unknown, FunctionalRole.Unknown, '4') )] )
+      post.append( [HarmonicFunctionalNote.intern( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent, '7' ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(appliedKey, HarmonicFunction.Dominant, FunctionalRole.Base, '5' ) )] )
+      post.append( [HarmonicFunctionalNote.intern( appliedKey, HarmonicFunction.Dominant, FunctionalRole.Agent, '7' ), ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(appliedKey, HarmonicFunction.Dominant, FunctionalRole.Associate, '2' ) ), \
+                     ConditionForFunction( ConditionForFunction.IsPresent, HarmonicFunctionalNote.intern(appliedKey, HarmonicFunction.Unknown, FunctionalRole.Unknown, '4') )] )
    
    return post
 # End function possibleFunctionsFromScaleDegree() ------------------------------
@@ -972,6 +1522,73 @@ def possibleFunctionsFromScaleDegree( theKey, scaleDegree, position ):
 
 
 #-------------------------------------------------------------------------------
+## Holds the frozen results of cachedPossibleFunctionsFromScaleDegree().
+## Change the size with possibleFunctionsCache.setCapacity().
+possibleFunctionsCache = LeastRecentlyUsedCache( 256 )
+
+def cachedPossibleFunctionsFromScaleDegree( theKey, scaleDegree, position ):
+   '''
+   Like :func:`possibleFunctionsFromScaleDegree`, but each possibility is a
+   tuple rather than a list, and so is the whole result. The result is
+   remembered in `possibleFunctionsCache`, so later calls with the same tonic,
+   mode, scale degree, and :class:`RelativeVoicePosition` return the very
+   same (shared) tuple, without building any new objects.
+   
+   Since the result is shared, it must not be modified. The mode matters,
+   because the applied keys of chromatic scale degrees are found from the
+   scale of theKey: '#6' is in G# in A major, but in G in A minor.
+   
+   >>> from harrisonHarmony import *
+   >>> from music21 import key
+   >>> a = cachedPossibleFunctionsFromScaleDegree( key.Key( 'E' ), '1', RelativeVoicePosition.Lowest )
+   >>> a
+   ((<HarmonicFunctionalNote ^1 as Tonic base in E>, <ConditionForFunction guaranteed>),)
+   >>> a is cachedPossibleFunctionsFromScaleDegree( key.Key( 'E' ), '1', RelativeVoicePosition.Lowest )
+   True
+   '''
+   cacheKey = ( theKey.tonic.name, theKey.mode, scaleDegree, position )
+   post = possibleFunctionsCache.get( cacheKey )
+   if post is None:
+      post = tuple( [tuple( possibility ) for possibility in \
+                    possibleFunctionsFromScaleDegree( theKey, scaleDegree, position )] )
+      possibleFunctionsCache.put( cacheKey, post )
+   return post
+# End function cachedPossibleFunctionsFromScaleDegree() ------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def _chooseFunction( candidates, isLowestVoice, bassNote, confirmed ):
+   # Given the candidates for one voice, as prepared by
+   # reconcilePossibleFunctions(), returns the HarmonicFunctionalNote that is
+   # true now, or None if none of them are (yet).
+   #
+   # The lowest voice tries IsGuaranteed, then IsPresent. The other voices try
+   # IsLowestVoice, then IsPresent, then IsGuaranteed; IsGuaranteed must go
+   # last, because of complicated reasons where it may not be guaranteed.
+   # If more than one candidate of the same contingency is true, the last one
+   # wins.
+   if isLowestVoice:
+      order = ( ConditionForFunction.IsGuaranteed, ConditionForFunction.IsPresent )
+   else:
+      order = ( ConditionForFunction.IsLowestVoice, ConditionForFunction.IsPresent, \
+                ConditionForFunction.IsGuaranteed )
+   for contingency in order:
+      choice = None
+      for candidateContingency, dependency, harFuncNote in candidates:
+         if candidateContingency != contingency:
+            continue
+         elif ConditionForFunction.IsGuaranteed == contingency:
+            choice = harFuncNote
+         elif ConditionForFunction.IsPresent == contingency:
+            if dependency in confirmed:
+               choice = harFuncNote
+         elif dependency == bassNote: # ConditionForFunction.IsLowestVoice
+            choice = harFuncNote
+      if choice is not None:
+         return choice
+   return None
+
 def reconcilePossibleFunctions( functions ):
    '''
    Takes a list of the outputs from 
@@ -986,6 +1603,7 @@ def reconcilePossibleFunctions( functions ):
    possibilities for the function of a particular note.
    
    Output (currently) takes the form of a :class:`HarmonicFunctionalChord`.
+   Voices that can't be decided are given an Unknown function and role.
    
    >>> from harrisonHarmony import *
    >>> from music21 import key
@@ -1002,93 +1620,72 @@ def reconcilePossibleFunctions( functions ):
    ## TODO: Have a more elegant way to get "unknown" functions.
    ## TODO: What happens when one note has multiple possible functions?
    ## TODO: Doesn't play nicely with applied chords.
-   ## TODO: more efficient implementations probably exist
-
-   post = [] # holds what we'll return
-   # make a list of the same length as the number of voices we have
-   for item in functions:
-      post.append( "" )
-   
-   if ( len(functions) != len(post) ):
-      print( "functions: " + str(len(functions)) + " and post " + str(len(post)) )
-   
-   # This will hold the number of times we've been through the loop,
-   # and if we haven't come up with an answer by safeGuard == 1000 then we're
-   # probably not going to, so we'll just quit.
-   safeGuard = 0
-   # Infinite Loop! Supposed to end when all of "post" has something useful.
-   while ( 5 == 5 ):
-      safeGuard += 1
-      # if lowest voice is undecided, decide the lowest voice
-      if ( "" == post[0] ):
-         # look for a guaranteed function
-         for possibility in functions[0]:
-            if ( ConditionForFunction.IsGuaranteed == possibility[1].getContingency() ):
-               post[0] = possibility[0]
-         # if we still don't have an answer...
-         if ( "" == post[0] ):
-            # go through the list of possibilities again
-            for possibility in functions[0]:
-               # If a function is contingent on something else being present, look
-               # for "something else."
-               if ( ConditionForFunction.IsPresent == possibility[1].getContingency() ):
-                  # this is what we have to find
-                  dependency = possibility[1].getDependency()
-                  # we search the list of things we already know for sure
-                  for alreadyConfirmedNote in post:
-                     if "" != alreadyConfirmedNote:
-                        if alreadyConfirmedNote.equal( dependency ):
-                           post[0] = possibility[0]
-      # Go through upper voices.
-      # Unfortunately we have to remember index numbers, so the voices are
-      # placed into "post" in the right order.
-      for index in range(1,len(functions)):
-         # Do we still need to solve this index?
-         # Look for functions that depend on the bass note.
-         if ( "" == post[index] ):
-            # if we have a confirmed bass note
-            if ( "" != post[0] ):
-               # look through each of the conditions
-               for possibility in functions[index]:
-                  # if a condition depends on the bass voice
-                  if ( ConditionForFunction.IsLowestVoice == possibility[1].getContingency() ):
-                     # if the bass voice is that function
-                     if ( possibility[1].getDependency().equal( post[0]  )):
-                        # assign it
-                        post[index] = possibility[0]
-         # Do we still need to solve this index?
-         # Look for functions that depend on a non-bass note.
-         if ( "" == post[index] ): # same algorithm as for bass notes
-            for possibility in functions[index]:
-               if ( ConditionForFunction.IsPresent == possibility[1].getContingency() ):
-                  dependency = possibility[1].getDependency()
-                  for alreadyConfirmedNote in post:
-                     if "" != alreadyConfirmedNote:
-                        if alreadyConfirmedNote.equal( dependency ):
-                           post[index] = possibility[0]
-         # NB: The IsGuaranteed must go last, because of complicated reasons where it may not be guaranteed.
-         # Do we still need to solve this index?
-         # Look for a guaranteed function,
-         if ( "" == post[index] ):
-            for possibility in functions[index]:
-               if ( ConditionForFunction.IsGuaranteed == possibility[1].getContingency() ):
-                  post[index] = possibility[0]
-      # loop-finish check: do all the elements of "post" have something useful?
-      unassignedNotes = len(post)
-      for thing in post:
-         if thing != "":
-            unassignedNotes -= 1
-      if 0 == unassignedNotes:
-         return HarmonicFunctionalChord( post[0], post[1:] )
-      elif ( safeGuard > 5 ):
-         # TODO: Make this more elegant...
-         # I should be able to assign an "unknown" function/action as something other than a last resort
-         for i in range(len(post)):
-            if post[i] == "":
-               post[i] = HarmonicFunctionalNote( functions[i][0][0].getKey(), HarmonicFunction.Unknown, FunctionalRole.Unknown, functions[i][0][0].getDegree() )
-         return HarmonicFunctionalChord( post[0], post[1:] )
-   # end Infinite Loop
-# End function reconcilePossibleFunctions() ------------------------------------
+   
+   ## Build the dependency graph, once.
+   # For each voice, a list of ( contingency, dependency, note ).
+   # NB: Only the first ConditionForFunction of each possibility is considered.
+   candidates = []
+   # HarmonicFunctionalNote --> voices with an IsPresent condition on that note
+   presentEdges = {}
+   # HarmonicFunctionalNote --> voices with an IsLowestVoice condition on that note
+   lowestVoiceEdges = {}
+   for index in range(len(functions)):
+      theseCandidates = []
+      for possibility in functions[index]:
+         contingency = possibility[1].getContingency()
+         if ConditionForFunction.IsGuaranteed == contingency:
+            dependency = None
+         else:
+            dependency = possibility[1].getDependency()
+            if ConditionForFunction.IsPresent == contingency:
+               presentEdges.setdefault( dependency, [] ).append( index )
+            elif 0 != index: # IsLowestVoice means nothing for the lowest voice
+               lowestVoiceEdges.setdefault( dependency, [] ).append( index )
+         theseCandidates.append( ( contingency, dependency, possibility[0] ) )
+      candidates.append( theseCandidates )
+   
+   ## Propagate confirmations through a worklist.
+   # The worklist holds ( round, voice ) pairs. Voices are decided from lowest
+   # to highest in each round, so when a voice is confirmed, the higher voices
+   # that depend on it are reconsidered in this round, and lower voices in the
+   # next round. Every voice is considered once in the first round; after
+   # that, a voice is only reconsidered when something it depends on is
+   # confirmed. Each voice is confirmed at most once, so this always finishes.
+   post = [None] * len(functions) # holds what we'll return
+   confirmed = set() # the notes in "post"
+   bassNote = None
+   worklist = [( 1, index ) for index in range(len(functions))]
+   scheduled = set( worklist )
+   while len(worklist) > 0:
+      thisRound, index = heapq.heappop( worklist )
+      if post[index] is not None:
+         continue
+      decision = _chooseFunction( candidates[index], 0 == index, bassNote, confirmed )
+      if decision is None:
+         continue
+      post[index] = decision
+      confirmed.add( decision )
+      waiting = presentEdges.get( decision, [] )
+      if 0 == index:
+         bassNote = decision
+         waiting = waiting + lowestVoiceEdges.get( decision, [] )
+      for other in waiting:
+         if post[other] is None:
+            if other > index:
+               nextTime = ( thisRound, other )
+            else:
+               nextTime = ( thisRound + 1, other )
+            if nextTime not in scheduled:
+               scheduled.add( nextTime )
+               heapq.heappush( worklist, nextTime )
+   
+   # TODO: Make this more elegant...
+   # I should be able to assign an "unknown" function/action as something other than a last resort
+   for i in range(len(post)):
+      if post[i] is None:
+         post[i] = HarmonicFunctionalNote.intern( functions[i][0][0].getKey(), HarmonicFunction.Unknown, FunctionalRole.Unknown, functions[i][0][0].getDegree() )
+   return HarmonicFunctionalChord( post[0], post[1:] )
+# End function reconcilePossibleFunctions() ------------------------------------
 
 
 
@@ -1099,6 +1696,12 @@ def labelThisChord( whatKey, harmony, verbosity = 'concise' ):
    corresponding str label. There is an optional third argument to specify
    whether you want a "verbose" or "concise" label; default is "concise."
    
+   The chord may also be any of the other kinds that :func:`labelChords`
+   takes, like the list of ( MIDI note number, pitch name ) tuples in each
+   vertical slice that analyzeScore() finds without chordifying.
+   
+   Labels are remembered in `labelCache` (see :func:`cachedLabelScaleDegrees`).
+   
    >>> from music21 import key, chord
    >>> from harrisonHarmony import *
    >>> Dftonic = key.Key( 'D-' )
@@ -1114,212 +1717,1843 @@ def labelThisChord( whatKey, harmony, verbosity = 'concise' ):
    'D-:Tag,D-:Sba,D-:Tba,D-:Sag'
    '''
    
-   ## sort the Chord from lowest to highest, using MIDI note number
-   harmony = chord.Chord( sorted( harmony, key=lambda a: a.midi ) )
+   ## find the scale degrees of each chord member, from lowest to highest,
+   ## using MIDI note number
+   listOfScaleDegrees = _scaleDegreesOfChords( whatKey, [_sortedSpellings( harmony )] )[0]
    
-   ## this will hold a list of str that are the scale degrees present in the chord
-   listOfScaleDegrees = []
+   return cachedLabelScaleDegrees( whatKey, listOfScaleDegrees, verbosity )
+# End function labelThisChord() ------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def labelScaleDegrees( whatKey, listOfScaleDegrees, verbosity = 'concise' ):
+   '''
+   Given a :class:`music21.key.Key` and a list of the scale degrees in a chord
+   (as returned by :func:`chromaticScaleDegree`), from lowest to highest,
+   finds the corresponding str label. The optional third argument is the
+   same as for :func:`labelThisChord`.
    
-   ## find the scale degrees of each chord member
-   for chordMember in harmony:
-      listOfScaleDegrees.append( chromaticScaleDegree( whatKey, chordMember ) )
+   >>> from music21 import key
+   >>> from harrisonHarmony import *
+   >>> labelScaleDegrees( key.Key( 'D-' ), ['1', '3', '5', '1'] )
+   'T(1)'
+   >>> labelScaleDegrees( key.Key( 'D-' ), ['3', '4', '1', '6'], 'verbose' )
+   'D-:Tag,D-:Sba,D-:Tba,D-:Sag'
+   '''
+   
+   ## Reconcile the scale degrees into a HarmonicFunctionalChord, then return
+   ## the label.
+   if 'concise' == verbosity:
+      return _reconcileScaleDegrees( whatKey, listOfScaleDegrees ).getLabel()
+   elif 'verbose' == verbosity:
+      return _reconcileScaleDegrees( whatKey, listOfScaleDegrees ).getVerboseLabel()
+   else:
+      raise NonsensicalInputError( "labelThisChord(): third argument must be 'verbose' or 'concise' but I got '" + verbosity + "'" )
+# End function labelScaleDegrees() ---------------------------------------------
+
+def _reconcileScaleDegrees( whatKey, listOfScaleDegrees ):
+   # Does the work for labelScaleDegrees(): returns the HarmonicFunctionalChord
+   # for the scale degrees.
    
    ## this holds the HarmonicFunctionalNote corresponding to each scale degree
    ## start by putting the bass voice on
-   listOfHarmonicFunctionalNotes = [ possibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[0], RelativeVoicePosition.Lowest ) ]
+   listOfHarmonicFunctionalNotes = [ cachedPossibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[0], RelativeVoicePosition.Lowest ) ]
    
    ## this puts the scale degrees into HarmonicFunctionalNotes, taking account of which is the bass voice
    ## I should change this to use the map() function
    for ecks in range( 1, len(listOfScaleDegrees) - 1 ):
-      listOfHarmonicFunctionalNotes.append( possibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[ecks], RelativeVoicePosition.Middle ) )
+      listOfHarmonicFunctionalNotes.append( cachedPossibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[ecks], RelativeVoicePosition.Middle ) )
    
    ## finally, put add the highest voice
-   listOfHarmonicFunctionalNotes.append( possibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[len(listOfScaleDegrees)-1], RelativeVoicePosition.Highest ) )
+   listOfHarmonicFunctionalNotes.append( cachedPossibleFunctionsFromScaleDegree( whatKey, listOfScaleDegrees[len(listOfScaleDegrees)-1], RelativeVoicePosition.Highest ) )
    
-   ## Reconcile the list of HarmonicFunctionalNote into a HarmonicFunctionalChord,
-   ## then return the label.
-   if 'concise' == verbosity:
-      return reconcilePossibleFunctions( listOfHarmonicFunctionalNotes ).getLabel()
-   elif 'verbose' == verbosity:
-      return reconcilePossibleFunctions( listOfHarmonicFunctionalNotes ).getVerboseLabel()
+   ## Reconcile the list of HarmonicFunctionalNote into a HarmonicFunctionalChord
+   return reconcilePossibleFunctions( listOfHarmonicFunctionalNotes )
+
+
+
+#-------------------------------------------------------------------------------
+## Holds the results of cachedLabelScaleDegrees(). Change the size with
+## labelCache.setCapacity(); keep it between runs with labelCache.save() and
+## labelCache.load().
+labelCache = LeastRecentlyUsedCache( 4096 )
+
+def _labelCacheKey( whatKey, listOfScaleDegrees, verbosity ):
+   # The key for a label in labelCache.
+   return ( whatKey.tonic.name, whatKey.mode, tuple( listOfScaleDegrees ), verbosity )
+
+def cachedLabelScaleDegrees( whatKey, listOfScaleDegrees, verbosity = 'concise' ):
+   '''
+   Like :func:`labelScaleDegrees`, but the label is remembered in `labelCache`,
+   keyed on the tonic and mode, the scale degrees (in order), and the
+   verbosity. The next time the same chord comes along, it's simply looked
+   up. (The mode matters for chromatic scale degrees, whose applied keys are
+   found from the scale.)
+   
+   >>> from music21 import key
+   >>> from harrisonHarmony import *
+   >>> cachedLabelScaleDegrees( key.Key( 'D-' ), ['1', '3', '5', '1'] )
+   'T(1)'
+   '''
+   cacheKey = _labelCacheKey( whatKey, listOfScaleDegrees, verbosity )
+   post = labelCache.get( cacheKey )
+   if post is None:
+      post = labelScaleDegrees( whatKey, listOfScaleDegrees, verbosity )
+      labelCache.put( cacheKey, post )
+   return post
+# End function cachedLabelScaleDegrees() ---------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def _sortedSpellings( harmony ):
+   # Given one of the chords accepted by labelChords(), returns a list of
+   # ( MIDI note number, pitch name ) tuples, from lowest to highest.
+   post = []
+   for chordMember in harmony:
+      if isinstance( chordMember, tuple ):
+         post.append( chordMember )
+      else:
+         if isinstance( chordMember, str ):
+            chordMember = pitch.Pitch( chordMember )
+         elif isinstance( chordMember, note.Note ):
+            chordMember = chordMember.pitch
+         post.append( ( chordMember.midi, chordMember.name ) )
+   post.sort( key = lambda a: a[0] )
+   return post
+
+def _scaleDegreesOfChords( whatKey, listOfSpellings ):
+   # Given a music21.key.Key and a list with the output of _sortedSpellings()
+   # for any number of chords, returns a list with a tuple of the scale
+   # degrees in each chord. All the scale degrees are found at once.
+   tonicName = whatKey.tonic.name
+   pitchNames = [name for spellings in listOfSpellings for midi, name in spellings]
+   
+   tonicCode = _SPELLING_CODES.get( tonicName )
+   if numpy is not None and tonicCode is not None:
+      # -1 is for spellings that aren't in the table; those we do separately
+      pitchCodes = numpy.fromiter( [_SPELLING_CODES.get( name, -1 ) for name in pitchNames], \
+                                   dtype = numpy.int8, count = len(pitchNames) )
+      degreeCodes = _DEGREE_CODE_TABLE[tonicCode][pitchCodes]
+      allDegrees = [_DEGREE_STRINGS[code] for code in degreeCodes.tolist()]
+      for i in numpy.flatnonzero( pitchCodes < 0 ).tolist():
+         allDegrees[i] = _computeScaleDegree( tonicName, pitchNames[i] )
    else:
-      raise NonsensicalInputError( "labelThisChord(): third argument must be 'verbose' or 'concise' but I got '" + verbosity + "'" )
-# End function labelThisChord() ------------------------------------------------
+      allDegrees = []
+      for name in pitchNames:
+         if ( tonicName, name ) in _SCALE_DEGREE_TABLE:
+            allDegrees.append( _SCALE_DEGREE_TABLE[( tonicName, name )] )
+         else:
+            allDegrees.append( _computeScaleDegree( tonicName, name ) )
+   
+   # split them back into chords
+   post = []
+   start = 0
+   for spellings in listOfSpellings:
+      post.append( tuple( allDegrees[start:start + len(spellings)] ) )
+      start += len(spellings)
+   return post
+
+def _labelsOfScaleDegrees( whatKey, scaleDegrees, verbosities ):
+   # Returns a tuple with the label of the scale degrees in each of the
+   # verbosities, from reconciling them only once.
+   harmony = _reconcileScaleDegrees( whatKey, scaleDegrees )
+   return tuple( [harmony.getLabel() if 'concise' == verbosity else harmony.getVerboseLabel() \
+                  for verbosity in verbosities] )
+
+def _labelScaleDegreesChunk( tonicName, mode, listOfScaleDegrees, verbosities ):
+   # Runs in a worker process for labelChords(). Given the name of the tonic
+   # pitch, the mode, and a list of scale-degree tuples, returns a list with
+   # a tuple of the labels of each, like _labelsOfScaleDegrees(). Everything
+   # here has to be picklable, so we get a pitch name and mode rather than a
+   # music21.key.Key.
+   whatKey = internKey( tonicName, mode )
+   return [_labelsOfScaleDegrees( whatKey, scaleDegrees, verbosities ) for scaleDegrees in listOfScaleDegrees]
+
+def _labellingPool( processes ):
+   # Returns a ProcessPoolExecutor with that many workers to give to
+   # _labelListOfScaleDegrees(), or None if processes is 1 or
+   # concurrent.futures isn't available. The caller shuts it down. Starting
+   # one takes a while, so make one for a whole analysis.
+   if processes > 1 and ProcessPoolExecutor is not None:
+      return ProcessPoolExecutor( processes )
+   return None
+
+def labelChords( whatKey, chords, verbosity = 'concise', processes = 1 ):
+   '''
+   Given a :class:`music21.key.Key` and a list (or other iterable) of chords,
+   returns a list with the label of each chord, in the same order, just like
+   calling :func:`labelThisChord` on each of them. The optional third
+   argument is the same as for :func:`labelThisChord`.
+   
+   A chord may be a :class:`music21.chord.Chord` or a list of
+   :class:`music21.note.Note` or :class:`music21.pitch.Pitch` objects, like
+   for :func:`labelThisChord`. It may also be a list of pitch names with
+   octaves (like 'C#4'), or a list of ( MIDI note number, pitch name ) tuples
+   (like ( 61, 'C#' )), so no music21 objects are required.
+   
+   This is faster than labelling each chord separately: the scale degrees of
+   every chord are found at once, and each distinct set of scale degrees is
+   only labelled once.
+   
+   If the optional fourth argument is more than 1, the distinct sets of scale
+   degrees that aren't already in `labelCache` are labelled in that many
+   worker processes, a chunk at a time. The labels are the same either way,
+   and so is their order. Without :mod:`concurrent.futures`, everything is
+   labelled in this process.
+   
+   >>> from music21 import key
+   >>> from harrisonHarmony import *
+   >>> labelChords( key.Key( 'C' ), [['C3', 'E4', 'G4'], [(55, 'G'), (71, 'B'), (74, 'D')], ['C3', 'G4', 'E5']] )
+   ['T(1)', 'D(5)', 'T(1)']
+   '''
+   if 'concise' != verbosity and 'verbose' != verbosity:
+      raise NonsensicalInputError( "labelChords(): third argument must be 'verbose' or 'concise' but I got '" + verbosity + "'" )
+   
+   listOfScaleDegrees = _scaleDegreesOfChords( whatKey, [_sortedSpellings( harmony ) for harmony in chords] )
+   executor = _labellingPool( processes )
+   try:
+      labels = _labelListOfScaleDegrees( whatKey, listOfScaleDegrees, ( verbosity, ), processes, executor )
+   finally:
+      if executor is not None:
+         executor.shutdown()
+   return [label for label, in labels]
+# End function labelChords() ---------------------------------------------------
+
+def _labelListOfScaleDegrees( whatKey, listOfScaleDegrees, verbosities, processes, executor = None ):
+   # Does the work for labelChords(), once it has a list with a tuple of the
+   # scale degrees in each chord. Returns a list with a tuple of the labels
+   # of each, one for each of the verbosities. Each distinct set of scale
+   # degrees that isn't in labelCache is reconciled once, for all the
+   # verbosities. If executor is a ProcessPoolExecutor from _labellingPool()
+   # with "processes" workers, that's done in its processes.
+   
+   # find each distinct set of scale degrees in the cache; the rest go in
+   # toLabel, in the order they first appear
+   labels = {}
+   toLabel = []
+   for scaleDegrees in listOfScaleDegrees:
+      if scaleDegrees not in labels:
+         labels[scaleDegrees] = tuple( [labelCache.get( _labelCacheKey( whatKey, scaleDegrees, verbosity ) ) \
+                                        for verbosity in verbosities] )
+         if None in labels[scaleDegrees]:
+            toLabel.append( scaleDegrees )
+   
+   # label the ones that weren't in the cache
+   if executor is not None and len(toLabel) > 1:
+      # a few chunks for each process, so they all finish at about the same time
+      chunkSize = max( 1, len(toLabel) // ( processes * 4 ) )
+      chunks = [toLabel[i:i + chunkSize] for i in range( 0, len(toLabel), chunkSize )]
+      # map() gives the results in the same order as the chunks
+      results = executor.map( _labelScaleDegreesChunk, [whatKey.tonic.name] * len(chunks), \
+                              [whatKey.mode] * len(chunks), chunks, [verbosities] * len(chunks) )
+      newLabels = [theLabels for chunk in results for theLabels in chunk]
+   else:
+      newLabels = [_labelsOfScaleDegrees( whatKey, scaleDegrees, verbosities ) for scaleDegrees in toLabel]
+   for scaleDegrees, theLabels in zip( toLabel, newLabels ):
+      labels[scaleDegrees] = theLabels
+      for verbosity, label in zip( verbosities, theLabels ):
+         labelCache.put( _labelCacheKey( whatKey, scaleDegrees, verbosity ), label )
+   
+   return [labels[scaleDegrees] for scaleDegrees in listOfScaleDegrees]
 
 
 
 #-------------------------------------------------------------------------------
-def analyzeThis( pathname, theSettings=None ):
+## What AnalysisResults knows about each chord. The offset is from the start of
+## the measure, and the measureNumber is None for chords that aren't in a
+## Measure. The scaleDegrees are a tuple of str, from lowest to highest, in
+## the key whose tonic is named by tonic, in the mode ('major' or 'minor').
+ChordResult = namedtuple( 'ChordResult', ['offset', 'measureOffset', 'measureNumber', \
+                                          'scaleDegrees', 'conciseLabel', 'verboseLabel', 'tonic', 'mode'] )
+
+class AnalysisResults( object ):
    '''
-   Given the path to a music21-supported score, imports the score, performs a
-   harmonic-functional analysis, annotates the score, and displays it with the
-   default show().
+   Holds the results of analyzing a score, as returned by
+   :func:`analyzeScore`: the key, and a :class:`ChordResult` for each chord,
+   in score order. Nothing is displayed unless you call :meth:`show`.
+   '''
+   
+   ## Instance Variables
+   # _key ---- music21.key.Key of the score
+   # _chords ---- list of ChordResult
+   # _harmonies ---- list of the music21.chord.Chord of each ChordResult, in the chordified score
+   #        (or None if the score wasn't chordified)
+   # _score ---- music21.stream.Score that was analyzed, or None if we were given a Part
+   #        (or it hasn't been parsed from _pathname yet)
+   # _pathname ---- str, the file to parse the Score from when it's needed, or None
+   # _chordifiedScore ---- music21.stream.Part, or None if the score wasn't chordified
+   # _settings ---- HarrisonHarmonySettings for annotate()
+   # _annotated ---- bool, whether annotate() was already called
+   # _unplaced ---- int, how many labels annotate() couldn't place
+   
+   #----------------------------------------------------------------------------
+   def __init__( self, theKey, chords, harmonies, theScore, chordifiedScore, theSettings, pathname = None ):
+      self._key = theKey
+      self._chords = chords
+      self._harmonies = harmonies
+      self._score = theScore
+      self._pathname = pathname
+      self._chordifiedScore = chordifiedScore
+      self._settings = theSettings
+      self._annotated = False
+      self._unplaced = 0
+   
+   #----------------------------------------------------------------------------
+   def __repr__( self ):
+      return "<AnalysisResults %d chords in %s>" % ( len(self._chords), self._key.tonic.name )
+   
+   #----------------------------------------------------------------------------
+   def getKey( self ):
+      '''
+      Returns the :class:`music21.key.Key` that was found for the score.
+      '''
+      return self._key
+   
+   #----------------------------------------------------------------------------
+   def getChords( self ):
+      '''
+      Returns a list with a :class:`ChordResult` for each chord, in score order.
+      '''
+      return self._chords
+   
+   #----------------------------------------------------------------------------
+   def getLabels( self, verbosity = 'concise' ):
+      '''
+      Returns a list with the label of each chord, in score order. The
+      optional argument is the same as for :func:`labelThisChord`.
+      '''
+      if 'concise' == verbosity:
+         return [theChord.conciseLabel for theChord in self._chords]
+      elif 'verbose' == verbosity:
+         return [theChord.verboseLabel for theChord in self._chords]
+      else:
+         raise NonsensicalInputError( "getLabels(): argument must be 'verbose' or 'concise' but I got '" + verbosity + "'" )
+   
+   #----------------------------------------------------------------------------
+   def getScore( self ):
+      '''
+      Returns the :class:`music21.stream.Score` that was analyzed, or None if
+      it was a :class:`music21.stream.Part`. If the results came from the
+      analysis cache (see the 'analysisCacheDirectory' setting), the score is
+      only parsed the first time this is called.
+      '''
+      if self._score is None and self._pathname is not None:
+         print( "Importing score to music21." )
+         self._score = converter.parse( self._pathname )
+      return self._score
+   
+   #----------------------------------------------------------------------------
+   def getChordifiedScore( self ):
+      '''
+      Returns the chordified :class:`music21.stream.Part` that was labelled,
+      or None if the score was sliced without chordifying it (see the
+      'chordifyScore' setting) or the results came from the analysis cache.
+      '''
+      return self._chordifiedScore
+   
+   #----------------------------------------------------------------------------
+   def toDict( self ):
+      '''
+      Returns the results as a dict with only str, float, int, list, and None,
+      which can be written with :mod:`json`. It has the 'key' (the name of the
+      tonic pitch), the 'mode', and the 'chords', which is a list of dicts
+      with the fields of :class:`ChordResult`.
+      '''
+      chords = []
+      for theChord in self._chords:
+         chords.append( { 'offset' : float(theChord.offset), 'measureOffset' : float(theChord.measureOffset), \
+                          'measureNumber' : theChord.measureNumber, 'scaleDegrees' : list( theChord.scaleDegrees ), \
+                          'conciseLabel' : theChord.conciseLabel, 'verboseLabel' : theChord.verboseLabel, \
+                          'tonic' : theChord.tonic, 'mode' : theChord.mode } )
+      return { 'key' : self._key.tonic.name, 'mode' : self._key.mode, 'chords' : chords }
+   
+   #----------------------------------------------------------------------------
+   def toCompact( self ):
+      '''
+      Returns the chords as a :class:`CompactAnalysis`, which takes much less
+      memory than the :class:`ChordResult` objects.
+      '''
+      return CompactAnalysis( self._chords )
+   
+   #----------------------------------------------------------------------------
+   def annotate( self ):
+      '''
+      Puts the labels on the score as lyrics, with the verbosity from the
+      'chordLabelVerbosity' setting. If the 'annotateChordifiedScore' setting
+      is True (or there is no Score), they go on the chordified score instead,
+      if there is one.
+      Doing it more than once doesn't do anything more.
+      
+      On the Score, each label goes on the first note, rest, or chord at the
+      same offset in the same measure of the lowest part. Returns the number
+      of labels that couldn't be placed because there wasn't one.
+      '''
+      if self._annotated:
+         return self._unplaced
+      self._annotated = True
+      self._unplaced = 0
+      self.getScore()
+      theLabels = self.getLabels( self._settings.parsePropertyGet( 'chordLabelVerbosity' ) )
+      if self._score is None or ( self._chordifiedScore is not None and \
+                                  self._settings.parsePropertyGet( 'annotateChordifiedScore' ) ):
+         for harmony, theLabel in zip( self._harmonies, theLabels ):
+            harmony.lyric = theLabel
+         return self._unplaced
+      
+      # find the index of the bass part
+      foundBassPart = False
+      tryThisIndex = len(self._score) - 1
+      indexOfBassPart = -1
+      while False == foundBassPart:
+         if -1 == tryThisIndex:
+            foundBassPart = True
+         elif isinstance( self._score[tryThisIndex], stream.Part ):
+            foundBassPart = True
+            indexOfBassPart = tryThisIndex
+         else:
+            tryThisIndex -= 1
+      
+      # Index the bass part once: ( measure offset, offset in the measure ) -->
+      # the first note, rest, or chord there. There may be other things at the
+      # same offset as a measure, like an Instrument at the beginning of the
+      # Part, so we only look at the first Measure at each offset.
+      index = {}
+      measureOffsets = set()
+      for thisOne in self._score[indexOfBassPart]:
+         if isinstance( thisOne, stream.Measure ) and thisOne.offset not in measureOffsets:
+            measureOffsets.add( thisOne.offset )
+            for element in thisOne:
+               if isinstance( element, note.GeneralNote ) and ( thisOne.offset, element.offset ) not in index:
+                  index[( thisOne.offset, element.offset )] = element
+      
+      for theChord, theLabel in zip( self._chords, theLabels ):
+         element = index.get( ( theChord.measureOffset, theChord.offset ) )
+         if element is None:
+            self._unplaced += 1
+         else:
+            element.lyric = theLabel
+      if self._unplaced > 0:
+         print( "AnalysisResults.annotate(): couldn't place " + str(self._unplaced) + " of " + \
+                str(len(self._chords)) + " labels on the score." )
+      return self._unplaced
+   
+   #----------------------------------------------------------------------------
+   def show( self ):
+      '''
+      Annotates the score (see :meth:`annotate`) and displays it with the
+      default show().
+      '''
+      self.annotate()
+      self.getScore()
+      print( "Processing score for display." )
+      if self._score is None or ( self._chordifiedScore is not None and \
+                                  self._settings.parsePropertyGet( 'annotateChordifiedScore' ) ):
+         self._chordifiedScore.show()
+      else:
+         self._score.show()
+# End: class AnalysisResults ---------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+## The letters for the HarmonicFunction and FunctionalRole codes that
+## CompactAnalysis keeps.
+_FUNCTION_LETTERS = dict( [( code, HarmonicFunction.toLetter( function ) ) \
+                           for code, function in HarmonicFunction._BY_CODE.items()] )
+_ROLE_LETTERS = tuple( [FunctionalRole.toLetter( role ) for role in FunctionalRole._BY_CODE] )
+
+class CompactAnalysis( object ):
    '''
+   Holds the analysis of many chords in columns of numbers, rather than an
+   object for each chord, so a whole corpus can be kept in memory. Give the
+   constructor a list of :class:`ChordResult` (like from
+   :meth:`AnalysisResults.getChords`), and add more with :meth:`extend`.
+   
+   For each chord, there's a column with the offset, measure offset, and
+   measure number (-1 for none), the code of the tonic it was labelled in,
+   the mode of that key (0 for major, 1 for minor; see :meth:`getMode`),
+   the code of the scale degree of the lowest voice, and a bitmask of the
+   functions of its voices (1 for Subdominant, 2 for Tonic, 4 for Dominant).
+   For each voice, from lowest to highest, there are columns with the code of
+   its tonic (which differs for applied chords), function, and role; the
+   voices of chord i are from getColumn( 'voiceStart' )[i] up to
+   getColumn( 'voiceStart' )[i+1]. The labels are made from the codes only
+   when you ask for them.
+   
+   Use :meth:`save` to write one to a file, and :func:`loadCompactAnalysis`
+   to read it back without copying the columns into memory. Call
+   :meth:`close` (or use it in a "with" block) when you're done with one
+   read from a file, so the file is let go.
+   
+   >>> from harrisonHarmony import *
+   >>> a = analyzeScore( 'score.xml' ).toCompact()
+   >>> a.getLabel( 0 ) == a.getLabels()[0]
+   True
+   '''
+   
+   ## Instance Variables
+   # _columns ---- dict from column name to array.array
+   # _names ---- list of str, the pitch name for each tonic code
+   # _degrees ---- list of str, the scale degree for each degree code
+   # _nameCodes, _degreeCodes ---- dicts, the other way around
+   # _sonorities ---- dict from ( tonic, mode, scale degrees ) to the codes for
+   #        that sonority, so each one is only reconciled once
+   # _mapped ---- the mmap.mmap the columns are in, or None if they're arrays
+   
+   ## The type code of each column.
+   _COLUMN_TYPES = OrderedDict( [( 'offset', 'd' ), ( 'measureOffset', 'd' ), ( 'measureNumber', 'q' ), \
+                                 ( 'tonic', 'h' ), ( 'mode', 'B' ), ( 'bassDegree', 'h' ), ( 'functions', 'B' ), \
+                                 ( 'voiceStart', 'Q' ), ( 'voiceTonic', 'h' ), ( 'voiceFunction', 'B' ), \
+                                 ( 'voiceRole', 'B' )] )
+   
+   ## The mode for each code in the 'mode' column.
+   _MODES = ( 'major', 'minor' )
+   
+   #----------------------------------------------------------------------------
+   def __init__( self, chords = () ):
+      self._columns = {}
+      for name, typeCode in CompactAnalysis._COLUMN_TYPES.items():
+         self._columns[name] = array.array( typeCode )
+      self._columns['voiceStart'].append( 0 )
+      self._names = sorted( _SPELLING_CODES, key = lambda name: _SPELLING_CODES[name] )
+      self._nameCodes = dict( _SPELLING_CODES )
+      self._degrees = list( _DEGREE_STRINGS )
+      self._degreeCodes = dict( _DEGREE_CODES )
+      self._sonorities = {}
+      self._mapped = None
+      self.extend( chords )
+   
+   #----------------------------------------------------------------------------
+   def __repr__( self ):
+      return "<CompactAnalysis %d chords>" % len(self)
+   
+   #----------------------------------------------------------------------------
+   def __len__( self ):
+      return len(self._columns['offset'])
+   
+   #----------------------------------------------------------------------------
+   def __enter__( self ):
+      return self
+   
+   #----------------------------------------------------------------------------
+   def __exit__( self, excType, excValue, traceback ):
+      self.close()
+      return False
+   
+   #----------------------------------------------------------------------------
+   def close( self ):
+      '''
+      If this was read with :func:`loadCompactAnalysis`, lets go of the file
+      its columns are in. Afterward, it's empty. If it wasn't, or it's
+      already closed, this does nothing.
+      '''
+      if self._mapped is None:
+         return
+      for name, typeCode in CompactAnalysis._COLUMN_TYPES.items():
+         column = self._columns.get( name )
+         if isinstance( column, memoryview ):
+            column.release()
+         self._columns[name] = array.array( typeCode )
+      self._columns['voiceStart'].append( 0 )
+      self._mapped.close()
+      self._mapped = None
+   
+   #----------------------------------------------------------------------------
+   def _code( self, value, codes, values ):
+      # Returns the code for value, adding one if it doesn't have one yet.
+      if value not in codes:
+         codes[value] = len(values)
+         values.append( value )
+      return codes[value]
+   
+   #----------------------------------------------------------------------------
+   def _sonorityCodes( self, tonic, mode, scaleDegrees ):
+      # Returns a 3-tuple with the code of the degree of the lowest voice, the
+      # functions bitmask, and a list of ( tonic, function, role ) codes for
+      # each voice.
+      theKey = ( tonic, mode, tuple( scaleDegrees ) )
+      if theKey not in self._sonorities:
+         harmony = _reconcileScaleDegrees( internKey( tonic, mode ), scaleDegrees )
+         voices = []
+         for member in harmony.getFunctionalNotes():
+            voices.append( ( self._code( member.getTonicName(), self._nameCodes, self._names ), \
+                             HarmonicFunction.toCode( member.getFunction() ), FunctionalRole.toCode( member.getRole() ) ) )
+         bassDegree = self._code( harmony.getBassFunctionalNote().getDegree(), self._degreeCodes, self._degrees )
+         self._sonorities[theKey] = ( bassDegree, harmony.getFunctionMask(), voices )
+      return self._sonorities[theKey]
+   
+   #----------------------------------------------------------------------------
+   def extend( self, chords ):
+      '''
+      Adds a :class:`ChordResult` for each chord in the argument. Raises
+      :exc:`NonsensicalInputError` if this was read from a file.
+      '''
+      if self._mapped is not None:
+         raise NonsensicalInputError( "CompactAnalysis.extend(): an analysis read from a file can't be changed" )
+      columns = self._columns
+      for theChord in chords:
+         bassDegree, functions, voices = self._sonorityCodes( theChord.tonic, theChord.mode, theChord.scaleDegrees )
+         columns['offset'].append( float(theChord.offset) )
+         columns['measureOffset'].append( float(theChord.measureOffset) )
+         columns['measureNumber'].append( -1 if theChord.measureNumber is None else theChord.measureNumber )
+         columns['tonic'].append( self._code( theChord.tonic, self._nameCodes, self._names ) )
+         columns['mode'].append( CompactAnalysis._MODES.index( theChord.mode ) )
+         columns['bassDegree'].append( bassDegree )
+         columns['functions'].append( functions )
+         for voiceTonic, voiceFunction, voiceRole in voices:
+            columns['voiceTonic'].append( voiceTonic )
+            columns['voiceFunction'].append( voiceFunction )
+            columns['voiceRole'].append( voiceRole )
+         columns['voiceStart'].append( len(columns['voiceTonic']) )
    
-   # TODO: parallelization: we could do .chordify() and .getSolution() (for key-finding)
-   # simultaneously, and (for as long as we're only doing 'vertical' analysis) we could
-   # also analyze all the chords simultaneously.
+   #----------------------------------------------------------------------------
+   def getColumn( self, name ):
+      '''
+      Returns the :class:`array.array` with the column of that name: 'offset',
+      'measureOffset', 'measureNumber', 'tonic', 'mode', 'bassDegree', 'functions',
+      'voiceStart', 'voiceTonic', 'voiceFunction', or 'voiceRole'. It must
+      not be modified. If this was read from a file, it's a read-only
+      memoryview of the file instead.
+      '''
+      if name not in self._columns:
+         raise NonsensicalInputError( "CompactAnalysis: there's no column called '" + str(name) + "'" )
+      return self._columns[name]
+   
+   #----------------------------------------------------------------------------
+   def getTonicName( self, code ):
+      '''
+      Returns the pitch name of a code in the 'tonic' or 'voiceTonic' column.
+      '''
+      return self._names[code]
+   
+   #----------------------------------------------------------------------------
+   def getMode( self, code ):
+      '''
+      Returns 'major' or 'minor' for a code in the 'mode' column.
+      '''
+      return CompactAnalysis._MODES[code]
+   
+   #----------------------------------------------------------------------------
+   def getDegree( self, code ):
+      '''
+      Returns the scale degree of a code in the 'bassDegree' column.
+      '''
+      return self._degrees[code]
+   
+   #----------------------------------------------------------------------------
+   def getLabel( self, index, verbosity = 'concise' ):
+      '''
+      Returns the label of the chord at index, like :func:`labelThisChord`.
+      '''
+      columns = self._columns
+      start = columns['voiceStart'][index]
+      end = columns['voiceStart'][index + 1]
+      if 'concise' == verbosity:
+         # like HarmonicFunctionalChord.getLabel()
+         bassFunction = columns['voiceFunction'][start]
+         post = _FUNCTION_LETTERS[bassFunction]
+         others = columns['functions'][index] & ~bassFunction
+         for code in ( 1, 2, 4 ): # S, T, D
+            if others & code:
+               if len(post) > 1:
+                  post += _FUNCTION_LETTERS[code]
+               else:
+                  post += '^' + _FUNCTION_LETTERS[code]
+         return post + '(' + self._degrees[columns['bassDegree'][index]] + ')'
+      elif 'verbose' == verbosity:
+         return ','.join( [self._names[columns['voiceTonic'][i]] + ':' + \
+                           _FUNCTION_LETTERS[columns['voiceFunction'][i]] + \
+                           _ROLE_LETTERS[columns['voiceRole'][i]] for i in range( start, end )] )
+      else:
+         raise NonsensicalInputError( "getLabel(): second argument must be 'verbose' or 'concise' but I got '" + verbosity + "'" )
+   
+   #----------------------------------------------------------------------------
+   def getLabels( self, verbosity = 'concise' ):
+      '''
+      Returns a list with the label of every chord.
+      '''
+      return [self.getLabel( index, verbosity ) for index in range( len(self) )]
+   
+   #----------------------------------------------------------------------------
+   def findLabel( self, label, verbosity = 'concise' ):
+      '''
+      Returns a list with the index of every chord with that label. For
+      example, a.findLabel( 'D^S(4)' ) finds every chord labelled as a
+      dominant with a subdominant agent, over scale degree 4.
+      '''
+      if verbosity not in ( 'concise', 'verbose' ):
+         raise NonsensicalInputError( "findLabel(): second argument must be 'verbose' or 'concise' but I got '" + str(verbosity) + "'" )
+      columns = self._columns
+      voiceStart = columns['voiceStart']
+      voiceFunction = columns['voiceFunction']
+      functions = columns['functions']
+      bassDegree = columns['bassDegree']
+      matches = {}
+      post = []
+      for index in range( len(self) ):
+         if 'concise' == verbosity:
+            # the concise label only depends on these, so it's only made once
+            # for each different combination
+            signature = ( voiceFunction[voiceStart[index]], functions[index], bassDegree[index] )
+            if signature not in matches:
+               matches[signature] = ( label == self.getLabel( index ) )
+            if matches[signature]:
+               post.append( index )
+         elif label == self.getLabel( index, verbosity ):
+            post.append( index )
+      return post
+   
+   #----------------------------------------------------------------------------
+   def save( self, pathname ):
+      '''
+      Writes the analysis to a binary file, which can be read with
+      :func:`loadCompactAnalysis`. The file is replaced all at once, so it's
+      never left half-written.
+      
+      The file starts with _COMPACT_MAGIC and the length of a JSON header,
+      then the header, which has the tonic names, scale degrees, and the type,
+      position, and length of every column. The columns follow, each starting
+      at a multiple of 8 bytes.
+      '''
+      columns = []
+      position = 0
+      for name, typeCode in CompactAnalysis._COLUMN_TYPES.items():
+         column = self._columns[name]
+         itemSize = array.array( typeCode ).itemsize
+         columns.append( [name, typeCode, itemSize, position, len(column)] )
+         position += _align( itemSize * len(column) )
+      header = { 'version' : _COMPACT_VERSION, 'byteorder' : sys.byteorder, 'chords' : len(self), \
+                 'names' : self._names, 'degrees' : self._degrees, 'columns' : columns }
+      header = json.dumps( header ).encode( 'utf-8' )
+      start = _align( len(_COMPACT_MAGIC) + 4 + len(header) )
+      def write( theFile ):
+         theFile.write( _COMPACT_MAGIC + struct.pack( '<I', len(header) ) + header )
+         for name, typeCode, itemSize, position, length in columns:
+            theFile.write( b'\0' * ( start + position - theFile.tell() ) )
+            theFile.write( _toBytes( self._columns[name] ) )
+      _writeAtomically( pathname, write )
+   
+   #----------------------------------------------------------------------------
+   def toNumpy( self ):
+      '''
+      Returns the columns with one value for each chord as a numpy structured
+      array. Raises :exc:`NonsensicalInputError` if numpy isn't available.
+      '''
+      if numpy is None:
+         raise NonsensicalInputError( "CompactAnalysis.toNumpy(): numpy isn't available" )
+      names = ['offset', 'measureOffset', 'measureNumber', 'tonic', 'mode', 'bassDegree', 'functions']
+      post = numpy.zeros( len(self), dtype = [( name, self._columns[name].typecode ) for name in names] )
+      for name in names:
+         post[name] = self._columns[name]
+      return post
+# End: class CompactAnalysis ---------------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+## The start of every file written by CompactAnalysis.save(), and the version of
+## the format after it.
+_COMPACT_MAGIC = b'HHCOMPCT'
+_COMPACT_VERSION = 2
+
+def _align( size ):
+   # Rounds size up to a multiple of 8.
+   return ( size + 7 ) // 8 * 8
+
+def _toBytes( column ):
+   # Returns the contents of an array.array or memoryview as bytes.
+   if hasattr( column, 'tobytes' ):
+      return column.tobytes()
+   else:
+      return column.tostring()
+
+def loadCompactAnalysis( pathname ):
+   '''
+   Reads a :class:`CompactAnalysis` written by :meth:`CompactAnalysis.save`.
+   The file is memory-mapped and the columns are memoryviews into it, so
+   nothing is copied until it's used, and many analyses can be searched
+   without reading all of every file. The result can't be extended, and
+   should be closed with :meth:`CompactAnalysis.close` when you're done with
+   it, or used in a "with" block.
+   
+   Raises :exc:`NonsensicalInputError` if the file can't be read.
+   
+   For example, after analyzeScore( 'score.xml' ).toCompact().save(
+   'score.hha' ), this finds the indices of the chords labelled 'D^S(4)':
+   
+      with loadCompactAnalysis( 'score.hha' ) as analysis:
+         indices = analysis.findLabel( 'D^S(4)' )
+   '''
+   try:
+      with open( pathname, 'rb' ) as theFile:
+         mapped = mmap.mmap( theFile.fileno(), 0, access = mmap.ACCESS_READ )
+   except ( IOError, OSError, ValueError ) as e:
+      raise NonsensicalInputError( "loadCompactAnalysis(): couldn't read '" + pathname + "': " + str(e) )
+   post = CompactAnalysis()
+   post._mapped = mapped
+   contents = None
+   try:
+      length = len(_COMPACT_MAGIC)
+      if mapped[:length] != _COMPACT_MAGIC:
+         raise ValueError( "it wasn't written by CompactAnalysis.save()" )
+      headerLength = struct.unpack( '<I', mapped[length:length + 4] )[0]
+      header = json.loads( mapped[length + 4:length + 4 + headerLength].decode( 'utf-8' ) )
+      if _COMPACT_VERSION != header['version']:
+         raise ValueError( "it's version " + str(header['version']) + " of the format" )
+      start = _align( length + 4 + headerLength )
+      contents = memoryview( mapped )
+      for name, typeCode, itemSize, position, count in header['columns']:
+         data = contents[start + position:start + position + itemSize * count]
+         if itemSize * count != len(data):
+            raise ValueError( "it's too short" )
+         if sys.byteorder == header['byteorder'] and array.array( typeCode ).itemsize == itemSize:
+            post._columns[name] = data.cast( typeCode )
+         else:
+            # it was written on a different kind of computer, so we'll have to
+            # make a copy we can read
+            if array.array( typeCode ).itemsize != itemSize:
+               raise ValueError( "its '" + name + "' column has a different size" )
+            column = array.array( typeCode, data.tobytes() )
+            column.byteswap()
+            post._columns[name] = column
+   except ( KeyError, TypeError, ValueError, struct.error ) as e:
+      data = None
+      if contents is not None:
+         contents.release()
+      post.close()
+      raise NonsensicalInputError( "loadCompactAnalysis(): couldn't read '" + pathname + "': " + str(e) )
+   # only the columns need to keep the file mapped
+   data = None
+   contents.release()
+   post._names = header['names']
+   post._nameCodes = dict( [( name, code ) for code, name in enumerate( post._names )] )
+   post._degrees = header['degrees']
+   post._degreeCodes = dict( [( degree, code ) for code, degree in enumerate( post._degrees )] )
+   return post
+# End function loadCompactAnalysis() -------------------------------------------
+
+def findInCompactAnalyses( pathnames, label, verbosity = 'concise' ):
+   '''
+   Searches many files written by :meth:`CompactAnalysis.save` for chords
+   with a label. It's a generator that gives a 3-tuple for every file with
+   at least one: the pathname, the :class:`CompactAnalysis`, and a list of
+   the indices of the chords. Each file is closed before the next one is
+   read, so use the analysis before asking for the next one.
+   
+   >>> from harrisonHarmony import *
+   >>> for pathname, analysis, indices in findInCompactAnalyses( glob.glob( '*.hha' ), 'D^S(4)' ):
+   ...   print( pathname, [analysis.getColumn( 'measureNumber' )[i] for i in indices] )
+   '''
+   for pathname in pathnames:
+      with loadCompactAnalysis( pathname ) as analysis:
+         indices = analysis.findLabel( label, verbosity )
+         if len(indices) > 0:
+            yield ( pathname, analysis, indices )
+# End function findInCompactAnalyses() -----------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+def _findKey( theStream ):
+   # Returns a 2-tuple with the key of theStream, as found by music21's
+   # default key-finding algorithm, and how many seconds that took.
+   stageStart = time.time()
+   whatKey = analysis.discrete.SimpleWeights().getSolution( theStream )
+   return ( whatKey, time.time() - stageStart )
+
+def _findKeyInFile( pathname, forceSource = False ):
+   # Runs in a worker process for analyzeScore(), when the
+   # 'concurrentKeyFinding' setting is True. Parses the score at pathname
+   # itself (with converter.parse()'s forceSource), so nothing is shared with
+   # the process that's chordifying it, and returns a 3-tuple with the name
+   # of the tonic and the mode of its key, and how many seconds parsing and
+   # key-finding took.
+   stageStart = time.time()
+   whatKey = _findKey( converter.parse( pathname, forceSource = forceSource ) )[0]
+   return ( whatKey.tonic.name, whatKey.mode, time.time() - stageStart )
+
+#-------------------------------------------------------------------------------
+## Tables for _localKeys()
+## The key profiles of music21's SimpleWeights, from the tonic up.
+_MAJOR_KEY_WEIGHTS = ( 2, 0, 1, 0, 1, 1, 0, 2, 0, 1, 0, 1 )
+_MINOR_KEY_WEIGHTS = ( 2, 0, 1, 1, 0, 1, 0, 2, 1, 0, 0.5, 0.5 )
+## How to spell a tonic of each pitch class, if the music doesn't say.
+_DEFAULT_TONIC_NAMES = ( 'C', 'C#', 'D', 'E-', 'E', 'F', 'F#', 'G', 'A-', 'A', 'B-', 'B' )
+
+def _keyProfiles():
+   # Returns a list of 24 lists: the key profiles for the major keys on each
+   # pitch class, then the minor keys, each with its mean subtracted and then
+   # scaled to length 1. The dot product of a pitch-class histogram with each
+   # of these is its correlation with that profile, times something that's the
+   # same for every profile (the spread of the histogram), so the largest is
+   # the one that's most correlated with it. Without the scaling, the major
+   # profiles, which are longer, would beat their relative minors.
+   post = []
+   for weights in ( _MAJOR_KEY_WEIGHTS, _MINOR_KEY_WEIGHTS ):
+      mean = float( sum( weights ) ) / 12
+      centred = [weight - mean for weight in weights]
+      length = sum( [weight * weight for weight in centred] ) ** 0.5
+      for tonic in range( 12 ):
+         post.append( [centred[( pitchClass - tonic ) % 12] / length for pitchClass in range( 12 )] )
+   return post
+_KEY_PROFILES = _keyProfiles()
+
+def _localKeys( records, windowSize ):
+   # Finds a local key for every record from _chordifiedRecords() or
+   # _sliceScore(), using the same key profiles as music21's SimpleWeights,
+   # but only counting the windowSize records around it (centred on it).
+   # Returns a list with a 2-tuple for each record's key: the name of the
+   # tonic, and 'major' or 'minor'.
+   #
+   # Each record counts for as long as it lasts, until the next one starts.
+   # The histograms are kept up to date as the window slides along, by adding
+   # the record that comes in and subtracting the one that goes out, so this
+   # takes time in proportion to the number of records, not the window size.
+   if 0 == len(records):
+      return []
+   
+   # the pitch-class histogram of each record, and the most common spelling
+   # of each pitch class, over the whole score
+   starts = [measureOffset + offset for offset, measureOffset, measureNumber, spellings in records]
+   histograms = []
+   spellingWeights = {}
+   for index in range( len(records) ):
+      if index + 1 < len(records):
+         duration = max( float( starts[index + 1] - starts[index] ), 0.0 )
+      else:
+         duration = 1.0
+      histogram = [0.0] * 12
+      for midi, name in records[index][3]:
+         histogram[midi % 12] += duration
+         spellingWeights[name] = spellingWeights.get( name, 0.0 ) + duration
+      histograms.append( histogram )
+   tonicNames = list( _DEFAULT_TONIC_NAMES )
+   bestWeights = [0.0] * 12
+   for name, weight in spellingWeights.items():
+      if name in _SPELLING_CODES:
+         step, alteration = _parseSpelling( name )
+         pitchClass = ( _NATURAL_SEMITONES[step] + alteration ) % 12
+         if weight > bestWeights[pitchClass]:
+            bestWeights[pitchClass] = weight
+            tonicNames[pitchClass] = name
+   
+   before = ( windowSize - 1 ) // 2
+   after = windowSize - 1 - before
+   if numpy is not None:
+      # the window histograms are differences of the running totals
+      totals = numpy.zeros( ( len(records) + 1, 12 ) )
+      numpy.cumsum( numpy.array( histograms ), axis = 0, out = totals[1:] )
+      indices = numpy.arange( len(records) )
+      windows = totals[numpy.minimum( indices + after + 1, len(records) )] - totals[numpy.maximum( indices - before, 0 )]
+      best = numpy.argmax( windows.dot( numpy.array( _KEY_PROFILES ).T ), axis = 1 )
+      return [_localKey( tonicNames, profile ) for profile in best.tolist()]
+   
+   post = []
+   window = [0.0] * 12
+   for index in range( min( after, len(records) ) ):
+      window = [a + b for a, b in zip( window, histograms[index] )]
+   for index in range( len(records) ):
+      # the record that comes into the window, and the one that goes out
+      if index + after < len(records):
+         window = [a + b for a, b in zip( window, histograms[index + after] )]
+      if index - before - 1 >= 0:
+         window = [a - b for a, b in zip( window, histograms[index - before - 1] )]
+      scores = [sum( [a * b for a, b in zip( window, profile )] ) for profile in _KEY_PROFILES]
+      post.append( _localKey( tonicNames, scores.index( max( scores ) ) ) )
+   return post
+
+def _localKey( tonicNames, profile ):
+   # Given the index of one of _KEY_PROFILES, returns the 2-tuple for its key
+   # that _localKeys() gives.
+   return ( tonicNames[profile % 12], 'major' if profile < 12 else 'minor' )
+
+def _reportTime( stage, seconds ):
+   # Prints how long a stage of analyzeThis() took.
+   print( "   " + stage + " took %.2f seconds." % seconds )
+
+def _isTiedContinuation( harmony ):
+   # Returns True if every member of the music21.chord.Chord continues a tie
+   # from before.
+   for chordMember in harmony:
+      if chordMember.tie is None or chordMember.tie.type not in ( 'stop', 'continue' ):
+         return False
+   return len(harmony) > 0
+
+def _setUpLabelCache( theSettings ):
+   # Sets the capacity of labelCache and loads the file from theSettings, if
+   # there is one. Returns the pathname of the file, or None.
+   labelCache.setCapacity( theSettings.parsePropertyGet( 'labelCacheSize' ) )
+   labelCacheFile = theSettings.parsePropertyGet( 'labelCacheFile' )
+   if labelCacheFile is not None:
+      try:
+         labelCache.load( labelCacheFile )
+      except NonsensicalInputError as e:
+         print( "Ignoring the label cache file. " + str(e) )
+   return labelCacheFile
+
+def _chordifiedRecords( theChords, measureOffsets = None, mergeTies = False ):
+   # Given a chordified Part or list of Measures, returns a 2-tuple with a list
+   # of the records that _labelRecords() takes, in score order, and a list of
+   # the music21.chord.Chord for each. The measure offsets are taken from the
+   # Measures, unless measureOffsets is a dict from measure number to offset.
+   # Chords that aren't in a Measure use the offset of theChords.
+   #
+   # Ties are removed from the chords on the way, because, if we're using the
+   # "lyric" property, MusicXML-->LilyPond won't allow two annotations for
+   # chords with tied notes. It doesn't hurt to do this, even if it's already
+   # been done. If mergeTies is True, a chord that only continues the ties of
+   # the same chord just before it is left out instead, so it isn't labelled
+   # again, and the ties are kept.
+   
+   # list of ( measure offset, measure number, chord )
+   if isinstance( theChords, stream.Stream ):
+      partOffset = theChords.offset
+   else:
+      partOffset = 0.0
+   found = []
+   for measure in theChords:
+      if isinstance( measure, chord.Chord ):
+         found.append( ( partOffset, None, measure ) )
+      elif isinstance( measure, stream.Measure ):
+         if measureOffsets is None:
+            measureOffset = measure.offset
+         else:
+            measureOffset = measureOffsets.get( measure.number, measure.offset )
+         for harmony in measure:
+            if isinstance( harmony, chord.Chord ):
+               found.append( ( measureOffset, measure.number, harmony ) )
+   
+   records = []
+   harmonies = []
+   for measureOffset, measureNumber, harmony in found:
+      spellings = _sortedSpellings( harmony )
+      if mergeTies:
+         if len(records) > 0 and spellings == records[-1][3] and _isTiedContinuation( harmony ):
+            continue
+      else:
+         harmony.tie = None
+         for chordMember in harmony:
+            chordMember.tie = None
+      records.append( ( harmony.offset, measureOffset, measureNumber, spellings ) )
+      harmonies.append( harmony )
+   return ( records, harmonies )
+
+def _sliceScore( theScore, measureOffsets = None, mergeTies = False ):
+   # The lightweight replacement for chordify(). Given a music21.stream.Score,
+   # returns a list of records like ( offset in the measure, measure offset,
+   # measure number, spellings ) for each vertical slice where something is
+   # sounding, in score order. The spellings are a list of ( MIDI note number,
+   # pitch name ) from lowest to highest, like _sortedSpellings() makes, with
+   # the same pitch in several parts only once. As with chordify(), there's a
+   # new slice wherever a note or rest starts or stops, and at every barline,
+   # and a grace note is part of the slice where it starts, without making
+   # one of its own last any longer. The measures are those of the first
+   # part; the optional measureOffsets is the same as for _chordifiedRecords().
+   # Unlike chordify(), the parts aren't lined up again at each barline, so if
+   # their measures don't start together (like after an overfull measure in
+   # one part), the slices follow the offsets of the notes.
+   #
+   # If mergeTies is True, a tied note is one event from the start of the tie
+   # to its end, and a slice that sounds the same as the one before it, with
+   # no note starting, is left out, so held sonorities aren't labelled again.
+   
+   # every note event, as [start, end, MIDI note number, pitch name], and
+   # every offset where a slice might start; grace notes end where they start
+   events = []
+   boundaries = set()
+   for part in theScore.parts:
+      # ( MIDI note number, pitch name ) --> the event its tie continues
+      tiedEvents = {}
+      for element in part.flatten().notesAndRests:
+         # like chordify(), use Fractions for tuplets, or 1/3 + 1/3 + 1/3
+         # would be a new slice a hair before or after 1
+         start = opFrac( part.offset + element.offset )
+         end = opFrac( start + element.quarterLength )
+         if isinstance( element, note.Rest ):
+            boundaries.add( start )
+            boundaries.add( end )
+            continue
+         if isinstance( element, chord.Chord ):
+            members = [( chordMember.pitch, chordMember.tie ) for chordMember in element]
+         else:
+            members = [( element.pitch, element.tie )]
+         for thePitch, tie in members:
+            spelling = ( thePitch.midi, thePitch.name )
+            if mergeTies and end > start and tie is not None and tie.type in ( 'stop', 'continue' ) and \
+                  spelling in tiedEvents and tiedEvents[spelling][1] == start:
+               # carry on the event this is tied to
+               tiedEvents[spelling][1] = end
+            else:
+               events.append( [start, end, thePitch.midi, thePitch.name] )
+               if end > start:
+                  tiedEvents[spelling] = events[-1]
+               boundaries.add( start )
+            boundaries.add( end )
+   events.sort( key = lambda a: a[0] )
+   
+   # the measures of the first part, by offset
+   measureStarts = []
+   measureNumbers = []
+   if len(theScore.parts) > 0:
+      for measure in theScore.parts[0].getElementsByClass( stream.Measure ):
+         if len(measureStarts) == 0 or measure.offset > measureStarts[-1]:
+            measureStarts.append( measure.offset )
+            measureNumbers.append( measure.number )
+   boundaries.update( measureStarts )
+   
+   # one pass through the boundaries, keeping track of what's sounding
+   post = []
+   sounding = []
+   nextEvent = 0
+   previousSpellings = None
+   for boundary in sorted( boundaries ):
+      sounding = [event for event in sounding if event[1] > boundary]
+      graceNotes = []
+      somethingStarts = False
+      while nextEvent < len(events) and events[nextEvent][0] <= boundary:
+         if events[nextEvent][1] > boundary:
+            sounding.append( events[nextEvent] )
+            somethingStarts = somethingStarts or events[nextEvent][0] == boundary
+         elif events[nextEvent][1] == boundary:
+            # a grace note here
+            graceNotes.append( events[nextEvent] )
+            somethingStarts = True
+         nextEvent += 1
+      if 0 == len(sounding) + len(graceNotes):
+         previousSpellings = None
+         continue
+      spellings = sorted( set( [( event[2], event[3] ) for event in sounding + graceNotes] ), key = lambda a: a[0] )
+      if mergeTies and not somethingStarts and spellings == previousSpellings:
+         continue
+      previousSpellings = spellings
+      whichMeasure = bisect.bisect_right( measureStarts, boundary ) - 1
+      if whichMeasure < 0:
+         measureStart, measureNumber = 0.0, None
+      else:
+         measureStart, measureNumber = measureStarts[whichMeasure], measureNumbers[whichMeasure]
+      measureOffset = measureStart
+      if measureOffsets is not None and measureNumber is not None:
+         measureOffset = measureOffsets.get( measureNumber, measureStart )
+      post.append( ( opFrac( boundary - measureStart ), measureOffset, measureNumber, spellings ) )
+   return post
+
+def _labelRecords( whatKey, records, processes, localKeys = None, executor = None ):
+   # Labels every record from _chordifiedRecords() or _sliceScore(). Returns a
+   # list of ChordResult, in the same order. All the chords in the same key
+   # are labelled at once. If localKeys is given, it's a list with the
+   # ( tonic name, mode ) of each record's key, like _localKeys() makes;
+   # otherwise they're all in whatKey. If "processes" is more than 1, the labelling is
+   # done in the executor from _labellingPool(), or, if there isn't one, in a
+   # pool made for this call.
+   if executor is None and processes > 1 and ProcessPoolExecutor is not None:
+      executor = _labellingPool( processes )
+      try:
+         return _labelRecords( whatKey, records, processes, localKeys, executor )
+      finally:
+         if executor is not None:
+            executor.shutdown()
+   if localKeys is None:
+      localKeys = [( whatKey.tonic.name, whatKey.mode )] * len(records)
+   
+   # the indices of the records in each key
+   indicesByKey = OrderedDict()
+   for index, localKey in enumerate( localKeys ):
+      indicesByKey.setdefault( localKey, [] ).append( index )
+   
+   post = [None] * len(records)
+   for ( tonicName, mode ), indices in indicesByKey.items():
+      if tonicName == whatKey.tonic.name and mode == whatKey.mode:
+         thisKey = whatKey
+      else:
+         thisKey = internKey( tonicName, mode )
+      listOfScaleDegrees = _scaleDegreesOfChords( thisKey, [records[index][3] for index in indices] )
+      labels = _labelListOfScaleDegrees( thisKey, listOfScaleDegrees, ( 'concise', 'verbose' ), processes, executor )
+      for index, scaleDegrees, ( conciseLabel, verboseLabel ) in zip( indices, listOfScaleDegrees, labels ):
+         offset, measureOffset, measureNumber = records[index][:3]
+         post[index] = ChordResult( offset, measureOffset, measureNumber, scaleDegrees, \
+                                    conciseLabel, verboseLabel, tonicName, mode )
+   return post
+
+#-------------------------------------------------------------------------------
+## Change this whenever a change to the rules gives different labels, so
+## analyses in the analysis cache from before are done again.
+_ANALYSIS_RULES_VERSION = 3
+
+## The settings that change the chords and key analyzeScore() finds, and so
+## are part of the key of the analysis cache. Settings that only change how
+## they're shown, like 'chordLabelVerbosity', aren't: both labels are kept.
+_ANALYSIS_CACHE_SETTINGS = ( 'chordifyScore', 'mergeTiedChords', 'concurrentKeyFinding', 'localKeyWindow' )
+
+## The end of the filename of every analysis in the analysis cache.
+_ANALYSIS_CACHE_SUFFIX = '.analysis'
+
+def _analysisCacheKey( pathname, theSettings ):
+   # Returns the name (without _ANALYSIS_CACHE_SUFFIX) of the file where the
+   # analysis of pathname with theSettings is kept in the analysis cache: a
+   # hash of the contents of the file, the settings that change the results,
+   # _ANALYSIS_RULES_VERSION, and the version of music21, whose key-finding
+   # and chordify() may change. Returns None if the file can't be read.
+   digest = hashlib.sha1()
+   try:
+      with open( pathname, 'rb' ) as theFile:
+         block = theFile.read( 1 << 20 )
+         while len(block) > 0:
+            digest.update( block )
+            block = theFile.read( 1 << 20 )
+   except ( IOError, OSError ):
+      return None
+   for name in _ANALYSIS_CACHE_SETTINGS:
+      digest.update( ( '\n' + name + '=' + str(theSettings.parsePropertyGet( name )) ).encode( 'utf-8' ) )
+   digest.update( ( '\nrules=' + str(_ANALYSIS_RULES_VERSION) ).encode( 'utf-8' ) )
+   digest.update( ( '\nmusic21=' + _MUSIC21_VERSION ).encode( 'utf-8' ) )
+   return digest.hexdigest()
+
+def _readCachedAnalysis( directory, cacheKey ):
+   # Returns a 2-tuple with the key and the list of ChordResult in the
+   # analysis cache for cacheKey, or None if it isn't there. The file's
+   # modification time is updated, so it's the most recently used.
+   entryPath = os.path.join( directory, cacheKey + _ANALYSIS_CACHE_SUFFIX )
+   try:
+      with open( entryPath, 'rb' ) as theFile:
+         entry = pickle.load( theFile )
+      whatKey = internKey( entry['key'], entry['mode'] )
+      chords = [ChordResult( *theChord ) for theChord in entry['chords']]
+   except ( IOError, OSError, EOFError, KeyError, TypeError, ValueError, pickle.UnpicklingError ):
+      # it isn't there, or it was evicted while we were reading it, or it's
+      # broken (so we'll write it again)
+      return None
+   try:
+      os.utime( entryPath, None )
+   except OSError:
+      pass # it was evicted since we read it
+   return ( whatKey, chords )
+
+def _writeCachedAnalysis( directory, cacheKey, results, capacity ):
+   # Puts the key and chords of the AnalysisResults in the analysis cache for
+   # cacheKey. Then, if there are more than capacity analyses in the cache,
+   # the least recently used ones are removed.
+   # 
+   # Many processes may use the cache at once: every file is written all at
+   # once, and it's fine if a file we want to read or remove was removed by
+   # another process already.
+   if not os.path.isdir( directory ):
+      try:
+         os.makedirs( directory )
+      except OSError:
+         if not os.path.isdir( directory ):
+            raise
+   entry = { 'key' : results.getKey().tonic.name, 'mode' : results.getKey().mode, \
+             'chords' : [tuple( theChord ) for theChord in results.getChords()] }
+   try:
+      _writeAtomically( os.path.join( directory, cacheKey + _ANALYSIS_CACHE_SUFFIX ), \
+                        lambda theFile: pickle.dump( entry, theFile, pickle.HIGHEST_PROTOCOL ) )
+   except OSError:
+      pass # another process wrote it first
+   
+   # evict the least recently used
+   entries = []
+   for entryPath in glob.glob( os.path.join( directory, '*' + _ANALYSIS_CACHE_SUFFIX ) ):
+      try:
+         entries.append( ( os.path.getmtime( entryPath ), entryPath ) )
+      except OSError:
+         pass
+   if len(entries) > capacity:
+      entries.sort()
+      for lastUsed, entryPath in entries[:len(entries) - capacity]:
+         try:
+            os.remove( entryPath )
+         except OSError:
+            pass
+# End function _writeCachedAnalysis() ------------------------------------------
+
+#-------------------------------------------------------------------------------
+## Change this whenever the records made by _sliceScore() and
+## _chordifiedRecords() change, so the ones in the score cache are made again.
+_SCORE_CACHE_VERSION = 2
+
+## The settings that change the records and key found in a score, and so are
+## part of the key of the score cache.
+_SCORE_CACHE_SETTINGS = ( 'chordifyScore', 'mergeTiedChords', 'concurrentKeyFinding' )
+
+def _scoreCacheEntry( directory, pathname, theSettings ):
+   # Returns a 2-tuple with the path of the file where the score cache keeps
+   # the records and key of pathname with theSettings, and what that file
+   # must say about pathname and theSettings for us to use it.
+   pathname = os.path.abspath( pathname )
+   settings = [theSettings.parsePropertyGet( name ) for name in _SCORE_CACHE_SETTINGS]
+   digest = hashlib.sha1( ( pathname + '\n' + repr(settings) ).encode( 'utf-8' ) ).hexdigest()
+   fileStatus = os.stat( pathname )
+   stamp = { 'version' : _SCORE_CACHE_VERSION, 'pathname' : pathname, 'settings' : settings, \
+             'mtime' : fileStatus.st_mtime, 'size' : fileStatus.st_size, 'music21' : _MUSIC21_VERSION }
+   return ( os.path.join( directory, digest + '.records' ), stamp )
+
+def _readCachedRecords( directory, pathname, theSettings ):
+   # Returns a 2-tuple with the key and records of pathname in the score cache,
+   # or None if they aren't there, or the file changed since they were put
+   # there (so it has to be parsed again).
+   try:
+      entryPath, stamp = _scoreCacheEntry( directory, pathname, theSettings )
+      with open( entryPath, 'rb' ) as theFile:
+         entry = pickle.load( theFile )
+      if stamp != entry['stamp']:
+         return None
+      return ( internKey( entry['key'], entry['mode'] ), entry['records'] )
+   except ( IOError, OSError, EOFError, KeyError, TypeError, ValueError, pickle.UnpicklingError ):
+      return None
+
+def _hasCachedRecords( directory, pathname, theSettings ):
+   # Returns whether the score cache has an entry for pathname with
+   # theSettings, even one that's out of date. If _readCachedRecords() didn't
+   # find one, but this does, the file changed since it was cached (maybe to
+   # an older modification time, like when it's restored from a backup), so
+   # music21's own cache of the parsed file can't be trusted either.
+   try:
+      return os.path.exists( _scoreCacheEntry( directory, pathname, theSettings )[0] )
+   except ( IOError, OSError ):
+      return False
+
+def _writeCachedRecords( directory, pathname, theSettings, whatKey, records ):
+   # Puts the key and records of pathname in the score cache, replacing what
+   # was there. Like _writeCachedAnalysis(), it's safe for many processes.
+   if not os.path.isdir( directory ):
+      try:
+         os.makedirs( directory )
+      except OSError:
+         if not os.path.isdir( directory ):
+            raise
+   entryPath, stamp = _scoreCacheEntry( directory, pathname, theSettings )
+   entry = { 'stamp' : stamp, 'key' : whatKey.tonic.name, 'mode' : whatKey.mode, 'records' : records }
+   _writeAtomically( entryPath, lambda theFile: pickle.dump( entry, theFile, pickle.HIGHEST_PROTOCOL ) )
+# End function _writeCachedRecords() -------------------------------------------
+
+def analyzeScore( pathname, theSettings=None ):
+   '''
+   Given the path to a music21-supported score, or a
+   :class:`music21.stream.Score` or chordified :class:`music21.stream.Part`,
+   performs a harmonic-functional analysis and returns the
+   :class:`AnalysisResults`. Unlike :func:`analyzeThis`, nothing is annotated
+   or displayed, so it can be used without a display; call
+   :meth:`AnalysisResults.show` if you want to see the score.
+   '''
+   
+   # NOTE: If the 'concurrentKeyFinding' setting is True, the key of the
+   # original score is found rather than that of the chordified score. If we
+   # were given a pathname, that's done in another process, which parses the
+   # file itself while this one parses and chordifies it; a music21 Stream
+   # can't be shared between threads, and the GIL wouldn't let them overlap
+   # anyway. Whether that's quicker depends on the file and the machine; see
+   # the "analyzeScore.concurrentKey" stage of harrisonHarmony-benchmark.py.
+   # The chords are
+   # labelled in parallel, if the 'labellingProcesses' setting is more than 1.
+   # If the 'chordifyScore' setting is False, a Score isn't chordified at all;
+   # _sliceScore() finds the chords, and the key is found from the Score.
+   # If the 'localKeyWindow' setting is more than 0, each chord is labelled in
+   # its local key, from _localKeys(), rather than the key of the whole score.
+   # If the 'analysisCacheDirectory' setting isn't None, and we were given a
+   # pathname, the results are kept there, and are used instead of analyzing
+   # the same file with the same settings again. If the 'scoreCacheDirectory'
+   # setting isn't None, the chords and key found in the score are kept there,
+   # so a file that hasn't changed isn't parsed again, even if it has to be
+   # labelled again.
    
    # Ensure there's a settings object. If we didn't get one as an argument,
    # we'll just use the default.
    if None == theSettings:
-      theSettings = HarrisonHarmonySettings
+      theSettings = HarrisonHarmonySettings()
    
-   theScore = theChords = None
+   theScore = theChords = whatKey = records = None
+   keyExecutor = futureKey = None
    # See what input we have...
+   cacheDirectory = cacheKey = scoreCacheDirectory = None
    if isinstance( pathname, str ):
-      ## get the score
-      print( "Importing score to music21." )
-      try:
-         theScore = converter.parse( pathname )
-      except ConverterException:
-         raise
-      except ConverterFileException:
-         raise
-      ## "chordify" the score
-      print( "Chordifying the score." )
-      theChords = theScore.chordify()
+      ## check the analysis cache
+      cacheDirectory = theSettings.parsePropertyGet( 'analysisCacheDirectory' )
+      if cacheDirectory is not None:
+         cacheKey = _analysisCacheKey( pathname, theSettings )
+      if cacheKey is not None:
+         cached = _readCachedAnalysis( cacheDirectory, cacheKey )
+         if cached is not None:
+            print( "Found the analysis in the cache." )
+            return AnalysisResults( cached[0], cached[1], None, None, None, theSettings, pathname )
+      
+      ## get the score, or the chords and key from the score cache
+      scoreCacheDirectory = theSettings.parsePropertyGet( 'scoreCacheDirectory' )
+      if scoreCacheDirectory is not None:
+         cached = _readCachedRecords( scoreCacheDirectory, pathname, theSettings )
+      else:
+         cached = None
+      if cached is not None:
+         print( "Found the chords of the score in the cache." )
+         whatKey, records = cached
+      else:
+         # if the score cache has an out-of-date entry, don't use music21's
+         # cache of the parsed file either
+         forceSource = scoreCacheDirectory is not None and \
+                       _hasCachedRecords( scoreCacheDirectory, pathname, theSettings )
+         if theSettings.parsePropertyGet( 'concurrentKeyFinding' ) and \
+               theSettings.parsePropertyGet( 'chordifyScore' ) and ProcessPoolExecutor is not None:
+            # find the key of the original score in another process meanwhile
+            print( "Finding the key at the same time." )
+            keyExecutor = ProcessPoolExecutor( 1 )
+            futureKey = keyExecutor.submit( _findKeyInFile, pathname, forceSource )
+         print( "Importing score to music21." )
+         stageStart = time.time()
+         try:
+            theScore = converter.parse( pathname, forceSource = forceSource )
+         except BaseException:
+            if keyExecutor is not None:
+               keyExecutor.shutdown( wait = False )
+            raise
+         _reportTime( "Importing", time.time() - stageStart )
    elif isinstance( pathname, stream.Score ):
       theScore = pathname
-      ## "chordify" the score
-      print( "Chordifying the score." )
-      theChords = theScore.chordify()
    elif isinstance( pathname, stream.Part ):
       theChords = pathname
    else:
-      raise NonsensicalInputError( "analyzeThis(): input must be str, Score, or Part; received " + str(type(pathname)) )
-   
-   ## Remove ties because, if we're using the "lyric" property,
-   ## MusicXML-->LilyPond won't allow two annotations for chords with tied notes.
-   ## It doesn't hurt to do this, even if it's already been done.
-   print( "Removing ties from the score." )
-   for eachMeasure in theChords:
-      if isinstance( eachMeasure, stream.Measure ):
-         for event in eachMeasure:
-            if isinstance( event, chord.Chord ):
-               for chordMember in event:
-                  event.tie = None
-      elif isinstance( eachMeasure, chord.Chord ):
-         for chordMember in eachMeasure:
-            chordMember.tie = None
-   
-   ## find the key
-   anal = analysis.discrete.SimpleWeights()
-   whatKey = anal.getSolution( theChords )
+      raise NonsensicalInputError( "analyzeScore(): input must be str, Score, or Part; received " + str(type(pathname)) )
+   
+   ## "chordify" the score, or find its vertical slices without chordifying
+   harmonies = None
+   if theScore is not None and not theSettings.parsePropertyGet( 'chordifyScore' ):
+      print( "Slicing the score." )
+      stageStart = time.time()
+      records = _sliceScore( theScore, None, theSettings.parsePropertyGet( 'mergeTiedChords' ) )
+      _reportTime( "Slicing", time.time() - stageStart )
+      print( "Finding the key." )
+      whatKey, keySeconds = _findKey( theScore )
+      _reportTime( "Finding the key", keySeconds )
+   elif theScore is not None:
+      if futureKey is None and theSettings.parsePropertyGet( 'concurrentKeyFinding' ):
+         # we weren't given a file another process could parse
+         print( "Finding the key." )
+         whatKey, keySeconds = _findKey( theScore )
+         _reportTime( "Finding the key", keySeconds )
+      print( "Chordifying the score." )
+      try:
+         stageStart = time.time()
+         theChords = theScore.chordify()
+         _reportTime( "Chordifying", time.time() - stageStart )
+         if futureKey is not None:
+            tonicName, mode, keySeconds = futureKey.result()
+            whatKey = internKey( tonicName, mode )
+            _reportTime( "Finding the key (in another process)", keySeconds )
+      finally:
+         if keyExecutor is not None:
+            keyExecutor.shutdown()
+   
+   ## find the chords, removing their ties (or merging tied chords)
+   if theChords is not None:
+      records, harmonies = _chordifiedRecords( theChords, None, theSettings.parsePropertyGet( 'mergeTiedChords' ) )
+   
+   ## find the key, unless we already did
+   if whatKey is None:
+      print( "Finding the key." )
+      whatKey, keySeconds = _findKey( theChords )
+      _reportTime( "Finding the key", keySeconds )
+   
+   ## keep the chords and key for next time, if we parsed the score
+   if scoreCacheDirectory is not None and theScore is not None:
+      _writeCachedRecords( scoreCacheDirectory, pathname, theSettings, whatKey, records )
+   
+   ## set up the label cache
+   labelCacheFile = _setUpLabelCache( theSettings )
+   hitsBefore = labelCache.getHits()
+   missesBefore = labelCache.getMisses()
    
    print( "Parsing and labelling chords." )
-   # find the index of the bass part
-   foundBassPart = False
-   tryThisIndex = len(theScore) - 1
-   indexOfBassPart = -1
-   while False == foundBassPart:
-      if -1 == tryThisIndex:
-         foundBassPart = True
-      elif isinstance( theScore[tryThisIndex], stream.Part ):
-         foundBassPart = True
-         indexOfBassPart = tryThisIndex
-      else:
-         tryThisIndex -= 1
+   stageStart = time.time()
+   if theSettings.parsePropertyGet( 'localKeyWindow' ) > 0:
+      localKeys = _localKeys( records, theSettings.parsePropertyGet( 'localKeyWindow' ) )
+   else:
+      localKeys = None
+   chords = _labelRecords( whatKey, records, theSettings.parsePropertyGet( 'labellingProcesses' ), localKeys )
+   _reportTime( "Labelling", time.time() - stageStart )
+   
+   hits = labelCache.getHits() - hitsBefore
+   misses = labelCache.getMisses() - missesBefore
+   if hits + misses > 0:
+      print( "Found " + str(hits) + " of " + str(hits + misses) + " chord labels in the cache." )
+   if labelCacheFile is not None:
+      labelCache.save( labelCacheFile )
+   
+   results = AnalysisResults( whatKey, chords, harmonies, theScore, theChords, theSettings, \
+                              pathname if isinstance( pathname, str ) else None )
+   if cacheKey is not None:
+      _writeCachedAnalysis( cacheDirectory, cacheKey, results, theSettings.parsePropertyGet( 'analysisCacheSize' ) )
+   return results
+# End function analyzeScore() --------------------------------------------------
+
+def analyzeThis( pathname, theSettings=None ):
+   '''
+   Given the path to a music21-supported score, imports the score, performs a
+   harmonic-functional analysis, annotates the score, and displays it with the
+   default show(). Returns the :class:`AnalysisResults`.
    
-   # Parse and label the chords.
-   # TODO: remove the code duplication here
-   for measure in theChords:
-      if isinstance( measure, chord.Chord ):
-         # find the label
-         theLabel = labelThisChord( whatKey, measure, theSettings.parsePropertyGet( 'chordLabelVerbosity' ) )
-         # if needed, put label on the actual score
-         if False == theSettings.parsePropertyGet( 'annotateChordifiedScore' ):
-            # NOTE: this is the same algorithm as just below, except here:
-            #    measureOffset = theChords.offset
-            #    offsetOfChord = measure.offset
-            measureOffset = theChords.offset
-            offsetOfChord = measure.offset
-            try:
-               # Sometimes, we get more than one thing with the same offset,
-               # like if there is an Instrument at the beginning of the Part.
-               # Usually this will just stop after 0.
-               i = 0
-               annotated = False
-               while not annotated:
-                  # thisOne will be set to the the i-th element at the offset
-                  # of our target measure in the real score
-                  thisOne = theScore[indexOfBassPart].getElementsByOffset( measureOffset )[i]
-                  # If the i-th element is a Measure, we can find the
-                  # Chord in it, and anootate it.
-                  if isinstance( thisOne, stream.Measure ):
-                     # find the chord at the proper offset
-                     thisOne.getElementsByOffset( offsetOfChord )[0].lyric = theLabel
-                     annotated = True
-                  elif i > 10:
-                     annotated = True
-                  else:
-                     i += 1
-            except stream.StreamException as e:
-               print( "analyzeThis(): Couldn't annotate measure with offset " + str(measureOffset) + ", chord offset " + str(offsetOfChord) )
-               print( "   " + str(e) )
-         else: # otherwise label goes on the chordified score
-            measure.lyric = theLabel
-      elif isinstance( measure, stream.Measure ):
-         for harmony in measure:
-            if isinstance( harmony, chord.Chord ):
-               # find the label
-               theLabel = labelThisChord( whatKey, harmony, theSettings.parsePropertyGet( 'chordLabelVerbosity' ) )
-               # if needed, put label on the actual score
-               if False == theSettings.parsePropertyGet( 'annotateChordifiedScore' ):
-                  # NOTE: this is the same algorithm as just below, except here:
-                  #    measureOffset = measure.offset
-                  #    offsetOfChord = harmony.offset
-                  measureOffset = measure.offset
-                  offsetOfChord = harmony.offset
-                  try:
-                     # Sometimes, we get more than one thing with the same offset,
-                     # like if there is an Instrument at the beginning of the Part.
-                     # Usually this will just stop after 0.
-                     i = 0
-                     annotated = False
-                     while not annotated:
-                        # thisOne will be set to the the i-th element at the offset
-                        # of our target measure in the real score
-                        thisOne = theScore[indexOfBassPart].getElementsByOffset( measureOffset )[i]
-                        # If the i-th element is a Measure, we can find the
-                        # Chord in it, and anootate it.
-                        if isinstance( thisOne, stream.Measure ):
-                           # find the chord at the proper offset
-                           thisOne.getElementsByOffset( offsetOfChord )[0].lyric = theLabel
-                           annotated = True
-                        elif i > 10:
-                           annotated = True
-                        else:
-                           i += 1
-                  except stream.StreamException as e:
-                     print( "analyzeThis(): Couldn't annotate measure with offset " + str(measureOffset) + ", chord offset " + str(offsetOfChord) )
-                     print( "   " + str(e) )
-               else: # otherwise label goes on the chordified score
-                  harmony.lyric = theLabel
-   #
+   If the 'analysisCacheDirectory' setting isn't None and the same file was
+   analyzed with the same settings before, the results are taken from there,
+   and the score is only parsed again to display it.
    
-   print( "Processing score for display." )
-   # output the score!
-   if False == theSettings.parsePropertyGet( 'annotateChordifiedScore' ):
-      theScore.show()
-   else:
-      theChords.show()
+   To analyze without displaying anything, use :func:`analyzeScore`.
+   '''
+   results = analyzeScore( pathname, theSettings )
+   results.show()
+   return results
 # End function analyzeThis() ---------------------------------------------------
 
 
 
+#-------------------------------------------------------------------------------
+def _measuresOfParts( theScore ):
+   # For analyzeMeasures(): returns a 3-tuple with a list of the offset of
+   # each part, a list with a deque of ( offset, Measure ) for each part's
+   # measures, in order, and an OrderedDict with the offset of each measure
+   # in the first part, by number. Each part is only gone through once.
+   partOffsets = []
+   partMeasures = []
+   for part in theScore.parts:
+      partOffsets.append( part.offset )
+      partMeasures.append( deque( [( part.elementOffset( measure ), measure ) \
+                                   for measure in part.getElementsByClass( stream.Measure )] ) )
+   measureOffsets = OrderedDict()
+   if len(partMeasures) > 0:
+      for offset, measure in partMeasures[0]:
+         if measure.number not in measureOffsets:
+            measureOffsets[measure.number] = offset
+   return ( partOffsets, partMeasures, measureOffsets )
+
+def _excerpt( partOffsets, window ):
+   # For analyzeMeasures(): returns a Score with a Part for each list of
+   # ( offset, Measure ) in window, at the offsets in partOffsets, holding
+   # those measures at their offsets, so it can be chordified or sliced like
+   # the whole score.
+   post = stream.Score()
+   for partOffset, measures in zip( partOffsets, window ):
+      part = stream.Part()
+      for offset, measure in measures:
+         part.insert( offset, measure )
+      post.insert( partOffset, part )
+   return post
+
+def analyzeMeasures( pathname, theSettings = None, windowSize = 1, whatKey = None ):
+   '''
+   Like :func:`analyzeScore`, but a generator that yields a
+   :class:`ChordResult` for each chord, in score order, as soon as it's
+   labelled. The first argument is the path to a music21-supported score, or
+   a :class:`music21.stream.Score`.
+   
+   Rather than chordifying the whole score at once, it's chordified (or
+   sliced, if the 'chordifyScore' setting is False) and labelled windowSize
+   measures at a time, so only that many measures of chords are held in
+   memory. The windows are windowSize measures of the first part, with the
+   measures of the other parts that start alongside them; each part's
+   measures are found once, in order, rather than searched for in every
+   window.
+   
+   music21 still imports the whole file before the first measure can be
+   chordified, so the most memory used is about what the parsed score takes.
+   If you give a pathname, though, each window's measures are let go once
+   they're labelled. Measures of a Score you give are not.
+   
+   The key is found from the whole score before anything is labelled, unless
+   you give a :class:`music21.key.Key` as the fourth argument. The
+   'localKeyWindow' setting isn't used here.
+   
+   >>> from harrisonHarmony import *
+   >>> for theChord in analyzeMeasures( 'score.xml', windowSize = 8 ):
+   ...    print( theChord.measureNumber, theChord.conciseLabel )
+   '''
+   if windowSize < 1:
+      raise NonsensicalInputError( "analyzeMeasures(): windowSize must be at least 1, but I got " + str(windowSize) )
+   if None == theSettings:
+      theSettings = HarrisonHarmonySettings()
+   
+   if isinstance( pathname, str ):
+      theScore = converter.parse( pathname )
+   elif isinstance( pathname, stream.Score ):
+      theScore = pathname
+   else:
+      raise NonsensicalInputError( "analyzeMeasures(): input must be str or Score; received " + str(type(pathname)) )
+   
+   if whatKey is None:
+      whatKey = _findKey( theScore )[0]
+   
+   partOffsets, partMeasures, measureOffsets = _measuresOfParts( theScore )
+   if isinstance( pathname, str ):
+      # nothing else holds the parts, so each measure is freed once it's
+      # been labelled
+      theScore = None
+   
+   labelCacheFile = _setUpLabelCache( theSettings )
+   processes = theSettings.parsePropertyGet( 'labellingProcesses' )
+   # NB: ties that cross from one window into the next aren't merged
+   mergeTies = theSettings.parsePropertyGet( 'mergeTiedChords' )
+   # one pool of labelling processes for every window
+   executor = _labellingPool( processes )
+   try:
+      while len(partMeasures) > 0 and len(partMeasures[0]) > 0:
+         # the next windowSize measures of the first part, and the measures of
+         # the other parts that start before the one after them
+         lead = partMeasures[0]
+         window = [[lead.popleft() for i in range( min( windowSize, len(lead) ) )]]
+         windowEnd = lead[0][0] if len(lead) > 0 else None
+         for measures in partMeasures[1:]:
+            window.append( [] )
+            while len(measures) > 0 and ( windowEnd is None or measures[0][0] < windowEnd ):
+               window[-1].append( measures.popleft() )
+         excerpt = _excerpt( partOffsets, window )
+         del window
+         
+         if theSettings.parsePropertyGet( 'chordifyScore' ):
+            theChords = excerpt.chordify()
+            records = _chordifiedRecords( theChords.getElementsByClass( stream.Measure ), measureOffsets, mergeTies )[0]
+            del theChords
+         else:
+            records = _sliceScore( excerpt, measureOffsets, mergeTies )
+         # let go of the window before the consumer gets the chords
+         del excerpt
+         chords = _labelRecords( whatKey, records, processes, None, executor )
+         for theChord in chords:
+            yield theChord
+   finally:
+      if executor is not None:
+         executor.shutdown()
+   
+   if labelCacheFile is not None:
+      labelCache.save( labelCacheFile )
+# End function analyzeMeasures() -----------------------------------------------
+
+
+
+#-------------------------------------------------------------------------------
+## The name of the file in the output directory of analyzeCorpus() that lists
+## the scores that are done.
+_CHECKPOINT_FILENAME = 'checkpoint.txt'
+
+def _findScores( source, exclude = None ):
+   # Given the "source" argument of analyzeCorpus(), returns a sorted list of
+   # the pathnames of the scores. If exclude is a directory, nothing in it is
+   # a score, so analyzeCorpus() doesn't find its own results.
+   if os.path.isdir( source ):
+      post = []
+      for directory, subdirectories, filenames in os.walk( source ):
+         if exclude is not None:
+            subdirectories[:] = [name for name in subdirectories \
+                                 if not _isInside( os.path.join( directory, name ), exclude )]
+         for filename in filenames:
+            if not filename.startswith( '.' ):
+               post.append( os.path.join( directory, filename ) )
+   elif source.endswith( '.txt' ) and pathExists( source ):
+      # a manifest, with one pathname per line; relative pathnames are
+      # relative to the manifest
+      post = []
+      with open( source ) as manifest:
+         for line in manifest:
+            line = line.strip()
+            if len(line) > 0 and not line.startswith( '#' ):
+               post.append( os.path.join( os.path.dirname( source ), line ) )
+   else:
+      post = [pathname for pathname in glob.glob( source ) if not os.path.isdir( pathname )]
+   if exclude is not None:
+      post = [pathname for pathname in post if not _isInside( pathname, exclude )]
+   return sorted( post )
+
+def _isInside( pathname, directory ):
+   # Returns whether pathname is directory, or anything in it.
+   pathname = os.path.realpath( pathname )
+   directory = os.path.realpath( directory )
+   return pathname == directory or pathname.startswith( os.path.join( directory, '' ) )
+
+def _resultFilename( pathname ):
+   # Returns the name of the file that analyzeCorpus() writes the result for
+   # pathname in. Scores with the same name in different directories get
+   # different files.
+   digest = hashlib.sha1( os.path.abspath( pathname ).encode( 'utf-8' ) ).hexdigest()
+   return os.path.basename( pathname ) + '-' + digest[:8] + '.json'
+
+def _analyzeCorpusFile( pathname, outputDirectory, theSettings ):
+   # Runs in a worker process for analyzeCorpus(). Analyzes the score at
+   # pathname and writes the result in outputDirectory. Returns a 2-tuple with
+   # the pathname and the error message, or None if there wasn't an error.
+   # 
+   # Any error in analyzing the score is recorded rather than raised, so one
+   # bad score doesn't stop the rest, and it's checkpointed like the others.
+   result = { 'pathname' : pathname }
+   try:
+      result.update( analyzeScore( pathname, theSettings ).toDict() )
+      error = None
+   except Exception as e:
+      error = type(e).__name__ + ': ' + str(e)
+      result = { 'pathname' : pathname, 'error' : error, 'errorType' : type(e).__name__ }
+   
+   _writeAtomically( os.path.join( outputDirectory, _resultFilename( pathname ) ), \
+                     lambda theFile: json.dump( result, theFile, indent = 1 ), 'w' )
+   return ( pathname, error )
+
+def analyzeCorpus( source, outputDirectory, theSettings = None, processes = None, maxInFlight = None ):
+   '''
+   Analyzes many scores, without displaying them. The first argument says
+   which scores: it may be a directory (every file in it and its
+   subdirectories is analyzed), a manifest file ending in ".txt" (with one
+   pathname on each line; relative pathnames are relative to the manifest),
+   or a glob pattern like "bach/*.mxl".
+   
+   The result for each score is written in outputDirectory, which is made if
+   it doesn't exist, as a JSON file named after the score. It holds the
+   'pathname', and everything from :meth:`AnalysisResults.toDict`. If
+   the score couldn't be analyzed (like when music21 raises a
+   ConverterException, or anything else goes wrong), it holds the 'error'
+   message and the 'errorType' instead, and we carry on with the next score.
+   
+   The scores are analyzed in separate processes: at most "processes" of
+   them at a time (default is the number of CPUs), with at most
+   "maxInFlight" of them given to the processes but not finished yet
+   (default is twice the number of processes). If "processes" is 1, or
+   :mod:`concurrent.futures` isn't available, everything is done in this
+   process.
+   
+   Nothing is displayed, so there's no need to chordify: setting the
+   'chordifyScore' setting to False makes it quicker.
+   
+   Every finished score, including those that failed, is added to
+   "checkpoint.txt" in outputDirectory. If
+   you run analyzeCorpus() again with the same outputDirectory, like after a
+   crash, the scores listed there are skipped.
+   
+   If a worker process dies, the pool can't run anything else, so analyzeCorpus()
+   stops; the scores it didn't finish aren't added to "checkpoint.txt", and
+   running analyzeCorpus() again analyzes them.
+   
+   Returns a dict with the number of scores 'analyzed' and 'skipped', a list
+   of ( pathname, error message ) for the scores that 'failed', and a list of
+   the pathnames 'unfinished' because a worker process died.
+   '''
+   if None == theSettings:
+      theSettings = HarrisonHarmonySettings()
+   if None == processes:
+      processes = ( os.cpu_count() if hasattr( os, 'cpu_count' ) else None ) or 1
+   if None == maxInFlight:
+      maxInFlight = 2 * processes
+   if processes < 1 or maxInFlight < 1:
+      raise NonsensicalInputError( "analyzeCorpus(): need at least 1 process and 1 score in flight, but I got " + \
+                                   str(processes) + " and " + str(maxInFlight) )
+   
+   if not os.path.isdir( outputDirectory ):
+      os.makedirs( outputDirectory )
+   
+   # find which scores are already done
+   checkpointPath = os.path.join( outputDirectory, _CHECKPOINT_FILENAME )
+   finished = set()
+   if pathExists( checkpointPath ):
+      with open( checkpointPath ) as checkpoint:
+         finished = set( [line.rstrip( '\n' ) for line in checkpoint] )
+   allScores = _findScores( source, outputDirectory )
+   toAnalyze = [pathname for pathname in allScores if pathname not in finished]
+   post = { 'analyzed' : 0, 'skipped' : len(allScores) - len(toAnalyze), 'failed' : [], 'unfinished' : [] }
+   print( "analyzeCorpus(): analyzing " + str(len(toAnalyze)) + " of " + str(len(allScores)) + " scores." )
+   
+   with open( checkpointPath, 'a' ) as checkpoint:
+      def finish( pathname, error ):
+         # record that a score is done
+         post['analyzed'] += 1
+         if error is not None:
+            post['failed'].append( ( pathname, error ) )
+            print( "analyzeCorpus(): couldn't analyze " + pathname + ". " + error )
+         checkpoint.write( pathname + '\n' )
+         checkpoint.flush()
+      
+      if processes > 1 and ProcessPoolExecutor is not None:
+         with ProcessPoolExecutor( processes ) as executor:
+            # the score each future is analyzing
+            inFlight = {}
+            def finishFuture( future ):
+               pathname = inFlight.pop( future )
+               try:
+                  pathname, error = future.result()
+               except BrokenProcessPool:
+                  # a worker died, maybe from the score, maybe from something
+                  # else; either way it isn't finished, so it's not checkpointed
+                  post['unfinished'].append( pathname )
+                  return
+               except Exception as e:
+                  # like when the settings couldn't be pickled
+                  error = type(e).__name__ + ': ' + str(e)
+               finish( pathname, error )
+            for i, pathname in enumerate( toAnalyze ):
+               if len(inFlight) >= maxInFlight:
+                  for future in waitForFutures( inFlight, return_when = FIRST_COMPLETED )[0]:
+                     finishFuture( future )
+               if len(post['unfinished']) > 0:
+                  # the pool is broken, so nothing else will finish
+                  post['unfinished'].extend( toAnalyze[i:] )
+                  break
+               try:
+                  inFlight[executor.submit( _analyzeCorpusFile, pathname, outputDirectory, theSettings )] = pathname
+               except BrokenProcessPool:
+                  post['unfinished'].extend( toAnalyze[i:] )
+                  break
+            for future in waitForFutures( inFlight )[0]:
+               finishFuture( future )
+      else:
+         for pathname in toAnalyze:
+            finish( *_analyzeCorpusFile( pathname, outputDirectory, theSettings ) )
+   
+   if len(post['unfinished']) > 0:
+      print( "analyzeCorpus(): a worker process died, so " + str(len(post['unfinished'])) + \
+             " scores weren't analyzed. Run analyzeCorpus() again to analyze them." )
+   return post
+# End function analyzeCorpus() -------------------------------------------------
+
+
+
 # Class: HarrisonHarmonySettings ----------------------------------------------
 class HarrisonHarmonySettings:
    # An internal class that holds settings for stuff.
    # 
    # _chordLabelVerbosity = 'concise' or 'verbose' that will be given to
    #        labelThisChord()
+   # _labelCacheSize = int, the most chord labels analyzeThis() remembers
+   # _labelCacheFile = str path where analyzeThis() keeps the chord labels
+   #        between runs, or None to not keep them
+   # _labellingProcesses = int, how many processes analyzeThis() labels the
+   #        chords in; 1 means it's all done in this process
+   # _concurrentKeyFinding = bool, whether analyzeThis() finds the key of the
+   #        original score (in another process that parses the file itself,
+   #        while this one chordifies it), rather than finding the key of the
+   #        chordified score afterward
+   # _chordifyScore = bool, whether analyzeThis() chordifies the score; if
+   #        False, it finds the chords with a lighter slicer that only keeps
+   #        what's needed for labelling, and the key of the original score
+   # _mergeTiedChords = bool, whether analyzeThis() labels a chord that only
+   #        continues the ties of the one before it as part of that chord,
+   #        rather than removing the ties and labelling it again
+   # _localKeyWindow = int, how many chords around each one analyzeThis() uses
+   #        to find the local key it's labelled in; 0 means every chord is in
+   #        the key of the whole score
+   # _analysisCacheDirectory = str path where analyzeThis() keeps the results
+   #        of analyzing each file, to use when the same file is analyzed with
+   #        the same settings again, or None to not keep them
+   # _analysisCacheSize = int, the most results kept in the analysis cache
+   # _scoreCacheDirectory = str path where analyzeThis() keeps the chords and
+   #        key it finds in each file, so a file that hasn't changed isn't
+   #        parsed again, or None to not keep them
    # 
    # NOTE: When you add a property, remember to test its default setting in
    # the unit test file.
    def __init__( self ):
       self._chordLabelVerbosity = 'concise'
       self._annotateChordifiedScore = False
+      self._labelCacheSize = 4096
+      self._labelCacheFile = None
+      self._labellingProcesses = 1
+      self._concurrentKeyFinding = False
+      self._chordifyScore = True
+      self._mergeTiedChords = False
+      self._localKeyWindow = 0
+      self._analysisCacheDirectory = None
+      self._analysisCacheSize = 1024
+      self._scoreCacheDirectory = None
    
    def parsePropertySet( self, propertyStr ):
       # Parses 'propertyStr' and sets the specified property to the specified
@@ -1354,6 +3588,68 @@ class HarrisonHarmonySettings:
             self._annotateChordifiedScore = False
          else: # invalid setting
             raise NonsensicalInputError( "Invalid value for 'chordLabelVerbosity': " + propertyStr[spaceIndex+1:] )
+      elif 'labelCacheSize' == propertyStr[:spaceIndex]:
+         if propertyStr[spaceIndex+1:].isdigit() and int(propertyStr[spaceIndex+1:]) > 0:
+            self._labelCacheSize = int(propertyStr[spaceIndex+1:])
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'labelCacheSize': " + propertyStr[spaceIndex+1:] )
+      elif 'labelCacheFile' == propertyStr[:spaceIndex]:
+         if 'None' == propertyStr[spaceIndex+1:] or 'none' == propertyStr[spaceIndex+1:]:
+            self._labelCacheFile = None
+         elif len(propertyStr[spaceIndex+1:]) > 0:
+            self._labelCacheFile = propertyStr[spaceIndex+1:]
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'labelCacheFile': " + propertyStr[spaceIndex+1:] )
+      elif 'labellingProcesses' == propertyStr[:spaceIndex]:
+         if propertyStr[spaceIndex+1:].isdigit() and int(propertyStr[spaceIndex+1:]) > 0:
+            self._labellingProcesses = int(propertyStr[spaceIndex+1:])
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'labellingProcesses': " + propertyStr[spaceIndex+1:] )
+      elif 'concurrentKeyFinding' == propertyStr[:spaceIndex]:
+         if 'True' == propertyStr[spaceIndex+1:] or 'true' == propertyStr[spaceIndex+1:]:
+            self._concurrentKeyFinding = True
+         elif 'False' == propertyStr[spaceIndex+1:] or 'false' == propertyStr[spaceIndex+1:]:
+            self._concurrentKeyFinding = False
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'concurrentKeyFinding': " + propertyStr[spaceIndex+1:] )
+      elif 'chordifyScore' == propertyStr[:spaceIndex]:
+         if 'True' == propertyStr[spaceIndex+1:] or 'true' == propertyStr[spaceIndex+1:]:
+            self._chordifyScore = True
+         elif 'False' == propertyStr[spaceIndex+1:] or 'false' == propertyStr[spaceIndex+1:]:
+            self._chordifyScore = False
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'chordifyScore': " + propertyStr[spaceIndex+1:] )
+      elif 'mergeTiedChords' == propertyStr[:spaceIndex]:
+         if 'True' == propertyStr[spaceIndex+1:] or 'true' == propertyStr[spaceIndex+1:]:
+            self._mergeTiedChords = True
+         elif 'False' == propertyStr[spaceIndex+1:] or 'false' == propertyStr[spaceIndex+1:]:
+            self._mergeTiedChords = False
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'mergeTiedChords': " + propertyStr[spaceIndex+1:] )
+      elif 'localKeyWindow' == propertyStr[:spaceIndex]:
+         if propertyStr[spaceIndex+1:].isdigit():
+            self._localKeyWindow = int(propertyStr[spaceIndex+1:])
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'localKeyWindow': " + propertyStr[spaceIndex+1:] )
+      elif 'analysisCacheDirectory' == propertyStr[:spaceIndex]:
+         if 'None' == propertyStr[spaceIndex+1:] or 'none' == propertyStr[spaceIndex+1:]:
+            self._analysisCacheDirectory = None
+         elif len(propertyStr[spaceIndex+1:]) > 0:
+            self._analysisCacheDirectory = propertyStr[spaceIndex+1:]
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'analysisCacheDirectory': " + propertyStr[spaceIndex+1:] )
+      elif 'analysisCacheSize' == propertyStr[:spaceIndex]:
+         if propertyStr[spaceIndex+1:].isdigit() and int(propertyStr[spaceIndex+1:]) > 0:
+            self._analysisCacheSize = int(propertyStr[spaceIndex+1:])
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'analysisCacheSize': " + propertyStr[spaceIndex+1:] )
+      elif 'scoreCacheDirectory' == propertyStr[:spaceIndex]:
+         if 'None' == propertyStr[spaceIndex+1:] or 'none' == propertyStr[spaceIndex+1:]:
+            self._scoreCacheDirectory = None
+         elif len(propertyStr[spaceIndex+1:]) > 0:
+            self._scoreCacheDirectory = propertyStr[spaceIndex+1:]
+         else: # invalid setting
+            raise NonsensicalInputError( "Invalid value for 'scoreCacheDirectory': " + propertyStr[spaceIndex+1:] )
       # unrecognized property
       else:
          raise NonsensicalInputError( "Unrecognized property: " + propertyStr )
@@ -1377,6 +3673,26 @@ class HarrisonHarmonySettings:
          return self._chordLabelVerbosity
       elif 'annotateChordifiedScore' == propertyStr:
          return self._annotateChordifiedScore
+      elif 'labelCacheSize' == propertyStr:
+         return self._labelCacheSize
+      elif 'labelCacheFile' == propertyStr:
+         return self._labelCacheFile
+      elif 'labellingProcesses' == propertyStr:
+         return self._labellingProcesses
+      elif 'concurrentKeyFinding' == propertyStr:
+         return self._concurrentKeyFinding
+      elif 'chordifyScore' == propertyStr:
+         return self._chordifyScore
+      elif 'mergeTiedChords' == propertyStr:
+         return self._mergeTiedChords
+      elif 'localKeyWindow' == propertyStr:
+         return self._localKeyWindow
+      elif 'analysisCacheDirectory' == propertyStr:
+         return self._analysisCacheDirectory
+      elif 'analysisCacheSize' == propertyStr:
+         return self._analysisCacheSize
+      elif 'scoreCacheDirectory' == propertyStr:
+         return self._scoreCacheDirectory
       # unrecognized property
       else:
          raise NonsensicalInputError( "Unrecognized property: " + propertyStr )
@@ -1410,6 +3726,8 @@ if __name__ == '__main__':
          print( "- 'exit' or 'quit' to exit or quit the program" )
          print( "- 'set' to set an option (see 'set help' for more information)" )
          print( "- 'get' to get the setting of an option (see 'get help')" )
+         print( "- 'batch' followed by a directory, manifest, or glob pattern, and an" )
+         print( "  output directory, to analyze many scores without displaying them" )
          print( "" )
       elif 'exit' == userSays or 'quit' == userSays:
          print( "" )
@@ -1424,6 +3742,16 @@ if __name__ == '__main__':
                   mySettings.parsePropertySet( userSays )
                except NonsensicalInputError as e:
                   print( "Error: " + str(e) )
+         elif 'batch' == userSays[:userSays.find(' ')]:
+            # the output directory is after the last space
+            if userSays.rfind(' ') == userSays.find(' '):
+               print( "Error: 'batch' needs the scores and an output directory." )
+            else:
+               try:
+                  analyzeCorpus( userSays[userSays.find(' ')+1:userSays.rfind(' ')], \
+                                 userSays[userSays.rfind(' ')+1:], mySettings )
+               except NonsensicalInputError as e:
+                  print( "Error: " + str(e) )
          elif 'get' == userSays[:userSays.find(' ')]:
             if 'get help' == userSays:
                pass # TODO: print get help